@@ -0,0 +1,252 @@
+# Lazy asset loading.
+#
+# Images and sounds are decoded (and images scaled) on a small thread pool as
+# soon as they are queued, so the menu can come up while the game sprites are
+# still loading. image()/sound() hand back the finished asset, waiting only if
+# its decode hasn't finished yet; anything never queued is loaded on first use.
+# convert_alpha() needs the display, so it happens on the calling thread.
+#
+# Scaled images are also written to a cache directory as raw RGBA pixels,
+# keyed by a hash of the source file and the target size, and memory-mapped
+# back on later launches, so a warm start skips both PNG decoding and
+# scaling. Editing a source file changes its hash and the stale copy is
+# replaced.
+import hashlib, json, mmap, os, tempfile, threading, time
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+from audio import PcmCache
+
+PIXEL_FORMAT = "RGBA"
+
+
+class ScaledCache:
+    def __init__(self, path):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, src, size):
+        # (source hash, target size, pixel format)
+        with open(src, "rb") as f:
+            digest = hashlib.sha1(f.read()).hexdigest()[:16]
+        name = os.path.splitext(os.path.basename(src))[0]
+        return f"{name}-{digest}-{size[0]}x{size[1]}-{PIXEL_FORMAT}.raw"
+
+    def load(self, key, size):
+        path = os.path.join(self.path, key)
+        try:
+            with open(path, "rb") as f:
+                buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):  # ValueError: empty file
+            self.misses += 1
+            return None
+        if len(buf) != size[0] * size[1] * len(PIXEL_FORMAT):
+            buf.close()
+            self.misses += 1
+            return None
+        self.hits += 1
+        # the surface keeps the mapping alive until it is converted
+        return pygame.image.frombuffer(buf, size, PIXEL_FORMAT)
+
+    def store(self, key, img):
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            # drop copies made from an older version of the same source file;
+            # other sizes stay, for switching between displays
+            name, digest = key.rsplit("-", 3)[:2]
+            for old in os.listdir(self.path):
+                parts = old.rsplit("-", 3)
+                if len(parts) == 4 and parts[0] == name and parts[1] != digest:
+                    os.unlink(os.path.join(self.path, old))
+            fd, tmp = tempfile.mkstemp(prefix=".scaled-", dir=self.path)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(pygame.image.tobytes(img, PIXEL_FORMAT))
+                os.replace(tmp, os.path.join(self.path, key))
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        except Exception as e:
+            print("[image warning] couldn't cache scaled image:", e)
+
+
+class AssetManager:
+    def __init__(self, img_dir, snd_dir, audio=True, workers=4, cache_dir=None, pcm_dir=None):
+        self.img_dir = img_dir
+        self.snd_dir = snd_dir
+        self.cache = ScaledCache(cache_dir) if cache_dir else None
+        self.pcm = PcmCache(pcm_dir) if pcm_dir else None
+        self.audio = audio
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="assets")
+        self.jobs = {}      # key -> future of the decoded asset
+        self.ready = {}     # key -> asset as handed out
+        self.timings = {}   # key -> (decode seconds, seconds the caller waited)
+        self._lock = threading.Lock()
+
+    def _decode_image(self, fname, scale):
+        t = time.perf_counter()
+        path = os.path.join(self.img_dir, fname)
+        try:
+            key = None
+            if self.cache and scale:
+                key = self.cache.key(path, scale)
+                img = self.cache.load(key, scale)
+                if img is not None:
+                    return img, time.perf_counter() - t
+            img = pygame.image.load(path)
+            if scale:
+                img = pygame.transform.scale(img, scale)
+            if key:
+                self.cache.store(key, img)
+        except Exception as e:
+            print(f"[image warning] couldn't load {path}: {e}")
+            img = None
+        return img, time.perf_counter() - t
+
+    def _decode_sound(self, fname):
+        t = time.perf_counter()
+        path = os.path.join(self.snd_dir, fname)
+        try:
+            snd = self.pcm.load(path) if self.pcm else pygame.mixer.Sound(path)
+        except Exception as e:
+            print(f"[sound warning] couldn't load {path}: {e}")
+            snd = None
+        return snd, time.perf_counter() - t
+
+    def queue_image(self, name, fname, scale=None):
+        key = ("image", name)
+        with self._lock:
+            if key not in self.jobs:
+                self.jobs[key] = (self.pool.submit(self._decode_image, fname, scale), scale)
+
+    def queue_sound(self, name, fname):
+        if not self.audio:
+            return
+        key = ("sound", name)
+        with self._lock:
+            if key not in self.jobs:
+                self.jobs[key] = (self.pool.submit(self._decode_sound, fname), None)
+
+    def _result(self, key):
+        future, scale = self.jobs[key]
+        t = time.perf_counter()
+        asset, took = future.result()
+        self.timings[key[1] if key[0] == "image" else key[1] + " (sound)"] = (took, time.perf_counter() - t)
+        return asset, scale
+
+    def image(self, name, fname=None, scale=None, placeholder_color=(200, 0, 0)):
+        key = ("image", name)
+        if key in self.ready:
+            return self.ready[key]
+        if key not in self.jobs:
+            self.queue_image(name, fname, scale)
+        img, scale = self._result(key)
+        if img is not None:
+            img = img.convert_alpha()
+        elif scale:
+            img = pygame.Surface(scale, pygame.SRCALPHA)
+            img.fill(placeholder_color)
+        self.ready[key] = img
+        return img
+
+    def sound(self, name, fname=None):
+        if not self.audio:
+            return None
+        key = ("sound", name)
+        if key in self.ready:
+            return self.ready[key]
+        if key not in self.jobs:
+            self.queue_sound(name, fname)
+        self.ready[key] = self._result(key)[0]
+        return self.ready[key]
+
+    def shutdown(self):
+        # at exit: drop queued decodes, and the decoded originals the jobs
+        # still hold (for cached images, the mmap behind them)
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            self.jobs.clear()
+
+    def report(self):
+        lines = []
+        if self.cache:
+            lines.append(f"  scaled cache: {self.cache.hits} hits, {self.cache.misses} misses")
+        if self.pcm:
+            lines.append(f"  pcm cache: {self.pcm.hits} hits, {self.pcm.misses} misses")
+        for name, (took, waited) in sorted(self.timings.items(), key=lambda kv: -kv[1][0]):
+            lines.append(f"  {name:<16} decode {took * 1000:7.1f} ms  waited {waited * 1000:6.1f} ms")
+        return "\n".join(lines)
+
+
+class FontCache:
+    # pygame.font.SysFont scans every installed font (fc-list on Linux) the
+    # first time it is called. The path a name resolves to is remembered here,
+    # in memory and in a small JSON file, so later launches open the file
+    # directly; fonts at new sizes reuse the same path.
+    def __init__(self, path=None):
+        self.path = path
+        self.paths = {}
+        self.fonts = {}
+        if path:
+            try:
+                with open(path, "r") as f:
+                    self.paths = json.load(f)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print("[font warning]", e)
+
+    def _resolve(self, name, bold):
+        key = f"{name}:{int(bold)}"
+        entry = self.paths.get(key)
+        if entry and (entry[0] is None or os.path.exists(entry[0])):
+            return entry
+        # no separate bold face means SysFont would embolden the regular one
+        fpath = pygame.font.match_font(name, bold=bold)
+        fake_bold = bool(bold) and fpath == pygame.font.match_font(name)
+        entry = self.paths[key] = [fpath, fake_bold]
+        self._save()
+        return entry
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "w") as f:
+                json.dump(self.paths, f)
+        except Exception as e:
+            print("[font warning] couldn't save font cache:", e)
+
+    def get(self, name, size, bold=False):
+        key = (name, size, bold)
+        f = self.fonts.get(key)
+        if f is None:
+            fpath, fake_bold = self._resolve(name, bold)
+            if fpath is None:
+                fake_bold = bold
+            f = pygame.font.Font(fpath, size)
+            if fake_bold:
+                f.set_bold(True)
+            self.fonts[key] = f
+        return f
+
+
+class StartupProfile:
+    # --startup-profile: time between named points on the way to first frame
+    def __init__(self, t0=None):
+        self.t0 = self.last = time.perf_counter() if t0 is None else t0
+        self.marks = []
+
+    def mark(self, label):
+        now = time.perf_counter()
+        self.marks.append((label, now - self.last))
+        self.last = now
+
+    def report(self, title="startup"):
+        lines = [f"[startup] {title}: first frame after {(self.last - self.t0) * 1000:.1f} ms"]
+        for label, took in self.marks:
+            lines.append(f"  {label:<22} {took * 1000:7.1f} ms")
+        return "\n".join(lines)
@@ -0,0 +1,186 @@
+# Sound effects.
+#
+# Decoded PCM is cached on disk next to the scaled images, keyed by a hash
+# of the source file and the mixer format it was decoded for, so a warm
+# start builds each Sound straight from raw samples instead of decoding MP3.
+#
+# Each effect class gets its own reserved mixer channels, so a burst of eat
+# sounds can't cut off the golden or game-over sound (or each other, up to
+# the channel count), and repeats faster than an effect's min_interval are
+# dropped. Trigger times are kept for an estimated latency report.
+# NullPlayer stands in when the mixer couldn't be opened.
+import hashlib, os, tempfile, time
+from collections import deque
+
+import pygame
+
+from timing import percentile
+
+# mixer settings, passed to pygame.mixer.pre_init before pygame.init
+MIXER_FREQ = 44100
+MIXER_SIZE = -16
+MIXER_CHANNELS = 2
+MIXER_BUFFER = 512  # samples per device buffer; also the floor on latency
+
+
+class PcmCache:
+    def __init__(self, path):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, src):
+        with open(src, "rb") as f:
+            digest = hashlib.sha1(f.read()).hexdigest()[:16]
+        freq, size, channels = pygame.mixer.get_init()
+        name = os.path.splitext(os.path.basename(src))[0]
+        # size is negative for signed samples: spelled s16 rather than -16
+        # so the fields stay split by single dashes
+        bits = f"{'s' if size < 0 else 'u'}{abs(size)}"
+        return f"{name}-{digest}-{freq}-{bits}-{channels}.pcm"
+
+    def load(self, src):
+        key = self.key(src)
+        try:
+            with open(os.path.join(self.path, key), "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            raw = None
+        if raw:
+            self.hits += 1
+            return pygame.mixer.Sound(buffer=raw)
+        self.misses += 1
+        snd = pygame.mixer.Sound(src)
+        self.store(key, snd.get_raw())
+        return snd
+
+    def store(self, key, raw):
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            # drop copies decoded from an older version of the same file
+            name, digest = key.rsplit("-", 4)[:2]
+            for old in os.listdir(self.path):
+                parts = old.rsplit("-", 4)
+                if len(parts) == 5 and parts[0] == name and parts[1] != digest:
+                    os.unlink(os.path.join(self.path, old))
+            fd, tmp = tempfile.mkstemp(prefix=".pcm-", dir=self.path)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(raw)
+                os.replace(tmp, os.path.join(self.path, key))
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        except Exception as e:
+            print("[sound warning] couldn't cache decoded sound:", e)
+
+
+class SoundPlayer:
+    # effects: {name: (channels, min_interval seconds)}
+    def __init__(self, effects, music_volume=0.28, history=500):
+        self.effects = dict(effects)
+        self.music_volume = music_volume
+        self.sounds = {}
+        self.channels = {}
+        self.last = {}
+        self.dropped = 0
+        self.latencies = deque(maxlen=history)
+        reserved = sum(n for n, _ in self.effects.values())
+        if pygame.mixer.get_num_channels() < reserved + 4:
+            pygame.mixer.set_num_channels(reserved + 4)
+        pygame.mixer.set_reserved(reserved)
+        i = 0
+        for name, (n, _) in self.effects.items():
+            self.channels[name] = [pygame.mixer.Channel(c) for c in range(i, i + n)]
+            i += n
+        freq = pygame.mixer.get_init()[0]
+        self.buffer_latency = MIXER_BUFFER / freq
+
+    def add(self, name, sound):
+        if sound is not None:
+            self.sounds[name] = sound
+
+    def loaded(self, name):
+        return name in self.sounds
+
+    def play(self, name):
+        snd = self.sounds.get(name)
+        if snd is None:
+            return False
+        t = time.perf_counter()
+        if t - self.last.get(name, -1e9) < self.effects[name][1]:
+            self.dropped += 1
+            return False
+        self.last[name] = t
+        chans = self.channels[name]
+        # a free channel of this class, else restart the one playing longest
+        ch = next((c for c in chans if not c.get_busy()), None)
+        if ch is None:
+            ch = chans[0]
+            chans.append(chans.pop(0))
+        ch.play(snd)
+        self.latencies.append(time.perf_counter() - t)
+        return True
+
+    def stop(self):
+        for chans in self.channels.values():
+            for c in chans:
+                c.stop()
+
+    def load_music(self, path):
+        if not os.path.exists(path):
+            print("[music warning] background music file missing.")
+            return
+        try:
+            pygame.mixer.music.load(path)
+            pygame.mixer.music.set_volume(self.music_volume)
+        except Exception as e:
+            print("[music warning]", e)
+
+    def play_music(self):
+        try:
+            pygame.mixer.music.play(-1)
+        except pygame.error as e:
+            print("[music warning]", e)
+
+    def stop_music(self):
+        pygame.mixer.music.stop()
+
+    def report(self):
+        # an estimate, not a measurement: the measured time from trigger to
+        # samples handed to the mixer, plus one device buffer before they
+        # can reach the speaker (pygame can't tell when they actually do)
+        buf = self.buffer_latency * 1000
+        lat = [t * 1000 + buf for t in self.latencies]
+        if not lat:
+            return "  sound estimated buffer latency ms  no effects played"
+        return (f"  sound estimated buffer latency ms  mean {sum(lat) / len(lat):.2f}"
+                f"  p95 {percentile(lat, 95):.2f}  max {max(lat):.2f}"
+                f"  (play() call + buffer {buf:.1f}, {len(lat)} played, {self.dropped} rate-limited)")
+
+
+class NullPlayer:
+    # same interface, does nothing (no audio device)
+    def add(self, name, sound):
+        pass
+
+    def loaded(self, name):
+        return True
+
+    def play(self, name):
+        return False
+
+    def stop(self):
+        pass
+
+    def load_music(self, path):
+        pass
+
+    def play_music(self):
+        pass
+
+    def stop_music(self):
+        pass
+
+    def report(self):
+        return "  sound off"
@@ -0,0 +1,282 @@
+# Autopilot: a bot that plays any mode through the same per-tick turn
+# interface as the keyboard (InputQueue.next), for demos and soak tests.
+#
+# It heads for the food down a BFS distance field grown outwards from the
+# food cell around the snake's body. The field is kept between ticks: it is
+# rebuilt only when the food moves (or the snake respawns), the BFS work
+# queue carries over when a tick runs out of time, and cells the tail frees
+# are relaxed into it as they open up instead of starting over.
+#
+# Before taking the move the field prefers, it checks that the snake can
+# still get out afterwards: a BFS from the new head that knows when each
+# body cell will be vacated, so reaching a cell the tail will have left by
+# then (or finding at least as much room as the snake is long) counts as
+# safe. Everything runs against a deadline of budget_us per tick; if the
+# budget runs out first, it takes the move that leaves the most room found
+# so far, or any move that doesn't hit something right away.
+import time
+from array import array
+from collections import deque
+
+from timing import percentile
+
+DIRS = ((0, -1), (0, 1), (-1, 0), (1, 0))
+
+
+class Autopilot:
+    def __init__(self, width, height, wrap=False, budget_us=2000, history=1200):
+        self.width = width
+        self.height = height
+        self.wrap = wrap
+        self.budget = budget_us / 1e6 if budget_us else float("inf")  # None: no deadline
+        self.cells = width * height
+        self.snake = None
+        self.body = deque()                       # our copy of the snake's cells, tail first
+        self.serial = array("i", [0]) * self.cells  # push count when each body cell was entered
+        self.pushes = self.pops = 0
+        self.target = None
+        self.dist = None                          # cells to the target, -1 = not reached yet
+        self.work = deque()
+        self.freed = deque()                      # tail cells not yet relaxed into the field
+        # stats
+        self.times = deque(maxlen=history)
+        self.decisions = 0
+        self.partial = 0      # decided with the field still growing
+        self.timeouts = 0     # ran out of budget in the escape check
+        self.fallbacks = 0    # no move proven safe
+        self.rebuilds = 0
+
+    def neighbours(self, c):
+        w, h = self.width, self.height
+        x, y = c % w, c // w
+        out = []
+        for dx, dy in DIRS:
+            nx, ny = x + dx, y + dy
+            if self.wrap:
+                nx %= w
+                ny %= h
+            elif not (0 <= nx < w and 0 <= ny < h):
+                continue
+            out.append(ny * w + nx)
+        return out
+
+    def _sync(self, snake, target, deadline):
+        # catch up with the moves since the last tick; freed cells the
+        # deadline leaves over wait for the next tick
+        w = self.width
+        if snake is not self.snake or snake.pushes < self.pushes:
+            self.snake = snake
+            self.body = deque(y * w + x for x, y in snake)
+            for i, c in enumerate(self.body):
+                self.serial[c] = snake.pops + i
+            self.pushes, self.pops = snake.pushes, snake.pops
+            self.target = None
+        freed = self.freed
+        for _ in range(snake.pops - self.pops):
+            freed.append(self.body.popleft())
+        new = snake.pushes - self.pushes
+        for i in range(new):
+            x, y = snake[i - new]
+            c = y * w + x
+            self.body.append(c)
+            self.serial[c] = self.pushes + i
+        self.pushes, self.pops = snake.pushes, snake.pops
+
+        if target != self.target:
+            self.target = target
+            self.rebuilds += 1
+            self.dist = array("i", [-1]) * self.cells
+            self.work.clear()
+            freed.clear()
+            if target is not None:
+                c = target[1] * w + target[0]
+                self.dist[c] = 0
+                self.work.append(c)
+            return
+        if target is None:
+            freed.clear()
+            return
+        # a freed cell takes its best neighbour's distance + 1 and passes it on
+        dist, occ = self.dist, snake.occ
+        clock = time.perf_counter
+        i = 0
+        while freed:
+            i += 1
+            if not i & 31 and clock() > deadline:
+                return
+            c = freed.popleft()
+            if occ[c]:
+                continue
+            best = min((dist[n] for n in self.neighbours(c) if dist[n] >= 0), default=-1)
+            if best >= 0 and (dist[c] < 0 or dist[c] > best + 1):
+                dist[c] = best + 1
+                self.work.append(c)
+
+    def _grow(self, deadline):
+        # label-correcting BFS over free cells; False if the deadline hit
+        # first. Neighbours are worked out inline: this is the hot loop.
+        dist, work, occ = self.dist, self.work, self.snake.occ
+        w, cells, wrap = self.width, self.cells, self.wrap
+        clock = time.perf_counter
+        i = 0
+        while work:
+            i += 1
+            if not i & 31 and clock() > deadline:
+                return False
+            c = work.popleft()
+            d = dist[c] + 1
+            x = c % w
+            if x:
+                n = c - 1
+            elif wrap:
+                n = c + w - 1
+            else:
+                n = -1
+            if n >= 0 and not occ[n] and (dist[n] < 0 or dist[n] > d):
+                dist[n] = d
+                work.append(n)
+            if x < w - 1:
+                n = c + 1
+            elif wrap:
+                n = c - w + 1
+            else:
+                n = -1
+            if n >= 0 and not occ[n] and (dist[n] < 0 or dist[n] > d):
+                dist[n] = d
+                work.append(n)
+            if c >= w:
+                n = c - w
+            elif wrap:
+                n = c + cells - w
+            else:
+                n = -1
+            if n >= 0 and not occ[n] and (dist[n] < 0 or dist[n] > d):
+                dist[n] = d
+                work.append(n)
+            if c < cells - w:
+                n = c + w
+            elif wrap:
+                n = c - cells + w
+            else:
+                n = -1
+            if n >= 0 and not occ[n] and (dist[n] < 0 or dist[n] > d):
+                dist[n] = d
+                work.append(n)
+        return True
+
+    def _moves(self, dx, dy, snake, length):
+        # (direction, cell) that don't run into a wall or the body this tick
+        w, h = self.width, self.height
+        hx, hy = snake[-1]
+        tail = self.body[0]
+        tail_moves = len(snake) >= length
+        neck = self.body[-2] if len(self.body) > 1 else -1
+        out = []
+        for d in DIRS:
+            if (dx or dy) and d == (-dx, -dy):
+                continue
+            nx, ny = hx + d[0], hy + d[1]
+            if self.wrap:
+                nx %= w
+                ny %= h
+            elif not (0 <= nx < w and 0 <= ny < h):
+                continue
+            c = ny * w + nx
+            if not (dx or dy) and c == neck:
+                continue
+            if snake.occ[c] and not (c == tail and tail_moves and snake.occ[c] == 1):
+                continue
+            out.append((d, c))
+        return out
+
+    def _escape(self, start, snake, length, eats, deadline):
+        # Can the snake get out after moving to start? BFS by tick: a body
+        # cell counts as free once enough pops have happened by the time the
+        # head could get there. Returns (True/False/None on timeout, room).
+        grow = max(0, length - len(snake)) + (1 if eats else 0)
+        pops, size, occ, serial = snake.pops, len(snake), snake.occ, self.serial
+        nb = self.neighbours
+        clock = time.perf_counter
+        seen = {start}
+        level = [start]
+        t = 1
+        i = 0
+        while level:
+            if clock() > deadline:
+                return None, len(seen)
+            t += 1
+            nxt = []
+            for c in level:
+                # levels get wide on a big board: check inside them too
+                i += 1
+                if not i & 31 and clock() > deadline:
+                    return None, len(seen)
+                for n in nb(c):
+                    if n in seen:
+                        continue
+                    if occ[n]:
+                        if serial[n] - pops + 1 + grow <= t:
+                            return True, len(seen)
+                        continue
+                    seen.add(n)
+                    nxt.append(n)
+            if len(seen) >= size:
+                return True, len(seen)
+            level = nxt
+        return False, len(seen)
+
+    def _heuristic(self, c):
+        # grid distance to the target (around the edges when they wrap)
+        w, h = self.width, self.height
+        tx, ty = self.target
+        ax, ay = abs(c % w - tx), abs(c // w - ty)
+        if self.wrap:
+            ax, ay = min(ax, w - ax), min(ay, h - ay)
+        return ax + ay
+
+    def next(self, dx, dy, snake, length, food):
+        # heading for this tick (dx, dy stays if nothing is safe)
+        t0 = time.perf_counter()
+        deadline = t0 + self.budget
+        target = food if food is not None and food[0] is not None else None
+        self._sync(snake, target, t0 + self.budget / 2)
+        if target is not None and not self._grow(t0 + self.budget / 2):
+            self.partial += 1
+        moves = self._moves(dx, dy, snake, length)
+        if target is not None:
+            dist = self.dist
+            tc = target[1] * self.width + target[0]
+            ranked = sorted(moves, key=lambda m: (
+                dist[m[1]] if dist[m[1]] >= 0 else self.cells + self._heuristic(m[1]),
+                m[0] != (dx, dy)))
+        else:
+            tc = -1
+            ranked = sorted(moves, key=lambda m: m[0] != (dx, dy))
+        choice, room = None, {}
+        for d, c in ranked:
+            safe, room[d] = self._escape(c, snake, length, c == tc, deadline)
+            if safe:
+                choice = d
+                break
+            if safe is None:
+                self.timeouts += 1
+                break
+        if choice is None:
+            self.fallbacks += 1
+            if room:
+                choice = max(room, key=room.get)
+            elif ranked:
+                choice = ranked[0][0]
+            else:
+                choice = (dx, dy)
+        self.decisions += 1
+        self.times.append(time.perf_counter() - t0)
+        return choice
+
+    def report(self):
+        us = [t * 1e6 for t in self.times]
+        if not us:
+            return "  autopilot µs  no decisions"
+        return (f"  autopilot µs  mean {sum(us) / len(us):.0f}  p95 {percentile(us, 95):.0f}  max {max(us):.0f}"
+                f"  (budget {self.budget * 1e6:.0f}, {self.decisions} ticks, {self.partial} partial field,"
+                f" {self.timeouts} timeouts, {self.fallbacks} fallbacks, {self.rebuilds} rebuilds)")
@@ -0,0 +1,225 @@
+# Vectorized batch of snake games (needs numpy).
+#
+# N boards advance in lockstep with the rules from snake_sim.MODES. Each board
+# is kept as flat arrays: an occupancy grid, a ring buffer of body cells
+# (head pointer + count), food/golden cells and the per-game counters. Games
+# that end are reset in place at the end of step().
+import numpy as np
+
+from snake_sim import (MODES, FOOD_SCORE, GOLDEN_SCORE, GOLDEN_GROWTH,
+                       SPECIAL_INTERVAL, SPECIAL_DURATION)
+
+# Action index -> cell delta, same numbering as snake_sim (NOOP, UP, DOWN, LEFT, RIGHT)
+DX = np.array([0, 0, 0, -1, 1], dtype=np.int32)
+DY = np.array([0, -1, 1, 0, 0], dtype=np.int32)
+
+
+class BatchSnakeEnv:
+    def __init__(self, n, mode="Classic", width=40, height=30, seed=None, hud=(0, 0)):
+        if mode not in MODES:
+            raise ValueError(f"unknown mode: {mode}")
+        self.n = n
+        self.mode = mode
+        self.rules = MODES[mode]
+        self.width = width
+        self.height = height
+        self.cells = width * height
+        self.cap = self.cells + 1
+        self.rng = np.random.default_rng(seed)
+
+        cell_t = np.int16 if self.cells < 2**15 else np.int32
+        self.occ = np.zeros((n, self.cells), dtype=np.uint8)
+        self.body = np.zeros((n, self.cap), dtype=cell_t)
+        self.head_ptr = np.zeros(n, dtype=np.int32)
+        self.count = np.zeros(n, dtype=np.int32)
+        self.length = np.zeros(n, dtype=np.int32)
+        self.hx = np.zeros(n, dtype=np.int32)
+        self.hy = np.zeros(n, dtype=np.int32)
+        self.dx = np.zeros(n, dtype=np.int32)
+        self.dy = np.zeros(n, dtype=np.int32)
+        self.food = np.full(n, -1, dtype=np.int32)
+        self.special = np.full(n, -1, dtype=np.int32)
+        self.special_timer = np.zeros(n)
+        self.last_special = np.zeros(n)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.lives = np.zeros(n, dtype=np.int32)
+        self.speed = np.zeros(n)
+        self.time = np.zeros(n)
+        self.time_left = np.zeros(n, dtype=np.int32)
+        self.second = np.zeros(n)
+        # Score of the last finished game on each board (valid where done).
+        self.final_score = np.zeros(n, dtype=np.int64)
+
+        hud_x, hud_y = hud
+        xs = np.arange(self.cells) % width
+        ys = np.arange(self.cells) // width
+        self.hud_mask = (xs < hud_x) & (ys < hud_y)
+
+        self.x0 = width // 2
+        self.y0 = height // 2
+        self.reset()
+
+    # reset
+
+    def reset(self, idx=None):
+        if idx is None:
+            idx = np.arange(self.n)
+        r = self.rules
+        self.score[idx] = 0
+        self.lives[idx] = r["lives"]
+        self.time[idx] = 0.0
+        self.time_left[idx] = r["time_limit"] or 0
+        self.second[idx] = 0.0
+        self.special[idx] = -1
+        self.special_timer[idx] = 0.0
+        self.last_special[idx] = 0.0
+        self._spawn_snakes(idx)
+        self.food[idx] = self._spawn_food(idx, self.special[idx])
+
+    def _spawn_snakes(self, idx):
+        w = self.width
+        tail0 = self.y0 * w + self.x0 - 1
+        head0 = self.y0 * w + self.x0
+        self.occ[idx] = 0
+        self.occ[idx, tail0] = 1
+        self.occ[idx, head0] = 1
+        self.body[idx, 0] = tail0
+        self.body[idx, 1] = head0
+        self.head_ptr[idx] = 1
+        self.count[idx] = 2
+        self.length[idx] = 2
+        self.hx[idx] = self.x0
+        self.hy[idx] = self.y0
+        self.dx[idx] = 0
+        self.dy[idx] = 0
+        self.speed[idx] = self.rules["speed"]
+
+    def _spawn_food(self, idx, blocked):
+        # Rejection sampling for all boards at once, then an exact pick for
+        # the few dense boards that kept missing. Returns -1 on a full board.
+        out = np.full(len(idx), -1, dtype=np.int32)
+        pending = np.arange(len(idx))
+        for _ in range(8):
+            if not len(pending):
+                return out
+            cand = self.rng.integers(0, self.cells, size=len(pending))
+            ok = ((self.occ[idx[pending], cand] == 0) & ~self.hud_mask[cand]
+                  & (cand != blocked[pending]))
+            out[pending[ok]] = cand[ok]
+            pending = pending[~ok]
+        for j in pending:
+            free = np.flatnonzero((self.occ[idx[j]] == 0) & ~self.hud_mask)
+            free = free[free != blocked[j]]
+            if len(free):
+                out[j] = free[self.rng.integers(len(free))]
+        return out
+
+    # step
+
+    def step(self, actions):
+        # actions: int array of shape (n,). Returns (rewards, dones); boards
+        # that finished are already reset, their score is in final_score.
+        r = self.rules
+        w, h, cap = self.width, self.height, self.cap
+        all_idx = np.arange(self.n)
+        score_before = self.score.copy()
+        dones = np.zeros(self.n, dtype=bool)
+
+        # turn: only across the current axis; from standstill, not into the neck
+        actions = np.asarray(actions)
+        adx, ady = DX[actions], DY[actions]
+        still = (self.dx == 0) & (self.dy == 0)
+        turn = ((adx != 0) & (self.dx == 0)) | ((ady != 0) & (self.dy == 0))
+        neck = self.body[all_idx, (self.head_ptr - 1) % cap]
+        into_neck = ((self.hy + ady) * w + self.hx + adx) == neck
+        turn &= ~(still & into_neck)
+        self.dx = np.where(turn, adx, self.dx)
+        self.dy = np.where(turn, ady, self.dy)
+
+        dt = 1.0 / self.speed
+        self.time += dt
+        now = self.time
+
+        if r["time_limit"] is not None:
+            self.second += dt
+            whole = np.floor(self.second).astype(np.int32)
+            self.second -= whole
+            self.time_left -= whole
+            dones |= self.time_left <= 0
+
+        # special spawn/despawn
+        spawn = (self.special < 0) & (now - self.last_special > SPECIAL_INTERVAL)
+        if spawn.any():
+            idx = np.flatnonzero(spawn)
+            self.special[idx] = self._spawn_food(idx, self.food[idx])
+            self.special_timer[idx] = now[idx]
+        expire = (self.special >= 0) & (now - self.special_timer > SPECIAL_DURATION)
+        self.special[expire] = -1
+        self.last_special[expire] = now[expire]
+
+        moving = ~dones & ~((self.dx == 0) & (self.dy == 0))
+        nx = self.hx + self.dx
+        ny = self.hy + self.dy
+        out = (nx < 0) | (nx >= w) | (ny < 0) | (ny >= h)
+        if r["walls"] == "wrap":
+            nx %= w
+            ny %= h
+            hit = np.zeros(self.n, dtype=bool)
+        else:
+            hit = moving & out
+        mv = np.flatnonzero(moving & ~hit)
+
+        # pop tails of boards that aren't growing
+        pop = mv[self.count[mv] >= self.length[mv]]
+        tail_ptr = (self.head_ptr[pop] - self.count[pop] + 1) % cap
+        self.occ[pop, self.body[pop, tail_ptr]] = 0
+        self.count[pop] -= 1
+
+        # self collision, then push heads
+        cell = ny[mv] * w + nx[mv]
+        hit[mv] = (self.length[mv] >= 3) & (self.occ[mv, cell] != 0)
+        self.occ[mv, cell] = 1
+        self.head_ptr[mv] = (self.head_ptr[mv] + 1) % cap
+        self.body[mv, self.head_ptr[mv]] = cell
+        self.count[mv] += 1
+        self.hx[mv] = nx[mv]
+        self.hy[mv] = ny[mv]
+
+        if hit.any():
+            idx = np.flatnonzero(hit)
+            if r["self_hit"] == "reset":
+                self._spawn_snakes(idx)
+            else:
+                self.lives[idx] -= 1
+                dones[idx[self.lives[idx] <= 0]] = True
+                respawn = idx[self.lives[idx] > 0]
+                self._spawn_snakes(respawn)
+
+        # eat
+        alive = ~dones & ~hit
+        head = self.hy * w + self.hx
+        ate = np.flatnonzero(alive & moving & (head == self.food))
+        if len(ate):
+            self.length[ate] += 1
+            self.score[ate] += FOOD_SCORE
+            self.speed[ate] = np.minimum(self.speed[ate] + r["speed_step"], r["max_speed"])
+            if r["time_limit"] is not None:
+                self.time_left[ate] += r["time_bonus"]
+            self.food[ate] = self._spawn_food(ate, self.special[ate])
+        gold = np.flatnonzero(alive & moving & (head == self.special))
+        if len(gold):
+            self.score[gold] += GOLDEN_SCORE
+            self.length[gold] += GOLDEN_GROWTH
+            self.special[gold] = -1
+            self.last_special[gold] = now[gold]
+
+        rewards = self.score - score_before
+        if dones.any():
+            idx = np.flatnonzero(dones)
+            self.final_score[idx] = self.score[idx]
+            self.reset(idx)
+        return rewards, dones
+
+    def grids(self):
+        # (n, height, width) view of the occupancy grids
+        return self.occ.reshape(self.n, self.height, self.width)
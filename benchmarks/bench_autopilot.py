@@ -0,0 +1,78 @@
+# Autopilot soak test on the headless simulation: plays games in each mode
+# on a few board sizes and prints score, length, per-tick decision time and
+# how often the bot had to fall back to a move it couldn't prove safe.
+# Then checks the deadline on a 500x500 board with half of it snake, where
+# neither search gets near the end within the budget: the slowest decision
+# must stay within the budget plus MARGIN_US.
+#   python benchmarks/bench_autopilot.py [games] [budget_us] [max_ticks]
+import os, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from autopilot import Autopilot
+from grid import SnakeBody, FreeCells
+from snake_sim import SnakeSim, MODES, DIRS, EV_HIT
+from timing import percentile
+
+BOARDS = [(41, 31), (80, 60), (160, 120)]
+CODES = {d: a for a, d in DIRS.items()}
+MARGIN_US = 500     # clock reads are every 32 cells, plus the final bookkeeping
+
+
+def play(mode, w, h, seed, budget_us, max_ticks):
+    sim = SnakeSim(mode, w, h, seed=seed)
+    pilot = Autopilot(w, h, wrap=MODES[mode]["walls"] == "wrap", budget_us=budget_us, history=max_ticks)
+    hits = best = 0
+    while not sim.over and sim.ticks < max_ticks:
+        d = pilot.next(sim.dx, sim.dy, sim.body, sim.length, sim.food)
+        if sim.step(CODES.get(d, 0) if d != (sim.dx, sim.dy) else 0) & EV_HIT:
+            hits += 1
+        best = max(best, len(sim.body))
+    return sim, pilot, hits, best
+
+
+def slowest_decision(budget_us, w=500, h=500, n=120000, ticks=20, rounds=3):
+    # µs of the slowest decision with the snake folded into the left half
+    # of the board and food moving every tick. The first decision of a round
+    # copies the whole body in (a snake the bot has never seen) and is left
+    # out; the best of a few rounds keeps a preempted tick out of it.
+    cells = []
+    for y in range(h):
+        xs = range(w // 2) if y % 2 == 0 else range(w // 2 - 1, -1, -1)
+        cells.extend((x, y) for x in xs)
+    body = SnakeBody(w, h, cells[:n], free=FreeCells(w, h))
+    best = float("inf")
+    for _ in range(rounds):
+        pilot = Autopilot(w, h, budget_us=budget_us)
+        pilot.next(1, 0, body, n, (w - 1, h - 1))
+        pilot.times.clear()
+        for i in range(1, ticks):
+            pilot.next(1, 0, body, n, (w - 1, h - 1 - i))
+        best = min(best, max(pilot.times) * 1e6)
+    return best
+
+
+if __name__ == "__main__":
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    budget = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    max_ticks = int(sys.argv[3]) if len(sys.argv) > 3 else 5000
+    print(f"{'mode':<9} {'board':>8} {'score':>7} {'length':>7} {'hits':>5} {'ticks':>7}"
+          f" {'mean us':>8} {'p99 us':>7} {'max us':>7} {'fallbk':>7}")
+    for w, h in BOARDS:
+        for mode in MODES:
+            score = length = hits = ticks = fallbacks = 0
+            times = []
+            t0 = time.perf_counter()
+            for seed in range(games):
+                sim, pilot, hit, best = play(mode, w, h, seed, budget, max_ticks)
+                score += sim.score
+                length += best
+                hits += hit
+                ticks += sim.ticks
+                fallbacks += pilot.fallbacks
+                times += [t * 1e6 for t in pilot.times]
+            print(f"{mode:<9} {w:>4}x{h:<3} {score / games:>7.0f} {length / games:>7.0f} {hits:>5}"
+                  f" {ticks:>7} {sum(times) / max(1, len(times)):>8.0f} {percentile(times, 99):>7.0f}"
+                  f" {max(times, default=0):>7.0f} {fallbacks:>7}")
+    worst = slowest_decision(budget)
+    print(f"slowest decision on a 500x500 board, 120000 long: {worst:.0f} us (budget {budget})")
+    assert worst <= budget + MARGIN_US, f"autopilot decision took {worst:.0f} us, budget {budget} + {MARGIN_US}"
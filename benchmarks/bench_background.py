@@ -0,0 +1,43 @@
+# Per-frame background cost: fill + per-line grid vs. one blit of the cached
+# BackgroundLayer, at 1080p and 4K (SDL dummy driver, no window needed).
+#   python benchmarks/bench_background.py [frames]
+import os, sys, time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pygame
+from render import BackgroundLayer
+
+BG_COLOR = (30, 30, 30)
+GRID_COLOR = (50, 50, 50)
+BASE_DIV = 30
+
+
+def old_frame(screen, w, h, block):
+    screen.fill(BG_COLOR)
+    for x in range(0, w, block):
+        pygame.draw.line(screen, GRID_COLOR, (x, 0), (x, h))
+    for y in range(0, h, block):
+        pygame.draw.line(screen, GRID_COLOR, (0, y), (w, y))
+
+
+def timed(fn, frames):
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(frames):
+        fn()
+    return (time.perf_counter() - t0) / frames * 1e3
+
+
+if __name__ == "__main__":
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    pygame.init()
+    for name, (w, h) in (("1080p", (1920, 1080)), ("4K", (3840, 2160))):
+        screen = pygame.display.set_mode((w, h))
+        block = max(16, min(w, h) // BASE_DIV)
+        layer = BackgroundLayer(BG_COLOR, GRID_COLOR)
+        old = timed(lambda: old_frame(screen, w, h, block), frames)
+        new = timed(lambda: layer.draw(screen, block), frames)
+        print(f"{name:>5} block {block}: fill+grid {old:6.3f} ms   cached {new:6.3f} ms")
+    pygame.quit()
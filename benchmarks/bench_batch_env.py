@@ -0,0 +1,30 @@
+# Aggregate steps/sec of BatchSnakeEnv as the batch grows.
+#   python benchmarks/bench_batch_env.py [mode] [steps]
+import os, sys, time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from batch_env import BatchSnakeEnv
+
+
+def bench(n, mode="Classic", steps=200, width=40, height=30):
+    env = BatchSnakeEnv(n, mode, width, height, seed=0)
+    rng = np.random.default_rng(0)
+    actions = rng.integers(0, 5, size=(64, n))
+    env.step(actions[0])  # warm-up
+    t0 = time.perf_counter()
+    for i in range(steps):
+        env.step(actions[i & 63])
+    elapsed = time.perf_counter() - t0
+    return n * steps / elapsed
+
+
+if __name__ == "__main__":
+    mode = sys.argv[1] if len(sys.argv) > 1 else "Classic"
+    steps = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    print(f"{'N':>6}  {'steps/s':>14}")
+    n = 1
+    while n <= 16384:
+        print(f"{n:>6}  {bench(n, mode, steps):>14,.0f}")
+        n *= 4
@@ -0,0 +1,92 @@
+# What gameplay capture (capture.py) costs the game loop, per format.
+#
+# A snake runs laps of the screen at 10 ticks/s, drawn (sliding between
+# ticks) and presented through snake_game at 60 frames/s on the SDL dummy
+# driver, first without capture and then capturing in each format. Reports
+# the game loop's frame work (draw + present + capture) and what capture
+# added to it, and what the writer managed: frames written, repeated and
+# dropped. "slow pipe" feeds an encoder that reads 10 frames/s, to show
+# back-pressure turning into dropped frames rather than a slower game.
+#   python benchmarks/bench_capture.py [seconds]
+import os, shutil, sys, tempfile, time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FPS = 60
+TICKS = 10
+LENGTH = 60
+SLOW_READER = [sys.executable, "-c", "import sys, time\n"
+               "while sys.stdin.buffer.read({frame}):\n    time.sleep(0.1)"]
+
+
+def ring(w, h):
+    # the cells round a rectangle two cells in from the screen's edges
+    x0, y0, x1, y1 = 2, 2, w - 3, h - 3
+    return ([(x, y0) for x in range(x0, x1)] + [(x1, y) for y in range(y0, y1)]
+            + [(x, y1) for x in range(x1, x0, -1)] + [(x0, y) for y in range(y1, y0, -1)])
+
+
+def run(g, capture, seconds):
+    from timing import percentile
+    from capture import FrameCapture
+    from grid import SnakeBody
+    g.capture = capture or FrameCapture()
+    g.reset_view("bench")
+    if capture:
+        capture.start("bench")
+    path = ring(g.SCREEN_W // g.BLOCK, g.SCREEN_H // g.BLOCK)
+    snake = SnakeBody(g.GRID_W, g.GRID_H, path[:LENGTH])
+    pos = LENGTH
+    work = []
+    t0 = next_frame = time.perf_counter()
+    while next_frame - t0 < seconds:
+        start = time.perf_counter()
+        ticks = int((start - t0) * TICKS)
+        while pos < LENGTH + ticks:
+            x, y = path[pos % len(path)]
+            snake.advance(x, y, LENGTH)
+            pos += 1
+        (x0, y0), (x1, y1) = snake[-2], snake[-1]
+        g.draw_snake(snake, x1 - x0, y1 - y0, (start - t0) * TICKS - ticks)
+        g.present()
+        work.append((time.perf_counter() - start) * 1000)
+        next_frame += 1 / FPS
+        time.sleep(max(0.0, next_frame - time.perf_counter()))
+    session = capture and capture.session
+    if capture:
+        capture.close()
+    return percentile(work, 50), percentile(work, 99), session
+
+
+if __name__ == "__main__":
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    import snake_game as g
+    from capture import FrameCapture
+    g.set_board(g.SCREEN_W, g.SCREEN_H, g.BLOCK)
+    frame = g.SCREEN_W * g.SCREEN_H * 4
+    out = tempfile.mkdtemp(prefix="capture-")
+    runs = [("off", None), ("png", FrameCapture("png", out)), ("raw", FrameCapture("raw", out))]
+    if shutil.which("ffmpeg"):
+        runs.append(("ffmpeg pipe", FrameCapture("pipe", out)))
+    slow = " ".join(f"'{a}'" for a in SLOW_READER).format(frame=frame)
+    runs.append(("slow pipe", FrameCapture("pipe", out, cmd=slow)))
+    print(f"screen {g.SCREEN_W}x{g.SCREEN_H}, {FPS} frames/s, {seconds:.0f}s per run")
+    print(f"{'capture':>12} {'work p50':>9} {'p99':>6} {'added p50':>10} {'p99':>6}"
+          f" {'written':>8} {'repeated':>9} {'dropped':>8} {'writer ms':>10}")
+    try:
+        base = None
+        for name, capture in runs:
+            if capture:
+                capture.log = lambda line: None
+            p50, p99, s = run(g, capture, seconds)
+            if base is None:
+                base = p50, p99
+                print(f"{name:>12} {p50:>8.2f}ms {p99:>6.2f}")
+                continue
+            print(f"{name:>12} {p50:>8.2f}ms {p99:>6.2f} {p50 - base[0]:>+9.2f}ms {p99 - base[1]:>+6.2f}"
+                  f" {s.written:>8} {s.held:>9} {s.dropped:>8} {1000 * s.encode / max(1, s.written):>10.1f}",
+                  flush=True)
+    finally:
+        shutil.rmtree(out, ignore_errors=True)
@@ -0,0 +1,94 @@
+# Snake draw cost vs. length: one screen.blit per segment from separate
+# images (the old draw_snake) vs. one screen.blits() call from a SpriteAtlas,
+# both redrawing the whole snake every frame, and blits() over a pre-built
+# sequence (what DirtyRenderer does on a full repaint, where sprites are
+# already classified). SDL dummy driver, no window.
+#   python benchmarks/bench_draw_snake.py [frames]
+import os, sys, time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pygame
+from render import SpriteAtlas
+
+BLOCK = 16
+GRID_W, GRID_H = 120, 90
+LENGTHS = (10, 100, 1000, 5000, 10000)
+NAMES = ("head", "body", "body_h", "tail")
+
+
+def serpentine(n):
+    # n cells snaking row by row, tail first
+    cells = []
+    for y in range(GRID_H):
+        row = range(GRID_W) if y % 2 == 0 else range(GRID_W - 1, -1, -1)
+        for x in row:
+            cells.append((x, y))
+            if len(cells) == n:
+                return cells
+    return cells
+
+
+def images():
+    imgs = {}
+    for i, name in enumerate(NAMES):
+        surf = pygame.Surface((BLOCK, BLOCK), pygame.SRCALPHA).convert_alpha()
+        surf.fill((60 * i, 200, 80, 255))
+        imgs[name] = surf
+    return imgs
+
+
+def classify(cells):
+    # sprite name per segment, the way draw_snake picks them
+    n = len(cells)
+    out = []
+    for i, (x, y) in enumerate(cells):
+        if i == n - 1:
+            out.append("head")
+        elif i == 0:
+            out.append("tail")
+        elif cells[i - 1][0] == cells[i + 1][0]:
+            out.append("body")
+        else:
+            out.append("body_h")
+    return out
+
+
+def per_segment(screen, cells, imgs):
+    for (x, y), name in zip(cells, classify(cells)):
+        screen.blit(imgs[name], (x * BLOCK, y * BLOCK))
+
+
+def batched(screen, cells, atlas):
+    surf, rects = atlas.surface, atlas.rects
+    screen.blits([(surf, (x * BLOCK, y * BLOCK), rects[name]) for (x, y), name in zip(cells, classify(cells))],
+                 doreturn=False)
+
+
+def prebuilt(screen, seq):
+    screen.blits(seq, doreturn=False)
+
+
+def timed(fn, frames):
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(frames):
+        fn()
+    return (time.perf_counter() - t0) / frames * 1e3
+
+
+if __name__ == "__main__":
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    pygame.init()
+    screen = pygame.display.set_mode((GRID_W * BLOCK, GRID_H * BLOCK))
+    imgs = images()
+    atlas = SpriteAtlas(imgs)
+    print(f"{'length':>8} {'blit/segment ms':>16} {'atlas blits ms':>15} {'pre-built ms':>13} {'speedup':>8}")
+    for n in LENGTHS:
+        cells = serpentine(n)
+        seq = [(atlas.surface, (x * BLOCK, y * BLOCK), atlas.rects[name]) for (x, y), name in zip(cells, classify(cells))]
+        old = timed(lambda: per_segment(screen, cells, imgs), frames)
+        new = timed(lambda: batched(screen, cells, atlas), frames)
+        pre = timed(lambda: prebuilt(screen, seq), frames)
+        print(f"{n:>8} {old:>16.3f} {new:>15.3f} {pre:>13.3f} {old / pre:>7.2f}x")
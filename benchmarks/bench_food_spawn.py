@@ -0,0 +1,64 @@
+# Food spawn cost on a board filled to 99% by the snake: the old
+# list-scan get_valid_food_position vs. the FreeCells index.
+#   python benchmarks/bench_food_spawn.py [width] [height]
+import os, sys, random, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from grid import SnakeBody, FreeCells
+
+
+def old_spawn(snake, w, h, hud_w, hud_h, blocked=()):
+    # the pre-index algorithm, on cells: random probes with an O(n) list
+    # membership test, then a full-board scan
+    blocked_set = set(blocked)
+    for _ in range(max(100, w * h)):
+        x, y = random.randrange(w), random.randrange(h)
+        if x < hud_w and y < hud_h:
+            continue
+        if [x, y] in snake or (x, y) in blocked_set:
+            continue
+        return x, y
+    for y in range(h):
+        for x in range(w):
+            if x < hud_w and y < hud_h:
+                continue
+            if [x, y] in snake or (x, y) in blocked_set:
+                continue
+            return x, y
+    return None, None
+
+
+def serpentine(w, h):
+    for y in range(h):
+        xs = range(w) if y % 2 == 0 else range(w - 1, -1, -1)
+        for x in xs:
+            yield x, y
+
+
+def bench(w=54, h=30, fill=0.99, hud=(6, 3), reps=20):
+    cells = list(serpentine(w, h))
+    n = int(len(cells) * fill)
+    body = SnakeBody(w, h, cells[:n], free=FreeCells(w, h, hud=hud))
+    snake_list = [[x, y] for x, y in cells[:n]]
+    rng = random.Random(0)
+
+    t0 = time.perf_counter()
+    for _ in range(reps):
+        old_spawn(snake_list, w, h, *hud)
+    old = (time.perf_counter() - t0) / reps
+
+    reps_new = reps * 1000
+    t0 = time.perf_counter()
+    for _ in range(reps_new):
+        body.free.sample(rng, [(0, 0)])
+    new = (time.perf_counter() - t0) / reps_new
+    return n, old, new
+
+
+if __name__ == "__main__":
+    w = int(sys.argv[1]) if len(sys.argv) > 1 else 54
+    h = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    for fill in (0.5, 0.9, 0.99):
+        n, old, new = bench(w, h, fill)
+        print(f"{w}x{h} fill {fill:.0%} (len {n}): old {old * 1e3:9.3f} ms   "
+              f"index {new * 1e6:6.2f} us   x{old / new:,.0f}")
@@ -0,0 +1,40 @@
+# CPU use of the idle start menu and game-over screen (SDL dummy driver).
+# Each screen runs untouched for a few seconds in a child process; reports
+# process CPU time / wall time.
+#   python benchmarks/bench_idle_cpu.py [seconds]
+import os, subprocess, sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import atexit, os, sys, time
+sys.path.insert(0, {root!r})
+os.chdir({root!r})
+import pygame
+import snake_game as g
+t0, c0 = time.perf_counter(), time.process_time()
+@atexit.register
+def report():
+    wall, cpu = time.perf_counter() - t0, time.process_time() - c0
+    print(f"{{sys.argv[1]:>10}}: {{cpu:.2f}}s CPU over {{wall:.2f}}s -> {{100 * cpu / wall:.1f}}% of a core")
+pygame.time.set_timer(pygame.QUIT, int({seconds} * 1000), 1)
+if sys.argv[1] == "menu":
+    g.start_menu()
+else:
+    g.game_over_screen("Classic", 120)
+"""
+
+
+def run(screen, seconds):
+    env = dict(os.environ, SDL_VIDEODRIVER="dummy", SDL_AUDIODRIVER="dummy",
+               PYGAME_HIDE_SUPPORT_PROMPT="1")
+    code = CHILD.format(root=ROOT, seconds=seconds)
+    out = subprocess.run([sys.executable, "-W", "ignore", "-c", code, screen],
+                         env=env, capture_output=True, text=True)
+    return out.stdout.strip() or out.stderr.strip()
+
+
+if __name__ == "__main__":
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    for screen in ("menu", "game_over"):
+        print(run(screen, seconds))
@@ -0,0 +1,64 @@
+# Frame cost on large scrolling boards vs. board size and snake length.
+#
+# The snake lies folded back and forth in a 64-column strip of the board and
+# crawls along it, one cell per frame, with the camera following its head,
+# so the view scrolls (and is repainted whole) on most frames. Through
+# snake_game's renderer on the SDL dummy driver, at the dummy screen size.
+# Frame time should level off once the snake fills the view, and not grow
+# with the board or with the part of the snake that is off screen.
+#   python benchmarks/bench_large_board.py [frames]
+import os, sys, time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BOARDS = [(200, 200), (500, 500), (1000, 1000)]
+LENGTHS = [10, 1000, 3000, 10000]
+STRIP = 64
+
+
+def strip_path(h):
+    # back and forth along rows of the first STRIP columns
+    cells = []
+    for y in range(h):
+        xs = range(STRIP) if y % 2 == 0 else range(STRIP - 1, -1, -1)
+        cells.extend((x, y) for x in xs)
+    return cells
+
+
+def run(g, w, h, n, frames):
+    import pygame
+    from timing import percentile
+    from grid import SnakeBody, FreeCells
+    g.set_board(g.SCREEN_W, g.SCREEN_H, g.BLOCK, (w, h))
+    g.snake_layer.clear()
+    g.renderer.reset()
+    g.renderer.scroll(0, 0)
+    g.camera = g.Camera((g.SCREEN_W, g.SCREEN_H), (w * g.BLOCK, h * g.BLOCK))
+    path = strip_path(h)
+    snake = SnakeBody(w, h, path[:n], free=FreeCells(w, h))
+    pos = n
+    times = []
+    for _ in range(frames):
+        t0 = time.perf_counter()
+        (x0, y0), (x, y) = snake[-1], path[pos]
+        snake.advance(x, y, n)
+        pos += 1
+        g.draw_snake(snake, x - x0, y - y0)
+        g.present()
+        times.append((time.perf_counter() - t0) * 1000)
+    visible = len(g.renderer._visible(pygame.Rect(0, 0, g.SCREEN_W, g.SCREEN_H)))
+    return sum(times) / len(times), percentile(times, 95), visible, len(g.renderer.sprites)
+
+
+if __name__ == "__main__":
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    import snake_game as g
+    g.use_assets("game")
+    print(f"screen {g.SCREEN_W}x{g.SCREEN_H}, {g.BLOCK}px cells: {g.SCREEN_W // g.BLOCK}x{g.SCREEN_H // g.BLOCK} in view")
+    print(f"{'board':>10} {'length':>7} {'frame ms':>9} {'p95 ms':>7} {'drawn':>6} {'sprites':>8}")
+    for w, h in BOARDS:
+        for n in LENGTHS:
+            mean, p95, visible, sprites = run(g, w, h, n, frames)
+            print(f"{w:>5}x{h:<4} {n:>7} {mean:>9.3f} {p95:>7.3f} {visible:>6} {sprites:>8}")
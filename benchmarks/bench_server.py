@@ -0,0 +1,162 @@
+# Load generator for server.py: opens one connection per room over
+# localhost, each playing its own game with random turns (and joining a new
+# one when it ends), then asks the server for its own numbers: ticks/s,
+# bytes out, how late ticks ran and how much CPU the server process used.
+# Rooms per core is the room count over the server's share of one core,
+# as long as ticks still ran on time.
+#   python benchmarks/bench_server.py [rooms ...] [--seconds S] [--modes Classic,Zen]
+#                                     [--connect HOST:PORT]
+# Without --connect a server is started for the run (one process, so one
+# core). On a single-core machine the load generator competes with it for
+# that core, which shows up as lateness but not in the server's CPU figure.
+import asyncio, os, random, subprocess, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import netproto as net
+from snake_sim import MODES, DIRS
+
+ROOMS = [250, 500, 1000, 2000]
+ON_TIME_MS = 50     # p99 tick lateness past which the server counts as overloaded
+BOARD = (40, 30)
+RAMP = 200          # connections opened at a time
+TURN_EVERY = 1.0    # mean seconds between a bot's turns
+
+
+class Bot(asyncio.Protocol):
+    def __init__(self, load, mode):
+        self.load = load
+        self.mode = mode
+        self.frames = net.FrameReader()
+        self.transport = None
+        self.reply = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        transport.write(net.join(self.mode, 0, BOARD))
+
+    def data_received(self, data):
+        load = self.load
+        load.bytes += len(data)
+        for payload in self.frames.feed(data):
+            load.frames += 1
+            kind = payload[0]
+            if kind == net.OVER:
+                load.games += 1
+                self.transport.write(net.join(self.mode, 0, BOARD))
+            elif kind == net.ERROR:
+                load.errors += 1
+            elif kind == net.STATS and self.reply:
+                self.reply.set_result(net.decode(payload)[1])
+                self.reply = None
+
+    def connection_lost(self, exc):
+        self.load.lost += 1
+
+    async def stats(self):
+        self.reply = asyncio.get_running_loop().create_future()
+        self.transport.write(net.stats_request())
+        return await self.reply
+
+
+class Load:
+    def __init__(self):
+        self.bytes = self.frames = self.games = self.errors = self.lost = 0
+
+
+async def run(host, port, rooms, seconds, modes):
+    loop = asyncio.get_running_loop()
+    load = Load()
+    bots = []
+    for i in range(0, rooms, RAMP):
+        made = await asyncio.gather(*(loop.create_connection(lambda: Bot(load, random.choice(modes)), host, port)
+                                      for _ in range(min(RAMP, rooms - i))))
+        bots += [bot for _, bot in made]
+    _, control = await loop.create_connection(lambda: Bot(load, modes[0]), host, port)
+    control.transport.write(net.leave())   # a player without a room
+
+    async def steer():
+        actions = list(DIRS)
+        while True:
+            await asyncio.sleep(0.05)
+            for bot in random.sample(bots, max(1, int(len(bots) * 0.05 / TURN_EVERY))):
+                bot.transport.write(net.turn(random.choice(actions)))
+
+    steering = asyncio.create_task(steer())
+    await asyncio.sleep(2)      # warm up
+    s0, f0, t0 = await control.stats(), load.frames, time.perf_counter()
+    await asyncio.sleep(seconds)
+    s1, f1, t1 = await control.stats(), load.frames, time.perf_counter()
+    steering.cancel()
+    for bot in bots + [control]:
+        bot.transport.close()
+    await asyncio.sleep(0.5)
+    wall = s1["uptime"] - s0["uptime"]
+    ticks = s1["ticks"] - s0["ticks"]
+    cpu = (s1["cpu"] - s0["cpu"]) / wall
+    return {"rooms": s1["rooms"], "ticks_s": ticks / wall, "frames_s": (f1 - f0) / (t1 - t0),
+            "kib_s": (s1["bytes"] - s0["bytes"]) / wall / 1024, "bytes_tick": (s1["bytes"] - s0["bytes"]) / max(1, ticks),
+            "cpu": cpu, "lag": s1["lag_ms"], "skipped": s1["skipped"] - s0["skipped"],
+            "dropped": s1["dropped"] - s0["dropped"], "games": load.games, "errors": load.errors,
+            "per_core": s1["rooms"] / cpu if cpu else 0.0}
+
+
+def start_server():
+    proc = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                                          "server.py"), "--port", "0", "--max-rooms", "100000"],
+                            stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline()
+    host, port = line.rsplit(" ", 1)[1].strip().rsplit(":", 1)
+    return proc, host, int(port)
+
+
+def main(argv):
+    rooms, seconds, modes, connect = [], 5.0, list(MODES), None
+    i = 0
+    while i < len(argv):
+        if argv[i] == "--seconds":
+            seconds = float(argv[i + 1])
+            i += 1
+        elif argv[i] == "--modes":
+            modes = argv[i + 1].split(",")
+            i += 1
+        elif argv[i] == "--connect":
+            connect = argv[i + 1]
+            i += 1
+        else:
+            rooms.append(int(argv[i]))
+        i += 1
+    proc = None
+    if connect:
+        host, port = connect.rsplit(":", 1)
+        port = int(port)
+    else:
+        proc, host, port = start_server()
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except (ImportError, ValueError, OSError):
+        pass
+    print(f"server {host}:{port}, modes {','.join(modes)}, {seconds:.0f}s per run")
+    print(f"{'rooms':>6} {'ticks/s':>8} {'deltas/s':>9} {'KiB/s':>7} {'B/tick':>7} {'cpu':>5}"
+          f" {'lag p50':>8} {'p99':>6} {'max':>6} {'skip':>5} {'drop':>5} {'rooms/core':>10}")
+    try:
+        for n in rooms or ROOMS:
+            r = asyncio.run(run(host, port, n, seconds, modes))
+            lag = r["lag"]
+            on_time = not r["skipped"] and lag["p99"] <= ON_TIME_MS
+            print(f"{r['rooms']:>6} {r['ticks_s']:>8,.0f} {r['frames_s']:>9,.0f} {r['kib_s']:>7.0f}"
+                  f" {r['bytes_tick']:>7.1f} {100 * r['cpu']:>4.0f}% {lag['p50']:>7.1f}ms {lag['p99']:>5.1f}"
+                  f" {lag['max']:>6.1f} {r['skipped']:>5} {r['dropped']:>5}"
+                  f" {format(r['per_core'], ',.0f') if on_time else 'overloaded':>10}", flush=True)
+            if r["errors"]:
+                print(f"  {r['errors']} error replies")
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
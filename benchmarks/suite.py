@@ -0,0 +1,295 @@
+# Benchmark suite for the game's hot paths, on the SDL dummy drivers.
+#
+# Each case times one operation of the real game code (food spawn,
+# self-collision/move, snake drawing, background, HUD, a whole frame, a
+# simulation tick, an autopilot decision) over a grid of board sizes, snake lengths and modes.
+# The snake runs along a Hamiltonian cycle of the board, so it can move
+# forever at any length without dying.
+#
+#   python benchmarks/suite.py run [--quick] [-k SUBSTR] [--out FILE] [--save-baseline]
+#   python benchmarks/suite.py compare [BASE] [NEW] [--threshold 0.15]
+#
+# run writes JSON to benchmarks/results/ (and baseline.json with
+# --save-baseline). compare defaults to baseline.json vs. the newest run and
+# exits 1 if any case got slower than the threshold. It compares the best of
+# the repeats, which is far less noisy than the median for µs-sized ops.
+import os, sys, json, time, random, platform, subprocess
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+BASELINE = os.path.join(RESULTS_DIR, "baseline.json")
+FOOD_RNG = random.Random()     # food draws, as SnakeSim.spawn_food makes them
+
+BOARDS = [(32, 24), (64, 48), (128, 96)]
+LENGTHS = [10, 300, 3000]
+MODES = ["Classic", "Timed", "Hardcore", "Survival", "Zen"]
+
+
+def cycle(w, h):
+    # Hamiltonian cycle: rows back and forth over columns 1.., then back up
+    # column 0 (needs an even height)
+    cells = []
+    for y in range(h):
+        xs = range(1, w) if y % 2 == 0 else range(w - 1, 0, -1)
+        cells.extend((x, y) for x in xs)
+    cells.extend((0, y) for y in range(h - 1, -1, -1))
+    return cells
+
+
+class Board:
+    # a game board of w x h cells with a snake of the given length on it,
+    # drawn through snake_game's renderer on a screen of the same size
+    def __init__(self, g, w, h, length):
+        import pygame
+        self.g = g
+        g.set_board(w * g.BLOCK, h * g.BLOCK, g.BLOCK)
+        g.screen = pygame.display.set_mode((w * g.BLOCK, h * g.BLOCK))
+        g.snake_layer.clear()
+        g.renderer.reset()
+        self.path = cycle(w, h)
+        self.length = length
+        from grid import SnakeBody, FreeCells
+        self.snake = SnakeBody(w, h, self.path[:length], free=FreeCells(w, h, hud=(g.HUD_W, g.HUD_H)))
+        self.pos = length % len(self.path)
+        self.food = self.snake.free.sample(FOOD_RNG)
+        self.score = 0
+
+    def move(self):
+        x, y = self.path[self.pos]
+        self.pos = (self.pos + 1) % len(self.path)
+        hit = self.snake.advance(x, y, self.length)
+        if (x, y) == self.food:
+            self.food = self.snake.free.sample(FOOD_RNG)
+            self.score += 10
+        return hit
+
+    def heading(self):
+        (x0, y0), (x1, y1) = self.snake[-2], self.snake[-1]
+        return x1 - x0, y1 - y0
+
+    def draw(self, mode="Classic"):
+        g = self.g
+        g.draw_items(self.food[0], self.food[1], False, 0, 0)
+        g.draw_snake(self.snake, *self.heading())
+        g.show_score_and_high(mode, self.score)
+        g.present()
+
+
+def cases(quick=False):
+    # (name, params, setup) where setup(g) returns the op to time
+    boards = BOARDS[:2] if quick else BOARDS
+    lengths = LENGTHS[:2] if quick else LENGTHS
+    out = []
+
+    def sized(w, h):
+        return [n for n in lengths if n < w * h - 1]
+
+    for w, h in boards:
+        for n in sized(w, h):
+            p = {"board": f"{w}x{h}", "len": n}
+
+            def food(g, w=w, h=h, n=n):
+                b = Board(g, w, h, n)
+                return lambda: b.snake.free.sample(FOOD_RNG, (b.food,))
+
+            def advance(g, w=w, h=h, n=n):
+                b = Board(g, w, h, n)
+                return b.move
+
+            def draw_snake(g, w=w, h=h, n=n):
+                b = Board(g, w, h, n)
+                b.draw()
+
+                def op():
+                    b.move()
+                    g.draw_snake(b.snake, *b.heading())
+                    g.present()
+                return op
+
+            def draw_snake_full(g, w=w, h=h, n=n):
+                b = Board(g, w, h, n)
+
+                def op():
+                    g.snake_layer.clear()
+                    g.renderer.invalidate()
+                    g.draw_snake(b.snake, *b.heading())
+                    g.present()
+                return op
+
+            def frame(g, w=w, h=h, n=n):
+                b = Board(g, w, h, n)
+                b.draw()
+
+                def op():
+                    b.move()
+                    b.draw()
+                return op
+
+            out += [("food_spawn", p, food), ("advance", p, advance), ("draw_snake", p, draw_snake),
+                    ("draw_snake_full", p, draw_snake_full), ("frame", p, frame)]
+
+        def grid(g, w=w, h=h):
+            b = Board(g, w, h, 2)
+            return lambda: g.background.draw(g.screen, g.BLOCK)
+        out.append(("draw_grid", {"board": f"{w}x{h}"}, grid))
+
+        def pilot(g, w=w, h=h):
+            from autopilot import Autopilot
+            from snake_sim import SnakeSim, DIRS
+            codes = {d: a for a, d in DIRS.items()}
+            sim = SnakeSim("Classic", w, h, seed=0)
+            bot = Autopilot(w, h)
+
+            def op():
+                d = bot.next(sim.dx, sim.dy, sim.body, sim.length, sim.food)
+                sim.step(codes[d] if d != (sim.dx, sim.dy) else 0)
+                if sim.over:
+                    sim.reset(0)
+            return op
+        out.append(("autopilot_tick", {"board": f"{w}x{h}"}, pilot))
+
+    for mode in MODES:
+        def hud(g, mode=mode):
+            b = Board(g, *BOARDS[0], 10)
+            b.draw(mode)
+            scores = iter(range(0, 10 ** 9, 10))
+
+            def op():
+                g.show_score_and_high(mode, next(scores))
+                g.present()
+            return op
+
+        def tick(g, mode=mode):
+            from snake_sim import SnakeSim
+            sim = SnakeSim(mode, *BOARDS[0], seed=0)
+            rng = random.Random(0)
+            actions = [rng.randrange(5) for _ in range(4096)]
+            state = {"i": 0}
+
+            def op():
+                i = state["i"] = state["i"] + 1
+                sim.step(actions[i & 4095])
+                if sim.over:
+                    sim.reset(i)
+            return op
+
+        out += [("hud", {"mode": mode}, hud), ("sim_tick", {"mode": mode, "board": "%dx%d" % BOARDS[0]}, tick)]
+    return out
+
+
+def case_id(name, params):
+    return name + "[" + ",".join(f"{k}={v}" for k, v in params.items()) + "]"
+
+
+def measure(op, repeats=7, target=0.02):
+    # per-op seconds: calibrate a batch to ~target seconds, time `repeats` batches
+    op()
+    n = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(n):
+            op()
+        dt = time.perf_counter() - t0
+        if dt >= target / 4 or n >= 1 << 20:
+            break
+        n *= 4
+    n = max(1, int(n * target / max(dt, 1e-9)))
+    runs = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        for _ in range(n):
+            op()
+        runs.append((time.perf_counter() - t0) / n)
+    runs.sort()
+    return {"median_us": runs[len(runs) // 2] * 1e6, "min_us": runs[0] * 1e6,
+            "max_us": runs[-1] * 1e6, "n": n, "repeats": repeats}
+
+
+def git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip()
+    except Exception:
+        return ""
+
+
+def run(argv):
+    quick = "--quick" in argv
+    filt = argv[argv.index("-k") + 1] if "-k" in argv else ""
+    out = argv[argv.index("--out") + 1] if "--out" in argv else None
+    import pygame
+    import snake_game as g
+    g.use_assets("game")
+    results = {}
+    for name, params, setup in cases(quick):
+        cid = case_id(name, params)
+        if filt not in cid:
+            continue
+        random.seed(0)
+        FOOD_RNG.seed(0)
+        r = measure(setup(g), repeats=3 if quick else 7)
+        results[cid] = r
+        print(f"{cid:<52} {r['median_us']:>12.2f} us")
+    data = {
+        "meta": {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "git": git_rev(), "python": platform.python_version(),
+                 "pygame": pygame.version.ver, "platform": platform.platform(), "quick": quick},
+        "results": results,
+    }
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    paths = [out or os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")]
+    if "--save-baseline" in argv:
+        paths.append(BASELINE)
+    for path in paths:
+        with open(path, "w") as f:
+            json.dump(data, f, indent=1)
+        print("wrote", path)
+    return 0
+
+
+def newest_result():
+    if not os.path.isdir(RESULTS_DIR):
+        return None
+    files = [os.path.join(RESULTS_DIR, f) for f in os.listdir(RESULTS_DIR)
+             if f.endswith(".json") and f != "baseline.json"]
+    return max(files, key=os.path.getmtime) if files else None
+
+
+def compare(argv):
+    threshold = float(argv[argv.index("--threshold") + 1]) if "--threshold" in argv else 0.15
+    files = [a for a in argv if a.endswith(".json")]
+    base = files[0] if files else BASELINE
+    new = files[1] if len(files) > 1 else newest_result()
+    if not new or not os.path.exists(base):
+        print("nothing to compare: run the suite (with --save-baseline once) first")
+        return 2
+    with open(base) as f:
+        a = json.load(f)["results"]
+    with open(new) as f:
+        b = json.load(f)["results"]
+    print(f"{os.path.basename(base)} -> {os.path.basename(new)}  (threshold {threshold:.0%})")
+    regressions = 0
+    for cid in sorted(set(a) & set(b)):
+        old_t, new_t = a[cid]["min_us"], b[cid]["min_us"]
+        change = new_t / old_t - 1
+        flag = ""
+        if change > threshold:
+            flag = "REGRESSION"
+            regressions += 1
+        elif change < -threshold:
+            flag = "faster"
+        print(f"{cid:<52} {old_t:>11.2f} {new_t:>11.2f} us {change:>+8.1%}  {flag}")
+    missing = len(set(a) - set(b)), len(set(b) - set(a))
+    if any(missing):
+        print(f"({missing[0]} cases only in base, {missing[1]} only in new)")
+    print(f"{regressions} regression(s)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "run"
+    if cmd == "compare":
+        sys.exit(compare(sys.argv[2:]))
+    sys.exit(run(sys.argv[2:]))
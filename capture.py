@@ -0,0 +1,281 @@
+# Gameplay capture: every presented frame of a game, saved without holding
+# up the game loop.
+#
+#   png    <dir>/<game>/frame-000000.png, one file per frame slot
+#   raw    <dir>/<game>.raw, the frames back to back as rawvideo
+#   pipe   the same raw frames into an encoder's stdin (ffmpeg writing
+#          <dir>/<game>.mp4 unless another command is given)
+#
+# The game loop only copies the screen into a Surface from a small pool (one
+# blit) and queues it; a writer thread per game converts, compresses and
+# writes the frames. When the writer falls behind and the pool runs dry the
+# frame is dropped, never waited for. Frames are placed on a fixed-rate
+# timeline (fps) by when they were presented: a slot without a new frame
+# (dropped, or nothing changed on screen) repeats the previous frame in raw
+# and pipe output, and is a gap in the PNG numbering.
+import os, queue, shlex, struct, subprocess, sys, threading, time, zlib
+from collections import deque
+
+import pygame
+
+from timing import percentile
+
+FORMATS = ("png", "raw", "pipe")
+CAPTURE_FPS = 60
+POOL = 8
+PNG_LEVEL = 1       # zlib level: fast beats small for a frame every 16 ms
+BAND = 64           # rows converted between GIL hand-backs
+WRITER_NICE = 10    # writer thread priority (Linux)
+PIPE_CMD = ("ffmpeg -loglevel error -y -f rawvideo -pix_fmt {pix_fmt} -s {w}x{h} -r {fps} -i -"
+            " -c:v libx264 -preset ultrafast -pix_fmt yuv420p {name}.mp4")
+
+
+def raw_format(surf):
+    # ffmpeg pix_fmt of the surface's own pixel bytes when they can be
+    # written as they are, else None (converted to rgb24)
+    if surf.get_bytesize() != 4 or surf.get_pitch() != surf.get_width() * 4:
+        return None
+    masks = surf.get_masks()[:3]
+    little = sys.byteorder == "little"
+    if masks == (0xFF0000, 0xFF00, 0xFF):
+        return "bgr0" if little else "0rgb"
+    if masks == (0xFF, 0xFF00, 0xFF0000):
+        return "rgb0" if little else "0bgr"
+    return None
+
+
+def png_bytes(surf, level=PNG_LEVEL):
+    # zlib does the compressing (and lets go of the GIL while it does): about
+    # six times faster than pygame.image.save at level 1. The pixels are
+    # converted a band of rows at a time, handing the GIL back in between so
+    # the game loop never waits on a whole frame's conversion.
+    w, h = surf.get_size()
+    stride = w * 3
+    rows = bytearray((stride + 1) * h)      # each row: filter type 0, then its pixels
+    for top in range(0, h, BAND):
+        n = min(BAND, h - top)
+        rgb = memoryview(pygame.image.tobytes(surf.subsurface((0, top, w, n)), "RGB"))
+        for y in range(n):
+            at = (top + y) * (stride + 1) + 1
+            rows[at:at + stride] = rgb[y * stride:(y + 1) * stride]
+        time.sleep(0)
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(rows, level)) + chunk(b"IEND", b""))
+
+
+class PngWriter:
+    def __init__(self, path):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+
+    def write(self, surf, slot):
+        data = png_bytes(surf)
+        with open(os.path.join(self.path, f"frame-{slot:06d}.png"), "wb") as f:
+            f.write(data)
+
+    def repeat(self, surf, n):
+        pass        # a gap in the numbering
+
+    def close(self):
+        return f"{self.path}/frame-*.png"
+
+
+class RawWriter:
+    # frames back to back into a file or an encoder's stdin
+    def __init__(self, out, pix_fmt, proc=None, name=None):
+        self.out = out
+        self.pix_fmt = pix_fmt
+        self.proc = proc
+        self.name = name
+
+    def frame_bytes(self, surf):
+        if self.pix_fmt == "rgb24":
+            return pygame.image.tobytes(surf, "RGB")
+        return surf.get_view("1")
+
+    def write(self, surf, slot):
+        self.out.write(self.frame_bytes(surf))
+
+    def repeat(self, surf, n):
+        data = self.frame_bytes(surf)
+        for _ in range(n):
+            self.out.write(data)
+
+    def close(self):
+        self.out.close()
+        if self.proc:
+            status = self.proc.wait()
+            if status:
+                print(f"[capture warning] encoder exited with status {status}")
+        return self.name
+
+
+class Session:
+    # one game's capture: the game loop's side and the writer's counters
+    def __init__(self, name, title):
+        self.name = name
+        self.title = title
+        self.jobs = queue.Queue()
+        self.free = None        # the pool its frames come from and go back to
+        self.size = None
+        self.t0 = None
+        self.slot = -1          # last slot given a frame
+        self.stale = True       # the screen changed since that frame
+        self.dropped = 0
+        self.copy = deque(maxlen=20000)     # seconds per copy, game loop side
+        self.written = 0
+        self.held = 0
+        self.encode = 0.0
+        self.failed = False
+
+
+class FrameCapture:
+    def __init__(self, fmt="png", out_dir="captures", fps=CAPTURE_FPS, cmd=None, pool=POOL):
+        self.fmt = fmt
+        self.out_dir = out_dir
+        self.fps = fps
+        self.cmd = cmd or PIPE_CMD
+        self.pool_size = pool
+        self.enabled = False
+        self.free = None        # pooled Surfaces of the display's size, made on the first frame
+        self.size = None
+        self.session = None
+        self.threads = []
+        self.log = print        # where each game's report goes
+
+    def start(self, title):
+        self.stop()
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{title}"
+        self.session = Session(os.path.join(self.out_dir, name), title)
+
+    def grab(self, surface, changed=True):
+        # copy the presented frame if its slot on the timeline is free; the
+        # copy is all the game loop pays
+        s = self.session
+        if s is None:
+            return
+        now = time.perf_counter()
+        size = surface.get_size()
+        if size != self.size:
+            # first frame, or the display changed size: a pool of the new
+            # size, and a new file if this one already has frames of the old
+            self._make_pool(surface)
+            if s.t0 is not None:
+                self.start(f"{s.title}-{size[0]}x{size[1]}")
+                s = self.session
+        if s.t0 is None:
+            s.t0 = now
+            self._start_writer(s, surface)
+        s.stale = s.stale or changed
+        slot = int((now - s.t0) * self.fps)
+        if not s.stale or slot <= s.slot:
+            return
+        try:
+            surf = self.free.get_nowait()
+        except queue.Empty:
+            s.dropped += 1      # still stale: the next frame tries again
+            return
+        surf.blit(surface, (0, 0))
+        s.jobs.put((slot, surf))
+        s.slot = slot
+        s.stale = False
+        s.copy.append(time.perf_counter() - now)
+
+    def stop(self):
+        # end the game's capture; the writer finishes on its own
+        s = self.session
+        if s is None:
+            return
+        self.session = None
+        if s.t0 is not None:
+            s.jobs.put((int((time.perf_counter() - s.t0) * self.fps), None))
+
+    def close(self, timeout=30):
+        # at exit: let the writers finish their files
+        self.stop()
+        for t in self.threads:
+            t.join(timeout)
+
+    def _make_pool(self, surface):
+        # surfaces of the old pool go back to it and are dropped with it
+        self.size = surface.get_size()
+        self.free = queue.SimpleQueue()
+        for _ in range(self.pool_size):
+            self.free.put(pygame.Surface(self.size, 0, surface))
+
+    def _start_writer(self, s, surface):
+        s.free, s.size = self.free, self.size
+        self.threads = [t for t in self.threads if t.is_alive()]
+        t = threading.Thread(target=self._write, args=(s, raw_format(surface) or "rgb24"), daemon=True)
+        self.threads.append(t)
+        t.start()
+
+    def _open(self, s, pix_fmt):
+        w, h = s.size
+        if self.fmt == "png":
+            return PngWriter(s.name)
+        os.makedirs(self.out_dir, exist_ok=True)
+        if self.fmt == "raw":
+            return RawWriter(open(s.name + ".raw", "wb"), pix_fmt, name=f"{s.name}.raw ({pix_fmt} {w}x{h})")
+        args = [a.format(w=w, h=h, fps=self.fps, pix_fmt=pix_fmt, name=s.name) for a in shlex.split(self.cmd)]
+        proc = subprocess.Popen(args, stdin=subprocess.PIPE)
+        return RawWriter(proc.stdin, pix_fmt, proc, " ".join(args))
+
+    def _write(self, s, pix_fmt):
+        if sys.platform.startswith("linux"):
+            # the game thread comes first when both want the same core
+            try:
+                os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), WRITER_NICE)
+            except OSError:
+                pass
+        try:
+            out = self._open(s, pix_fmt)
+        except (OSError, ValueError) as e:
+            print(f"[capture warning] couldn't start {self.fmt} capture: {e}")
+            out = None
+            s.failed = True
+        prev, last = None, -1
+        while True:
+            slot, surf = s.jobs.get()
+            try:
+                if out and prev is not None and slot > last + 1:
+                    out.repeat(prev, slot - last - 1)
+                    s.held += slot - last - 1
+                if surf is not None and out:
+                    t = time.perf_counter()
+                    out.write(surf, slot)
+                    s.encode += time.perf_counter() - t
+                    s.written += 1
+            except (OSError, ValueError) as e:    # a closed pipe is an OSError
+                print(f"[capture warning] stopped writing {s.name}: {e}")
+                try:
+                    out.close()
+                except OSError:
+                    pass
+                out = None
+                s.failed = True
+            if prev is not None:
+                s.free.put(prev)
+            if surf is None:
+                break
+            prev, last = surf, slot
+        where = None
+        if out:
+            try:
+                where = out.close()
+            except OSError as e:
+                print("[capture warning]", e)
+        self.log(self.report(s, where))
+
+    def report(self, s, where=None):
+        copy = [t * 1000 for t in s.copy]
+        frames = s.written + s.held
+        return (f"[capture] {where or s.name}: {frames} frames at {self.fps} fps ({frames / self.fps:.1f} s),"
+                f" {s.written} new, {s.held} repeated, {s.dropped} dropped;"
+                f" game loop +{percentile(copy, 50):.2f} ms/frame (p99 {percentile(copy, 99):.2f}),"
+                f" writer {1000 * s.encode / max(1, s.written):.1f} ms/frame"
+                f"{' (failed)' if s.failed else ''}")
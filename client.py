@@ -0,0 +1,218 @@
+# Thin client for server.py: the game runs on the server. This sends the
+# arrow keys as turns, applies the server's snapshots and deltas to a local
+# copy of the board, and draws that with the game's own renderer and HUD.
+#
+#   python client.py [HOST:PORT] [--mode Classic] [--seed N]
+#
+# It asks for a board the size of this screen (or --board WxH, which
+# scrolls as in the game). A reader thread decodes frames from the socket
+# into a queue; each frame the game loop applies whatever has arrived. The
+# snake slides between ticks using the time since the last delta, so it
+# moves as smoothly as in a local game.
+import queue, socket, sys, threading, time
+
+import netproto as net
+import snake_game as g
+from grid import SnakeBody
+from snake_sim import EV_FOOD, EV_GOLDEN
+from replay import CODES
+
+DEFAULT_SERVER = "127.0.0.1:7777"
+
+
+class Connection:
+    def __init__(self, host, port):
+        self.sock = socket.create_connection((host, port), timeout=5)
+        self.sock.settimeout(None)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.inbox = queue.Queue()
+        self.thread = threading.Thread(target=self._read, daemon=True)
+        self.thread.start()
+
+    def _read(self):
+        frames = net.FrameReader()
+        try:
+            while True:
+                data = self.sock.recv(65536)
+                if not data:
+                    break
+                for payload in frames.feed(data):
+                    self.inbox.put(net.decode(payload))
+        except OSError as e:
+            print("[client warning]", e)
+        self.inbox.put((None, None))    # connection closed
+
+    def send(self, data):
+        try:
+            self.sock.sendall(data)
+        except OSError as e:
+            print("[client warning]", e)
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class NetBoard:
+    # the client's copy of a room, kept up to date from the server's messages
+    def __init__(self, snap):
+        self.max_lives = snap["lives"]
+        self.load(snap)
+
+    def load(self, snap):
+        self.mode = snap["mode"]
+        self.width, self.height = snap["width"], snap["height"]
+        self.snake = SnakeBody(self.width, self.height, snap["body"])
+        self.heading = snap["heading"]
+        self.food = snap["food"]
+        self.special = snap["special"]
+        self.score = snap["score"]
+        self.lives = snap["lives"]
+        self.time_left = snap["time_left"]
+        self.speed = snap["speed"]
+        self.last = time.perf_counter()
+
+    def apply(self, d):
+        flags = d["flags"]
+        if flags & net.D_POP:
+            self.snake.pop()
+        if flags & net.D_HEAD:
+            x, y = d["head"]
+            hx, hy = self.snake[-1]
+            # one cell per tick: a bigger jump went round a wrapping edge
+            dx, dy = x - hx, y - hy
+            self.heading = (dx if abs(dx) <= 1 else -1 if dx > 0 else 1,
+                            dy if abs(dy) <= 1 else -1 if dy > 0 else 1)
+            self.snake.push(x, y)
+            self.last = time.perf_counter()
+        if flags & net.D_FOOD:
+            self.food = d["food"]
+        if flags & net.D_SPECIAL:
+            self.special = d["special"]
+        if flags & net.D_SCORE:
+            self.score = d["score"]
+        if flags & net.D_LIVES:
+            self.lives = d["lives"]
+        if flags & net.D_TIME:
+            self.time_left = d["time_left"]
+        if flags & net.D_SPEED:
+            self.speed = d["speed"]
+        if flags & net.D_EVENTS:
+            if d["events"] & EV_FOOD:
+                g.sfx.play("eat")
+            if d["events"] & EV_GOLDEN:
+                g.sfx.play("golden")
+
+    def alpha(self):
+        # fraction of the way to the next tick, as the local pacer gives it
+        return min(1.0, (time.perf_counter() - self.last) * self.speed)
+
+
+def wait_snapshot(conn):
+    while True:
+        kind, value = conn.inbox.get()
+        if kind == net.SNAPSHOT:
+            return value
+        if kind == net.ERROR:
+            print("[client warning] server:", value)
+            return None
+        if kind is None:
+            print("[client warning] connection closed")
+            return None
+
+
+def play(conn, mode, seed):
+    # one game on the server; returns its score, or None if it was left
+    conn.send(net.join(mode, seed, (g.GRID_W, g.GRID_H), (g.HUD_W, g.HUD_H)))
+    snap = wait_snapshot(conn)
+    if snap is None:
+        return None
+    if (snap["width"], snap["height"]) != (g.GRID_W, g.GRID_H):
+        g.set_board(g.SCREEN_W, g.SCREEN_H, g.BLOCK, (snap["width"], snap["height"]))
+    board = NetBoard(snap)
+    g.reset_view(board.mode)
+    g.sfx.play_music()
+    prompt = "Press Arrow Key to Start"
+    while True:
+        for e in g.events():
+            if e.type == g.pygame.QUIT:
+                conn.send(net.leave())
+                g.pygame.quit(); sys.exit()
+            if e.type == g.pygame.KEYDOWN:
+                if e.key == g.pygame.K_ESCAPE:
+                    conn.send(net.leave())
+                    g.sfx.stop_music()
+                    g.end_game(board.score)
+                    return None
+                d = g.ARROWS.get(e.key)
+                if d is not None:
+                    conn.send(net.turn(CODES[d]))
+
+        g.prof.mark("sim")
+        while True:
+            try:
+                kind, value = conn.inbox.get_nowait()
+            except queue.Empty:
+                break
+            if kind == net.DELTA:
+                board.apply(value)
+            elif kind == net.SNAPSHOT:
+                board.load(value)
+            elif kind == net.OVER:
+                g.sfx.stop_music()
+                g.sfx.play("game_over")
+                return value
+            elif kind is None or kind == net.ERROR:
+                print("[client warning]", value or "connection closed")
+                g.sfx.stop_music()
+                return None
+
+        g.prof.mark("draw")
+        food, special = board.food, board.special
+        g.draw_items(*(food or (None, None)), special is not None, *(special or (0, 0)))
+        dx, dy = board.heading
+        g.draw_snake(board.snake, dx, dy, board.alpha())
+        g.prof.mark("hud")
+        g.show_hud(board.mode, board.score, board.time_left, board.lives if board.max_lives > 1 else None)
+        g.draw_prompt(prompt, board.heading == (0, 0))
+        g.present()
+        g.end_frame()
+
+
+def main(argv):
+    addr, mode, seed = DEFAULT_SERVER, "Classic", 0
+    i = 0
+    while i < len(argv):
+        if argv[i] == "--mode":
+            mode = argv[i + 1]
+            i += 1
+        elif argv[i] == "--seed":
+            seed = int(argv[i + 1])
+            i += 1
+        elif argv[i] in ("--board", "--plugin", "--capture", "--capture-dir", "--capture-cmd", "--capture-fps"):
+            i += 1      # read by snake_game
+        elif not argv[i].startswith("--"):
+            addr = argv[i]
+        i += 1
+    host, port = addr.rsplit(":", 1)
+    try:
+        conn = Connection(host, int(port))
+    except OSError as e:
+        print(f"[client warning] couldn't connect to {addr}: {e}")
+        return 1
+    board = (g.SCREEN_W, g.SCREEN_H, g.BLOCK, (g.GRID_W, g.GRID_H))
+    try:
+        while True:
+            score = play(conn, mode, seed)
+            g.set_board(*board)
+            if score is None:
+                return 0
+            g.game_over_screen(mode, score)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,68 @@
+# Turn input for the game loops.
+#
+# Key presses are queued with a timestamp and the simulation takes at most one
+# per tick, so two quick presses inside one tick (UP then LEFT) become two
+# turns on consecutive ticks instead of the second overwriting the first.
+# Each press is checked against the heading the snake will have once the
+# turns already queued are applied, so a fast double tap can't reverse it.
+import time
+from collections import deque
+
+from timing import percentile
+
+
+def valid_turn(d, heading):
+    # only across the current axis (anything goes while standing still)
+    hx, hy = heading
+    return (d[0] != 0 and hx == 0) or (d[1] != 0 and hy == 0)
+
+
+class InputQueue:
+    def __init__(self, maxlen=2, history=1200):
+        self.maxlen = maxlen
+        self.pending = deque()            # (time pressed, (dx, dy))
+        self.applied = []                 # press times applied since last present
+        self.latencies = deque(maxlen=history)
+        self.dropped = 0
+
+    def clear(self):
+        self.pending.clear()
+        self.applied.clear()
+
+    def reset_stats(self):
+        self.latencies.clear()
+        self.dropped = 0
+
+    def push(self, d, heading, t=None):
+        # queue turn d; heading is the snake's current (dx, dy)
+        if self.pending:
+            heading = self.pending[-1][1]
+        if not valid_turn(d, heading) or len(self.pending) >= self.maxlen:
+            self.dropped += 1
+            return False
+        self.pending.append((time.perf_counter() if t is None else t, d))
+        return True
+
+    def next(self, dx, dy):
+        # heading for this tick: the first queued turn, if it is still valid
+        while self.pending:
+            t, d = self.pending.popleft()
+            if valid_turn(d, (dx, dy)):
+                self.applied.append(t)
+                return d
+            self.dropped += 1
+        return dx, dy
+
+    def presented(self, now=None):
+        # a frame showing every applied turn is on screen
+        if self.applied:
+            now = time.perf_counter() if now is None else now
+            self.latencies.extend(now - t for t in self.applied)
+            self.applied.clear()
+
+    def report(self):
+        lat = [t * 1000 for t in self.latencies]
+        if not lat:
+            return "  input->visible ms  no turns"
+        return (f"  input->visible ms  mean {sum(lat) / len(lat):.1f}  p50 {percentile(lat, 50):.1f}"
+                f"  p95 {percentile(lat, 95):.1f}  max {max(lat):.1f}  ({len(lat)} turns, {self.dropped} dropped)")
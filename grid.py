@@ -0,0 +1,205 @@
+# Board data structures shared by the game loops and the headless simulation.
+# Everything here works on integer cell coordinates (pixels = cell * BLOCK).
+from array import array
+
+
+class SnakeBody:
+    # Fixed-capacity ring buffer of body cells plus a per-cell occupancy map,
+    # so push-head, pop-tail and "is this cell part of the snake" are all O(1).
+    # Index 0 is the tail and -1 the head, like the old [[x, y], ...] lists.
+    # The map holds counts rather than bits so a cell visited twice (length-2
+    # snake turning back on itself) never gets cleared early.
+    # If a FreeCells index is given it is kept in sync as cells are covered
+    # and uncovered.
+    def __init__(self, width, height, cells=(), free=None):
+        self.width = width
+        self.height = height
+        self.cap = width * height
+        self.xs = array("i", [0]) * self.cap
+        self.ys = array("i", [0]) * self.cap
+        self.occ = bytearray(self.cap)
+        self.start = 0
+        self.size = 0
+        # running totals, so observers (the renderer) can tell what moved
+        self.pushes = 0
+        self.pops = 0
+        self.free = free
+        for x, y in cells:
+            self.push(x, y)
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        xs, ys, cap = self.xs, self.ys, self.cap
+        i = self.start
+        for _ in range(self.size):
+            yield xs[i], ys[i]
+            i += 1
+            if i == cap:
+                i = 0
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.size
+        if not 0 <= i < self.size:
+            raise IndexError("snake index out of range")
+        j = (self.start + i) % self.cap
+        return self.xs[j], self.ys[j]
+
+    def __contains__(self, cell):
+        return self.occupied(cell[0], cell[1])
+
+    @property
+    def head(self):
+        return self[-1]
+
+    @property
+    def tail(self):
+        return self[0]
+
+    def occupied(self, x, y):
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.occ[y * self.width + x] != 0
+        return False
+
+    def push(self, x, y):
+        if self.size == self.cap:
+            raise OverflowError("snake fills the whole board")
+        j = self.start + self.size
+        if j >= self.cap:
+            j -= self.cap
+        self.xs[j] = x
+        self.ys[j] = y
+        c = y * self.width + x
+        if not self.occ[c] and self.free is not None:
+            self.free.remove(x, y)
+        self.occ[c] += 1
+        self.size += 1
+        self.pushes += 1
+
+    def pop(self):
+        # remove and return the tail cell
+        if not self.size:
+            raise IndexError("pop from empty snake")
+        j = self.start
+        x, y = self.xs[j], self.ys[j]
+        c = y * self.width + x
+        self.occ[c] -= 1
+        if not self.occ[c] and self.free is not None:
+            self.free.add(x, y)
+        self.start = j + 1 if j + 1 < self.cap else 0
+        self.size -= 1
+        self.pops += 1
+        return x, y
+
+    def advance(self, x, y, length):
+        # One tick of movement: drop the tail unless the snake is still
+        # growing towards length, then push the new head. Returns True if
+        # the head ran into the body. Same as pop()/occupied()/push() with
+        # the calls and the free-cell bookkeeping inlined, since every
+        # game tick goes through here.
+        occ, free, w, cap = self.occ, self.free, self.width, self.cap
+        if self.size >= length:
+            j = self.start
+            c = self.ys[j] * w + self.xs[j]
+            occ[c] -= 1
+            if not occ[c] and free is not None and not free.excluded[c]:
+                free.pos[c] = len(free.cells)
+                free.cells.append(c)
+            self.start = j + 1 if j + 1 < cap else 0
+            self.size -= 1
+            self.pops += 1
+        c = y * w + x
+        hit = length >= 3 and occ[c] != 0
+        if self.size == cap:
+            raise OverflowError("snake fills the whole board")
+        j = self.start + self.size
+        if j >= cap:
+            j -= cap
+        self.xs[j] = x
+        self.ys[j] = y
+        if not occ[c] and free is not None:
+            free.remove(x, y)
+        occ[c] += 1
+        self.size += 1
+        self.pushes += 1
+        return hit
+
+    def clear(self):
+        while self.size:
+            self.pop()
+
+
+_free_templates = {}
+
+
+class FreeCells:
+    # Index of empty cells for O(1) uniform food spawning: a dense array of
+    # free cell ids plus each cell's position in it (-1 = not free), so add and
+    # remove are a swap with the last element. Cells under the HUD, the
+    # top-left hud=(cols, rows) block, are never part of the index.
+    def __init__(self, width, height, hud=(0, 0)):
+        self.width = width
+        self.height = height
+        n = width * height
+        key = (width, height, tuple(hud))
+        if key not in _free_templates:
+            excluded = bytearray(n)
+            hud_w, hud_h = min(hud[0], width), min(hud[1], height)
+            for y in range(hud_h):
+                excluded[y * width:y * width + hud_w] = b"\x01" * hud_w
+            cells = array("i", [c for c in range(n) if not excluded[c]])
+            pos = array("i", [-1]) * n
+            for i, c in enumerate(cells):
+                pos[c] = i
+            _free_templates[key] = (excluded, cells, pos)
+        # boards are rebuilt on every (re)spawn, so copy a cached empty one
+        excluded, cells, pos = _free_templates[key]
+        self.excluded = excluded
+        self.cells = cells[:]
+        self.pos = pos[:]
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __contains__(self, cell):
+        x, y = cell
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.pos[y * self.width + x] >= 0
+        return False
+
+    def add(self, x, y):
+        c = y * self.width + x
+        if self.excluded[c] or self.pos[c] >= 0:
+            return
+        self.pos[c] = len(self.cells)
+        self.cells.append(c)
+
+    def remove(self, x, y):
+        c = y * self.width + x
+        i = self.pos[c]
+        if i < 0:
+            return
+        last = self.cells.pop()
+        if last != c:
+            self.cells[i] = last
+            self.pos[last] = i
+        self.pos[c] = -1
+
+    def sample(self, rng, blocked=None):
+        # Uniform random free cell that is not in blocked, or None if the
+        # board is full. Blocked cells (food, golden apple) are taken out of
+        # the index just for the draw.
+        taken = []
+        for cell in blocked or ():
+            if cell is not None and cell[0] is not None and cell in self:
+                self.remove(*cell)
+                taken.append(cell)
+        cell = None
+        if self.cells:
+            c = self.cells[rng.randrange(len(self.cells))]
+            cell = (c % self.width, c // self.width)
+        for x, y in taken:
+            self.add(x, y)
+        return cell
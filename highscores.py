@@ -0,0 +1,120 @@
+# Highscore store: loaded once, read from memory, written behind.
+#
+# Records are kept in a dict; submit() only marks it dirty and arms a timer,
+# so a run of new records costs one write. Writes go to a temp file that is
+# renamed over the real one, under an exclusive lock on a side ".lock" file,
+# and merge with what is on disk so two running games never lose each
+# other's records.
+import atexit, json, os, tempfile, threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def file_lock(path):
+    with open(path + ".lock", "a+") as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class HighscoreStore:
+    def __init__(self, path, modes, flush_delay=2.0):
+        self.path = path
+        self.modes = list(modes)
+        self.flush_delay = flush_delay
+        self.scores = {m: 0 for m in self.modes}
+        self.dirty = False
+        self._lock = threading.Lock()
+        self._timer = None
+        self.scores.update(self._read())
+        atexit.register(self.close)
+
+    def _read(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print("[hs warning]", e)
+            return {}
+        if not isinstance(data, dict):
+            print(f"[hs warning] {self.path}: not a JSON object, ignored")
+            return {}
+        scores = {}
+        for m, v in data.items():
+            if m not in self.scores:
+                continue
+            try:
+                scores[m] = int(v)
+            except (TypeError, ValueError):
+                print(f"[hs warning] {self.path}: bad score for {m}: {v!r}")
+        return scores
+
+    def get(self, mode):
+        return self.scores.get(mode, 0)
+
+    def all(self):
+        return dict(self.scores)
+
+    def submit(self, mode, score):
+        # Record score if it beats the stored one. Returns True on a new record.
+        if mode not in self.scores:
+            return False
+        with self._lock:
+            if score <= self.scores[mode]:
+                return False
+            self.scores[mode] = score
+            self.dirty = True
+            if self._timer is None:
+                self._timer = threading.Timer(self.flush_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        return True
+
+    def flush(self, force=False):
+        # Write pending records now (force=True writes even if nothing changed).
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not (self.dirty or force):
+                return
+            try:
+                with file_lock(self.path):
+                    for m, v in self._read().items():
+                        if v > self.scores[m]:
+                            self.scores[m] = v
+                    fd, tmp = tempfile.mkstemp(prefix=".highscores-", dir=os.path.dirname(self.path) or ".")
+                    try:
+                        with os.fdopen(fd, "w") as f:
+                            json.dump(self.scores, f)
+                            f.flush()
+                            os.fsync(f.fileno())
+                        os.chmod(tmp, 0o644)
+                        os.replace(tmp, self.path)
+                    except BaseException:
+                        os.unlink(tmp)
+                        raise
+                self.dirty = False
+            except Exception as e:
+                print("[hs warning] couldn't save:", e)
+
+    def close(self):
+        self.flush()
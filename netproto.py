@@ -0,0 +1,204 @@
+# Wire format of the game server (server.py), shared with its client
+# (client.py) and the load generator (benchmarks/bench_server.py).
+#
+# A connection carries frames: a u16 length, then that many bytes. A length
+# of 0xFFFF means a u32 length follows instead (a snapshot of a long snake),
+# the same trick as WebSocket's extended payload lengths. The first byte of
+# a frame is its message type; everything is little-endian.
+#
+#   client -> server   JOIN mode seed board hud | TURN action | LEAVE | STATS
+#   server -> client   SNAPSHOT the whole room, on join and after a respawn
+#                      DELTA    one tick: flags saying which fields changed,
+#                               then just those (11 bytes for a plain move;
+#                               nothing is sent for a tick that changed nothing)
+#                      OVER score | STATS json | ERROR text
+#
+# A DELTA's snake fields are relative to the client's copy of the body: the
+# head moved onto a cell (D_HEAD) and/or the tail left one (D_POP), which is
+# what grid.SnakeBody.push()/pop() replay.
+import json, struct
+
+JOIN, TURN, LEAVE, STATS, SNAPSHOT, DELTA, OVER, ERROR = range(1, 9)
+
+# DELTA flags, in the order their fields follow the header
+D_HEAD = 1       # new head cell: u16 x, u16 y
+D_POP = 2        # the tail moved off its cell (no field)
+D_FOOD = 4       # food cell, NONE NONE if there is none
+D_SPECIAL = 8    # golden apple cell, NONE NONE once it's gone
+D_SCORE = 16     # i32
+D_LIVES = 32     # u8
+D_TIME = 64      # i16 seconds left
+D_SPEED = 128    # f32 ticks per second
+D_EVENTS = 256   # u8 snake_sim EV_* flags of the tick (sounds)
+NONE = 0xFFFF
+NO_TIMER = -32768
+
+LEN = struct.Struct("<H")
+LEN32 = struct.Struct("<I")
+JOIN_MSG = struct.Struct("<B12sQHHBB")   # type, mode, seed (0: any), board w/h, hud w/h
+TURN_MSG = struct.Struct("<BB")
+OVER_MSG = struct.Struct("<Bi")
+DELTA_HEAD = struct.Struct("<BHH")   # type, tick (wraps), flags
+CELL = struct.Struct("<HH")
+I32 = struct.Struct("<i")
+I16 = struct.Struct("<h")
+F32 = struct.Struct("<f")
+# type, mode, board w/h, tick, heading dx/dy, food, special, score, lives,
+# time left, speed, body cell count (then that many u16 x, u16 y, tail first)
+SNAP = struct.Struct("<B12sHHHbbHHHHiBhfI")
+
+
+def frame(payload):
+    n = len(payload)
+    if n < 0xFFFF:
+        return LEN.pack(n) + payload
+    return LEN.pack(0xFFFF) + LEN32.pack(n) + payload
+
+
+class FrameReader:
+    # reassembles frames from whatever chunks the socket hands over
+    def __init__(self):
+        self.buf = bytearray()
+
+    def feed(self, data):
+        buf = self.buf
+        buf += data
+        out = []
+        pos, end = 0, len(buf)
+        while end - pos >= 2:
+            n = buf[pos] | buf[pos + 1] << 8
+            head = 2
+            if n == 0xFFFF:
+                if end - pos < 6:
+                    break
+                n = LEN32.unpack_from(buf, pos + 2)[0]
+                head = 6
+            if end - pos < head + n:
+                break
+            out.append(bytes(buf[pos + head:pos + head + n]))
+            pos += head + n
+        if pos:
+            del buf[:pos]
+        return out
+
+
+def cell_or_none(c):
+    return CELL.pack(*c) if c is not None else CELL.pack(NONE, NONE)
+
+
+def read_cell(data, pos):
+    x, y = CELL.unpack_from(data, pos)
+    return (None if x == NONE else (x, y)), pos + 4
+
+
+def join(mode, seed=0, board=(40, 30), hud=(0, 0)):
+    return frame(JOIN_MSG.pack(JOIN, mode.encode(), seed, *board, *hud))
+
+
+def turn(action):
+    return frame(TURN_MSG.pack(TURN, action))
+
+
+def leave():
+    return frame(bytes((LEAVE,)))
+
+
+def stats_request():
+    return frame(bytes((STATS,)))
+
+
+def stats(info):
+    return frame(bytes((STATS,)) + json.dumps(info).encode())
+
+
+def over(score):
+    return frame(OVER_MSG.pack(OVER, score))
+
+
+def error(text):
+    return frame(bytes((ERROR,)) + text.encode())
+
+
+def snapshot(sim, tick):
+    body = sim.body
+    fx, fy = sim.food if sim.food is not None else (NONE, NONE)
+    sx, sy = sim.special if sim.special is not None else (NONE, NONE)
+    head = SNAP.pack(SNAPSHOT, sim.mode.encode(), sim.width, sim.height, tick & 0xFFFF, sim.dx, sim.dy,
+                     fx, fy, sx, sy, sim.score, sim.lives,
+                     NO_TIMER if sim.time_left is None else sim.time_left, sim.speed, len(body))
+    cells = [v for c in body for v in c]
+    return frame(head + struct.pack(f"<{len(cells)}H", *cells))
+
+
+def delta(tick, flags, head=None, food=None, special=None, score=0, lives=0, time_left=0,
+          speed=0.0, events=0):
+    parts = [DELTA_HEAD.pack(DELTA, tick & 0xFFFF, flags)]
+    if flags & D_HEAD:
+        parts.append(CELL.pack(*head))
+    if flags & D_FOOD:
+        parts.append(cell_or_none(food))
+    if flags & D_SPECIAL:
+        parts.append(cell_or_none(special))
+    if flags & D_SCORE:
+        parts.append(I32.pack(score))
+    if flags & D_LIVES:
+        parts.append(bytes((lives,)))
+    if flags & D_TIME:
+        parts.append(I16.pack(time_left))
+    if flags & D_SPEED:
+        parts.append(F32.pack(speed))
+    if flags & D_EVENTS:
+        parts.append(bytes((events,)))
+    return frame(b"".join(parts))
+
+
+def decode(payload):
+    # (type, fields): a dict for SNAPSHOT/DELTA/STATS, the value otherwise
+    kind = payload[0]
+    if kind == DELTA:
+        _, tick, flags = DELTA_HEAD.unpack_from(payload)
+        d = {"tick": tick, "flags": flags}
+        pos = DELTA_HEAD.size
+        if flags & D_HEAD:
+            d["head"] = CELL.unpack_from(payload, pos)
+            pos += 4
+        if flags & D_FOOD:
+            d["food"], pos = read_cell(payload, pos)
+        if flags & D_SPECIAL:
+            d["special"], pos = read_cell(payload, pos)
+        if flags & D_SCORE:
+            d["score"] = I32.unpack_from(payload, pos)[0]
+            pos += 4
+        if flags & D_LIVES:
+            d["lives"] = payload[pos]
+            pos += 1
+        if flags & D_TIME:
+            d["time_left"] = I16.unpack_from(payload, pos)[0]
+            pos += 2
+        if flags & D_SPEED:
+            d["speed"] = F32.unpack_from(payload, pos)[0]
+            pos += 4
+        if flags & D_EVENTS:
+            d["events"] = payload[pos]
+        return kind, d
+    if kind == SNAPSHOT:
+        (_, mode, w, h, tick, dx, dy, fx, fy, sx, sy, score, lives, time_left, speed,
+         n) = SNAP.unpack_from(payload)
+        cells = struct.unpack_from(f"<{2 * n}H", payload, SNAP.size)
+        return kind, {"mode": mode.rstrip(b"\0").decode(), "width": w, "height": h, "tick": tick,
+                      "heading": (dx, dy), "food": None if fx == NONE else (fx, fy),
+                      "special": None if sx == NONE else (sx, sy), "score": score, "lives": lives,
+                      "time_left": None if time_left == NO_TIMER else time_left, "speed": speed,
+                      "body": list(zip(cells[0::2], cells[1::2]))}
+    if kind == JOIN:
+        _, mode, seed, w, h, hw, hh = JOIN_MSG.unpack_from(payload)
+        return kind, (mode.rstrip(b"\0").decode(), seed, (w, h), (hw, hh))
+    if kind == TURN:
+        return kind, payload[1]
+    if kind == OVER:
+        return kind, OVER_MSG.unpack_from(payload)[1]
+    if kind == STATS:
+        return kind, json.loads(payload[1:]) if len(payload) > 1 else None
+    if kind == ERROR:
+        return kind, payload[1:].decode(errors="replace")
+    return kind, None
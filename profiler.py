@@ -0,0 +1,203 @@
+# Frame profiler: where each frame of a game loop goes.
+#
+# The loops mark the start of each phase (events, sim, draw, hud, compose,
+# flip, capture, wait); a phase runs until the next mark, a frame until
+# end_frame().
+# While enabled (F3 in game, or --profile) it keeps a rolling window for
+# the on-screen overlay (frame-time percentiles, a frame-time graph and a
+# bar per phase) and every frame's spans for a Chrome trace export, which
+# opens in chrome://tracing or https://ui.perfetto.dev. Disabled, mark() is
+# a flag check.
+import json, os, threading, time
+from collections import deque
+
+import pygame
+
+from timing import percentile
+
+PHASES = ("events", "sim", "draw", "hud", "overlay", "compose", "flip", "capture", "wait")
+COLORS = {
+    "events": (120, 170, 255),
+    "sim": (255, 120, 90),
+    "draw": (110, 220, 120),
+    "hud": (240, 210, 90),
+    "overlay": (150, 150, 150),
+    "compose": (90, 220, 220),
+    "flip": (210, 120, 240),
+    "capture": (240, 150, 200),
+    "wait": (80, 80, 80),
+}
+
+
+class FrameProfiler:
+    def __init__(self, fps=60, window=240, trace_frames=7200, refresh=0.25):
+        self.budget = 1000.0 / fps   # ms per frame at the display rate
+        self.window = window
+        self.refresh = refresh       # seconds between overlay redraws
+        self.enabled = False
+        self.frames = deque(maxlen=window)        # (total ms, {phase: ms}, ticks)
+        self.trace = deque(maxlen=trace_frames)   # (start, [(phase, t)], end, ticks)
+        self.marks = []
+        self.title = ""
+        self.t0 = self.start = time.perf_counter()
+        self.ticks = None
+        self.surface = None
+        self.drawn = 0.0
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        if self.enabled:
+            self._begin(time.perf_counter())
+        return self.enabled
+
+    def reset(self, title=""):
+        # new game: empty the window and the trace
+        self.title = title
+        self.frames.clear()
+        self.trace.clear()
+        self.surface = None
+        self.ticks = None
+        self.t0 = time.perf_counter()
+        self._begin(self.t0)
+
+    def _begin(self, t):
+        self.start = t
+        self.marks = [("events", t)]
+
+    def mark(self, phase):
+        if self.enabled:
+            self.marks.append((phase, time.perf_counter()))
+
+    def end_frame(self, ticks=0):
+        # ticks: the pacer's running tick count, to record ticks per frame
+        if not self.enabled:
+            return
+        end = time.perf_counter()
+        done = ticks - self.ticks if self.ticks is not None else 0
+        self.ticks = ticks
+        phases = {}
+        marks = self.marks
+        for i, (phase, t) in enumerate(marks):
+            t1 = marks[i + 1][1] if i + 1 < len(marks) else end
+            phases[phase] = phases.get(phase, 0.0) + (t1 - t) * 1000
+        self.frames.append(((end - self.start) * 1000, phases, done))
+        self.trace.append((self.start, marks, end, done))
+        self._begin(end)
+
+    def stats(self):
+        ft = [f[0] for f in self.frames]
+        if not ft:
+            return None
+        n = len(self.frames)
+        mean = {p: sum(f[1].get(p, 0.0) for f in self.frames) / n for p in PHASES}
+        p95 = {p: percentile([f[1].get(p, 0.0) for f in self.frames], 95) for p in PHASES}
+        return {
+            "frames": n,
+            "fps": 1000 * n / sum(ft),
+            "p50": percentile(ft, 50), "p95": percentile(ft, 95), "p99": percentile(ft, 99), "max": max(ft),
+            "ticks": sum(f[2] for f in self.frames) / n,
+            "mean": mean, "p95_phase": p95,
+        }
+
+    def overlay(self, font):
+        # the overlay surface, redrawn at most every `refresh` seconds (the
+        # same surface in between, so the renderer sees no change)
+        now = time.perf_counter()
+        if self.surface is not None and now - self.drawn < self.refresh:
+            return self.surface
+        self.drawn = now
+        s = self.stats()
+        line = font.get_linesize()
+        pad, label_w, bar_w, graph_h = 8, font.size("compose ")[0], 160, 48
+        value_w = font.size("00.00/00.00")[0]
+        w = pad * 3 + label_w + bar_w + value_w
+        h = pad * 2 + line * 2 + graph_h + pad + line * len(PHASES)
+        surf = pygame.Surface((w, h), pygame.SRCALPHA)
+        surf.fill((0, 0, 0, 170))
+        white = (235, 235, 235)
+        if s is None:
+            surf.blit(font.render("profiler: waiting for frames", True, white), (pad, pad))
+            self.surface = surf
+            return surf
+        y = pad
+        surf.blit(font.render(f"frame ms p50 {s['p50']:.1f} p95 {s['p95']:.1f} p99 {s['p99']:.1f}"
+                              f" max {s['max']:.1f}", True, white), (pad, y))
+        y += line
+        surf.blit(font.render(f"{s['fps']:.0f} fps  {s['ticks']:.2f} ticks/frame  {s['frames']} frames",
+                              True, white), (pad, y))
+        y += line
+        # last frames as columns, 2x the budget full height; budget line
+        gw = w - 2 * pad
+        scale = graph_h / (2 * self.budget)
+        frames = list(self.frames)[-gw:]
+        for i, (ms, _, _) in enumerate(frames):
+            bh = min(graph_h, int(ms * scale) + 1)
+            color = COLORS["draw"] if ms <= self.budget * 1.5 else COLORS["sim"]
+            pygame.draw.line(surf, color, (pad + i, y + graph_h - bh), (pad + i, y + graph_h - 1))
+        by = y + graph_h - int(self.budget * scale)
+        pygame.draw.line(surf, white, (pad, by), (pad + gw - 1, by))
+        y += graph_h + pad
+        # per phase: mean as a bar against the frame budget, p95 as a tick
+        bx = pad * 2 + label_w
+        for phase in PHASES:
+            mean, p95 = s["mean"][phase], s["p95_phase"][phase]
+            surf.blit(font.render(phase, True, white), (pad, y))
+            bh = max(2, line - 6)
+            pygame.draw.rect(surf, (50, 50, 50), (bx, y + 3, bar_w, bh))
+            pygame.draw.rect(surf, COLORS[phase], (bx, y + 3, min(bar_w, int(bar_w * mean / self.budget)), bh))
+            tx = bx + min(bar_w - 1, int(bar_w * p95 / self.budget))
+            pygame.draw.line(surf, white, (tx, y + 1), (tx, y + line - 2))
+            surf.blit(font.render(f"{mean:.2f}/{p95:.2f}", True, white), (bx + bar_w + pad, y))
+            y += line
+        self.surface = surf
+        return surf
+
+    def report(self, title=None):
+        s = self.stats()
+        title = self.title if title is None else title
+        if s is None:
+            return f"[profile] {title}: no frames"
+        lines = [f"[profile] {title}: {s['frames']} frames (last {self.window}), {s['fps']:.1f} fps,"
+                 f" frame ms p50 {s['p50']:.2f} p95 {s['p95']:.2f} p99 {s['p99']:.2f} max {s['max']:.2f}"]
+        for phase in PHASES:
+            lines.append(f"  {phase:<8} mean {s['mean'][phase]:6.2f}  p95 {s['p95_phase'][phase]:6.2f} ms")
+        return "\n".join(lines)
+
+    def trace_events(self):
+        # Chrome trace-event format: one complete ("X") event per frame and
+        # per phase inside it, timestamps in µs from the start of the game
+        t0 = self.t0
+        events = [
+            {"name": "process_name", "ph": "M", "pid": 1, "tid": 1, "args": {"name": "Snake Game"}},
+            {"name": "thread_name", "ph": "M", "pid": 1, "tid": 1, "args": {"name": self.title or "game loop"}},
+        ]
+        for n, (start, marks, end, ticks) in enumerate(self.trace):
+            events.append({"name": "frame", "cat": "frame", "ph": "X", "pid": 1, "tid": 1,
+                           "ts": round((start - t0) * 1e6, 1), "dur": round((end - start) * 1e6, 1),
+                           "args": {"frame": n, "ticks": ticks}})
+            for i, (phase, t) in enumerate(marks):
+                t1 = marks[i + 1][1] if i + 1 < len(marks) else end
+                events.append({"name": phase, "cat": "phase", "ph": "X", "pid": 1, "tid": 1,
+                               "ts": round((t - t0) * 1e6, 1), "dur": round((t1 - t) * 1e6, 1)})
+        return events
+
+    def write_trace(self, path):
+        # serialized here, written on a thread (not a daemon, so a quit right
+        # after still finishes the file); returns the thread
+        if not self.trace:
+            return None
+        data = {"traceEvents": self.trace_events(), "displayTimeUnit": "ms",
+                "otherData": {"title": self.title, "budget_ms": self.budget}}
+
+        def write():
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                with open(path, "w") as f:
+                    json.dump(data, f, separators=(",", ":"))
+                print("[profile] wrote", path)
+            except OSError as e:
+                print("[profile warning] couldn't write trace:", e)
+
+        t = threading.Thread(target=write)
+        t.start()
+        return t
@@ -0,0 +1,398 @@
+# Rendering helpers that keep pre-rendered surfaces between frames.
+from collections import OrderedDict, deque
+
+import pygame
+
+
+class BackgroundLayer:
+    # Background colour + grid lines rendered once per (screen size, BLOCK)
+    # and blitted in one call; rebuilt only when either of them changes.
+    # The surface is one block bigger than the screen so it can be drawn
+    # under a view scrolled by any number of pixels.
+    def __init__(self, bg_color, grid_color):
+        self.bg_color = bg_color
+        self.grid_color = grid_color
+        self.key = None
+        self.surface = None
+
+    def get(self, size, block):
+        if (size, block) != self.key:
+            self.surface = self.render((size[0] + block, size[1] + block), block)
+            self.key = (size, block)
+        return self.surface
+
+    def render(self, size, block):
+        w, h = size
+        surf = pygame.Surface(size)
+        if pygame.display.get_surface() is not None:
+            surf = surf.convert()
+        surf.fill(self.bg_color)
+        for x in range(0, w, block):
+            pygame.draw.line(surf, self.grid_color, (x, 0), (x, h))
+        for y in range(0, h, block):
+            pygame.draw.line(surf, self.grid_color, (0, y), (w, y))
+        return surf
+
+    def invalidate(self):
+        self.key = None
+        self.surface = None
+
+    def draw(self, target, block, offset=(0, 0), rect=None):
+        # the grid under rect (default: all of target), for a view whose
+        # top-left is at board pixel offset
+        size = target.get_size()
+        rect = pygame.Rect((0, 0), size) if rect is None else rect
+        target.blit(self.get(size, block), rect, rect.move(offset[0] % block, offset[1] % block))
+
+
+class TextCache:
+    # font.render results keyed by (font, text, colour), least recently used
+    # dropped first. HUD strings change a few times a second at most, so in
+    # steady state every frame is a cache hit.
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.surfaces = OrderedDict()
+        self.hits = self.misses = 0
+
+    def render(self, font, text, color):
+        key = (font, text, color)
+        surf = self.surfaces.get(key)
+        if surf is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surf
+        self.misses += 1
+        surf = font.render(text, True, color)
+        self.surfaces[key] = surf
+        if len(self.surfaces) > self.maxsize:
+            self.surfaces.popitem(last=False)
+        return surf
+
+    def clear(self):
+        self.surfaces.clear()
+
+
+class SpriteAtlas:
+    # Many small images packed side by side into one surface, each name
+    # mapped to its sub-rect. Sprites drawn from an atlas all share one
+    # source surface, so a whole snake goes out in a single blits() call.
+    def __init__(self, images, padding=1):
+        items = [(name, img) for name, img in images.items() if img is not None]
+        w = sum(img.get_width() + padding for _, img in items) or 1
+        h = max((img.get_height() for _, img in items), default=1)
+        self.surface = pygame.Surface((w, h), pygame.SRCALPHA)
+        if pygame.display.get_surface() is not None:
+            self.surface = self.surface.convert_alpha()
+        self.surface.fill((0, 0, 0, 0))
+        self.rects = {}
+        x = 0
+        for name, img in items:
+            # MAX onto transparent black copies pixels exactly, alpha included
+            self.surface.blit(img, (x, 0), special_flags=pygame.BLEND_RGBA_MAX)
+            self.rects[name] = pygame.Rect(x, 0, img.get_width(), img.get_height())
+            x += img.get_width() + padding
+
+    def __contains__(self, name):
+        return name in self.rects
+
+    def area(self, name):
+        return self.rects[name]
+
+
+class DirtyRenderer:
+    # Retained-mode renderer: the scene is a set of keyed sprites on top of a
+    # BackgroundLayer. set()/remove() record the screen rects that changed;
+    # present() restores just those rects from the cached background,
+    # redraws the sprites overlapping them (clipped, in layer order) and hands
+    # the rect list to pygame.display.update. A full repaint happens only on
+    # the first frame, after invalidate(), or when the screen size changes.
+    # A sprite may be a sub-rect (area) of a bigger surface such as a
+    # SpriteAtlas; every redraw goes out as one screen.blits() call.
+    # present(screen, update=False) leaves the display update to the caller
+    # (None = the whole screen, else the returned rects).
+    #
+    # Sprites are placed in board pixels and the screen shows the view
+    # scrolled to offset (see Camera); layers from fixed_from up (the HUD)
+    # stay put on the screen instead. Changes outside the view cost nothing
+    # to present, and a repaint only looks at the buckets under the view, so
+    # its cost depends on the screen size, not on how many sprites there are.
+    def __init__(self, background, block, fixed_from=None):
+        self.background = background
+        self.block = block
+        self.fixed_from = fixed_from
+        self.sprites = {}    # key -> (surface, rect, layer, seq, area)
+        self.buckets = {}    # (bx, by) in block units -> set of keys
+        self.fixed = set()   # keys of screen-fixed sprites (not bucketed)
+        self.offset = (0, 0)
+        self.dirty = []
+        self.full = True
+        self.size = None
+        self.seq = 0
+
+    def _buckets(self, rect):
+        b = self.block
+        for by in range(rect.top // b, (rect.bottom - 1) // b + 1):
+            for bx in range(rect.left // b, (rect.right - 1) // b + 1):
+                yield bx, by
+
+    def set(self, key, surf, pos, layer=0, area=None):
+        if area is None:
+            rect = surf.get_rect(topleft=pos)
+        else:
+            rect = pygame.Rect(pos, area.size)
+        old = self.sprites.get(key)
+        if old is not None:
+            if old[0] is surf and old[1] == rect and old[2] == layer and old[4] == area:
+                return
+            self.remove(key)
+        self.seq += 1
+        self.sprites[key] = (surf, rect, layer, self.seq, area)
+        if self.fixed_from is not None and layer >= self.fixed_from:
+            self.fixed.add(key)
+            self.dirty.append(rect)
+            return
+        for b in self._buckets(rect):
+            self.buckets.setdefault(b, set()).add(key)
+        self.dirty.append(rect.move(-self.offset[0], -self.offset[1]))
+
+    def remove(self, key):
+        old = self.sprites.pop(key, None)
+        if old is None:
+            return
+        rect = old[1]
+        if key in self.fixed:
+            self.fixed.discard(key)
+            self.dirty.append(rect)
+            return
+        for b in self._buckets(rect):
+            keys = self.buckets.get(b)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.buckets[b]
+        self.dirty.append(rect.move(-self.offset[0], -self.offset[1]))
+
+    def reset(self):
+        # drop every sprite and repaint everything on the next present()
+        self.sprites.clear()
+        self.buckets.clear()
+        self.fixed.clear()
+        self.invalidate()
+
+    def invalidate(self):
+        self.full = True
+
+    def scroll(self, x, y):
+        # show the board from pixel (x, y); a new offset repaints the view
+        if (x, y) != self.offset:
+            self.offset = (x, y)
+            self.full = True
+
+    def _visible(self, rect):
+        # (surface, screen pos, area) for the sprites overlapping screen
+        # rect, in draw order
+        sprites = self.sprites
+        ox, oy = self.offset
+        world = rect.move(ox, oy)
+        b = self.block
+        if len(sprites) < (world.width // b + 2) * (world.height // b + 2):
+            keys = sprites.keys() - self.fixed
+        else:
+            keys = set()
+            for k in self._buckets(world):
+                keys.update(self.buckets.get(k, ()))
+        hits = [sprites[k] for k in keys if sprites[k][1].colliderect(world)]
+        hits += [sprites[k] for k in self.fixed if sprites[k][1].colliderect(rect)]
+        hits.sort(key=lambda s: (s[2], s[3]))
+        fixed_from = self.fixed_from
+        if fixed_from is None or not (ox or oy):
+            return [(s[0], s[1], s[4]) for s in hits]
+        return [(s[0], s[1] if s[2] >= fixed_from else s[1].move(-ox, -oy), s[4]) for s in hits]
+
+    def present(self, screen, update=True):
+        size = screen.get_size()
+        view = pygame.Rect((0, 0), size)
+        if self.full or size != self.size:
+            self.size = size
+            self.full = False
+            self.dirty.clear()
+            self.background.draw(screen, self.block, self.offset)
+            screen.blits(self._visible(view), doreturn=False)
+            if update:
+                pygame.display.update()
+            return None
+        if not self.dirty:
+            return []
+        rects = [r for r in (rect.clip(view) for rect in self.dirty) if r]
+        self.dirty = []
+        for rect in rects:
+            self.background.draw(screen, self.block, self.offset, rect)
+            hits = self._visible(rect)
+            if not hits:
+                continue
+            screen.set_clip(rect)
+            screen.blits(hits, doreturn=False)
+            screen.set_clip(None)
+        if update:
+            pygame.display.update(rects)
+        return rects
+
+
+class Camera:
+    # Top-left of the view in board pixels. It follows a point (the snake's
+    # head) with a dead zone: nothing moves while the point stays in the
+    # middle `dead` fraction of the screen, and the view never goes past
+    # the edges of the board.
+    def __init__(self, view, board, dead=0.4):
+        self.view = view
+        self.board = board
+        self.dead = dead
+        self.x = self.y = None
+
+    def _clamp(self, v, view, board):
+        return int(max(0, min(v, board - view)))
+
+    def follow(self, px, py):
+        (vw, vh), (bw, bh) = self.view, self.board
+        if self.x is None:
+            self.x = self._clamp(px - vw // 2, vw, bw)
+            self.y = self._clamp(py - vh // 2, vh, bh)
+            return self.x, self.y
+        mx, my = vw * (1 - self.dead) / 2, vh * (1 - self.dead) / 2
+        x, y = self.x, self.y
+        if px < x + mx:
+            x = px - mx
+        elif px > x + vw - mx:
+            x = px - vw + mx
+        if py < y + my:
+            y = py - my
+        elif py > y + vh - my:
+            y = py - vh + my
+        self.x, self.y = self._clamp(x, vw, bw), self._clamp(y, vh, bh)
+        return self.x, self.y
+
+
+# Which neighbours a snake segment joins up with, as a bitmask: a body cell
+# has two links (straight or a corner), the tail and head one each.
+LINK_UP, LINK_DOWN, LINK_LEFT, LINK_RIGHT = 1, 2, 4, 8
+
+
+def link(a, b):
+    # direction from cell a to the adjacent cell b (a step of more than one
+    # cell is a wrap around the board edge, so it points the other way)
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    if dx:
+        return LINK_RIGHT if (dx > 0) == (abs(dx) == 1) else LINK_LEFT
+    if dy:
+        return LINK_DOWN if (dy > 0) == (abs(dy) == 1) else LINK_UP
+    return 0
+
+
+class SnakeLayer:
+    # Mirrors a grid.SnakeBody into DirtyRenderer sprites keyed by cell.
+    # Uses the body's push/pop counters to touch only what moved since the
+    # last sync: cells that fell off the tail, new head cells, the old head
+    # (now a body segment) and the tail. A different snake object (respawn)
+    # or a gap too big to follow falls back to a full resync.
+    #
+    # With alpha < 1 (frame drawn between two ticks) the head and tail slide
+    # from where they were before the last tick; the tail's new cell is
+    # covered with a body image meanwhile so no gap opens up.
+    #
+    # links[i] caches which neighbours segment i joins (LINK_* bits). A move
+    # only ORs one bit into the old head and clears one on the new tail, so
+    # the sprite choice for each segment is a table lookup.
+    def __init__(self, renderer, layer=1):
+        self.renderer = renderer
+        self.layer = layer
+        self.snake = None
+        self.cells = deque()
+        self.links = deque()
+        self.pushes = self.pops = 0
+        self.head_from = self.tail_from = None
+
+    def clear(self):
+        for c in self.cells:
+            self.renderer.remove(("snake", c))
+        self.renderer.remove(("snake", "fill"))
+        self.cells.clear()
+        self.links.clear()
+        self.snake = None
+        self.head_from = self.tail_from = None
+
+    def _slide(self, pos, cell, origin, t):
+        # pos moved back towards origin by t cells, if origin is a neighbour
+        if origin is None or not t:
+            return pos
+        ox, oy = origin[0] - cell[0], origin[1] - cell[1]
+        if abs(ox) + abs(oy) != 1:
+            return pos  # wrapped around the board: just jump
+        b = self.renderer.block
+        return pos[0] + round(ox * t * b), pos[1] + round(oy * t * b)
+
+    def _tail_sliding(self, snake):
+        o = self.tail_from
+        if o is None or len(snake) < 2:
+            return False
+        tx, ty = snake[0]
+        return abs(o[0] - tx) + abs(o[1] - ty) == 1
+
+    def sync(self, snake, sprite, alpha=1.0, fill=None):
+        # sprite(i, links) -> (surface, (px, py)[, area]) for segment i
+        # (0 = tail); fill is a surface or (surface, area)
+        r = self.renderer
+        n = len(snake)
+        new = snake.pushes - self.pushes
+        gone = snake.pops - self.pops
+        cells, links = self.cells, self.links
+        if snake is not self.snake or new > n or gone > len(cells):
+            self.clear()
+            cells.extend(snake)
+            for i in range(n):
+                links.append((link(cells[i], cells[i - 1]) if i else 0)
+                             | (link(cells[i], cells[i + 1]) if i < n - 1 else 0))
+            touched = range(n)
+        else:
+            popped = None
+            for _ in range(gone):
+                popped = cells.popleft()
+                links.popleft()
+                r.remove(("snake", popped))
+                if cells:
+                    links[0] &= ~link(cells[0], popped)
+            for i in range(n - new, n):
+                cell = snake[i]
+                if cells:
+                    links[-1] |= link(cells[-1], cell)
+                    links.append(link(cell, cells[-1]))
+                else:
+                    links.append(0)
+                cells.append(cell)
+            touched = {0, n - 1}
+            touched.update(range(max(0, n - new - 1), n))
+            if new:
+                self.head_from = snake[-2] if n >= 2 else None
+                self.tail_from = popped
+        self.snake = snake
+        self.pushes, self.pops = snake.pushes, snake.pops
+        t = 1.0 - alpha
+        for i in touched:
+            cell = snake[i]
+            s = sprite(i, links[i])
+            if s is None:
+                r.remove(("snake", cell))
+                continue
+            pos = s[1]
+            if i == n - 1:
+                pos = self._slide(pos, cell, self.head_from, t)
+            elif i == 0:
+                pos = self._slide(pos, cell, self.tail_from, t)
+            r.set(("snake", cell), s[0], pos, self.layer, s[2] if len(s) > 2 else None)
+        if fill is not None and t and self._tail_sliding(snake):
+            b = r.block
+            tx, ty = snake[0]
+            surf, area = fill if isinstance(fill, tuple) else (fill, None)
+            r.set(("snake", "fill"), surf, (tx * b, ty * b), self.layer - 0.5, area)
+        else:
+            r.remove(("snake", "fill"))
+
@@ -0,0 +1,273 @@
+# Replay files: everything needed to re-run a game tick for tick.
+#
+# A replay is a fixed header (mode, RNG seed, screen size and board in
+# cells), then one 4-bit record per simulation tick, two to a byte, then a
+# footer with the tick count and final score:
+#   0 = keep heading, 1-4 = turn UP/DOWN/LEFT/RIGHT (snake_sim action codes)
+# The game runs a snake_sim.SnakeSim seeded with the header seed, which
+# draws food from it and runs its timers on tick time, so the records are
+# all the input a game has.
+#
+# Recording goes through ReplayWriter, which hands full chunks to a
+# background thread so a tick never waits on the disk. Playing back:
+#   python replay.py FILE              re-simulate without drawing, max speed
+#   python replay.py FILE --render [RATE]   draw it, RATE x real time
+#   python replay.py --latest [...]    the most recent recording
+# Re-simulating steps a SnakeSim on its own and never imports pygame;
+# --render plays the file through the game. --plugin works in both,
+# --profile / --frame-report / --capture as in the game when rendering.
+import os, queue, struct, sys, threading, time
+
+from snake_sim import DIRS, MODES, SnakeSim, load_plugin
+from timing import FramePacer
+
+MAGIC = b"SNKR"
+VERSION = 2     # 2: the game runs on SnakeSim (version 1 games re-run differently)
+HEADER = struct.Struct("<4sB12sQHHHHHHH")   # magic, version, mode, seed, screen w/h, block, grid w/h, hud w/h
+FOOTER = struct.Struct("<4sIi")             # b"DONE", ticks, score
+CODES = {d: a for a, d in DIRS.items()}    # (dx, dy) -> action code
+REPLAY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "replays")
+LOW = bytes(b & 15 for b in range(256))
+HIGH = bytes(b >> 4 for b in range(256))
+
+
+class Replay:
+    def __init__(self, mode, seed, screen, block, grid, hud, turns=b"", ticks=None, score=None):
+        self.mode = mode
+        self.seed = seed
+        self.screen = tuple(screen)
+        self.block = block
+        self.grid = tuple(grid)
+        self.hud = tuple(hud)
+        self.turns = turns    # one action code per tick
+        self.ticks = len(turns) if ticks is None else ticks
+        self.score = score    # None if the game never finished writing
+
+    def header(self):
+        return HEADER.pack(MAGIC, VERSION, self.mode.encode(), self.seed, *self.screen, self.block,
+                           *self.grid, *self.hud)
+
+    def __repr__(self):
+        return (f"Replay({self.mode}, seed={self.seed}, screen={self.screen[0]}x{self.screen[1]}, "
+                f"grid={self.grid[0]}x{self.grid[1]}, ticks={self.ticks}, score={self.score})")
+
+
+def load(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, mode, seed, sw, sh, block, gw, gh, hw, hh = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"{path}: not a replay file")
+    if version != VERSION:
+        raise ValueError(f"{path}: replay version {version}, this game plays version {VERSION}")
+    body = data[HEADER.size:]
+    ticks = score = None
+    if len(body) >= FOOTER.size and body[-FOOTER.size:].startswith(b"DONE"):
+        _, ticks, score = FOOTER.unpack_from(body, len(body) - FOOTER.size)
+        body = body[:-FOOTER.size]
+    turns = bytearray(len(body) * 2)
+    turns[0::2] = body.translate(LOW)
+    turns[1::2] = body.translate(HIGH)
+    if ticks is not None:
+        del turns[ticks:]
+    return Replay(mode.rstrip(b"\0").decode(), seed, (sw, sh), block, (gw, gh), (hw, hh), bytes(turns),
+                  ticks, score)
+
+
+class ReplayWriter:
+    # tick() packs one record; every `chunk` bytes the buffer goes to the
+    # writer thread. close() writes the footer and waits for the thread.
+    def __init__(self, path, replay, chunk=1024):
+        self.path = path
+        self.chunk = chunk
+        self.buf = bytearray()
+        self.half = None
+        self.ticks = 0
+        self.closed = False
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, args=(replay.header(),), daemon=True)
+        self.thread.start()
+
+    def _run(self, header):
+        try:
+            with open(self.path, "wb") as f:
+                f.write(header)
+                while True:
+                    data = self.queue.get()
+                    if data is None:
+                        break
+                    f.write(data)
+        except Exception as e:
+            print("[replay warning] couldn't write replay:", e)
+            while self.queue.get() is not None:  # drain so close() returns
+                pass
+
+    def tick(self, code):
+        self.ticks += 1
+        if self.half is None:
+            self.half = code
+            return
+        self.buf.append(self.half | code << 4)
+        self.half = None
+        if len(self.buf) >= self.chunk:
+            self.queue.put(bytes(self.buf))
+            self.buf.clear()
+
+    def close(self, score):
+        if self.closed:
+            return
+        self.closed = True
+        if self.half is not None:
+            self.buf.append(self.half)
+        self.buf += FOOTER.pack(b"DONE", self.ticks, score)
+        self.queue.put(bytes(self.buf))
+        self.queue.put(None)
+        self.thread.join()
+
+
+class ReplayInput:
+    # Stands in for controls.InputQueue during playback: next() applies the
+    # recorded turn for this tick instead of a queued key press.
+    def __init__(self, replay):
+        self.replay = replay
+        self.pos = 0
+        self.score = None     # set by the game when it ends
+
+    def done(self):
+        return self.pos >= self.replay.ticks
+
+    def next(self, dx, dy):
+        code = self.replay.turns[self.pos] if self.pos < len(self.replay.turns) else 0
+        self.pos += 1
+        return DIRS[code] if code else (dx, dy)
+
+
+class ReplayPacer(FramePacer):
+    # Hands out the recorded ticks: at rate x real time, or with rate=None
+    # all at once with nothing drawn in between. When the recording runs out
+    # it stops ticking and posts ESC, so a game that was quit from the
+    # keyboard returns the same way.
+    def __init__(self, source, rate=None, fps=60, wait=None):
+        super().__init__(fps, wait if rate else None, rate=rate or 1.0)
+        self.source = source
+        self.max_speed = rate is None
+        self.game_time = 0.0
+        self.ended = False
+
+    def step(self, speed):
+        if self.source.done():
+            if not self.ended:
+                import pygame
+                self.ended = True
+                pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_ESCAPE))
+            return False
+        if self.max_speed:
+            self.ticks += 1
+        elif not super().step(speed):
+            return False
+        self.game_time += 1.0 / speed
+        return True
+
+    def end_frame(self):
+        if not self.max_speed:
+            super().end_frame()
+
+
+def board_start(screen, block, grid):
+    # the snake's start cell: the middle of the screen, or of the board
+    # when it's bigger than the screen and scrolls
+    if tuple(grid) != (-(-screen[0] // block), -(-screen[1] // block)):
+        return grid[0] // 2, grid[1] // 2
+    return screen[0] // 2 // block, screen[1] // 2 // block
+
+
+def resimulate(rep):
+    # the recorded game on the same engine the game runs, without pygame
+    sim = SnakeSim(rep.mode, *rep.grid, seed=rep.seed, hud=rep.hud,
+                   start=board_start(rep.screen, rep.block, rep.grid))
+    for code in rep.turns[:rep.ticks]:
+        sim.step(code)
+        if sim.over:
+            break
+    return {"score": sim.score, "ticks": sim.ticks, "game_time": sim.time}
+
+
+def prune(directory, keep=100):
+    # drop all but the newest `keep` recordings
+    try:
+        files = sorted((f for f in os.listdir(directory) if f.endswith(".snkr")),
+                       key=lambda f: os.path.getmtime(os.path.join(directory, f)))
+        for f in files[:-keep] if keep else files:
+            os.unlink(os.path.join(directory, f))
+    except OSError as e:
+        print("[replay warning]", e)
+
+
+def latest(directory):
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:   # nothing recorded yet
+        return None
+    files = [os.path.join(directory, f) for f in names if f.endswith(".snkr")]
+    return max(files, key=os.path.getmtime) if files else None
+
+
+def main(argv):
+    paths, rate, use_latest, plugins = [], None, False, []
+    i = 0
+    while i < len(argv):
+        if argv[i] == "--render":
+            rate = 1.0
+            if i + 1 < len(argv):
+                try:
+                    rate = float(argv[i + 1])
+                    i += 1
+                except ValueError:
+                    pass
+        elif argv[i] == "--latest":
+            use_latest = True
+        elif argv[i] == "--plugin" and i + 1 < len(argv):
+            plugins.append(argv[i + 1])
+            i += 1
+        elif argv[i] in ("--capture", "--capture-dir", "--capture-cmd", "--capture-fps"):
+            i += 1  # capture options: read by snake_game
+        elif argv[i].startswith("--"):
+            pass    # game flags (--profile, --frame-report), read by snake_game
+        else:
+            paths.append(argv[i])
+        i += 1
+    if rate is None:
+        for plugin in plugins:
+            load_plugin(plugin)
+    else:
+        import snake_game     # loads the --plugin files itself
+    if use_latest:
+        paths.append(latest(REPLAY_DIR))
+    if not paths or None in paths:
+        print("usage: python replay.py FILE... | --latest  [--render [RATE]]")
+        return 1
+    status = 0
+    for path in paths:
+        try:
+            rep = load(path)
+        except ValueError as e:
+            print(e)
+            status = 1
+            continue
+        if rep.mode not in MODES:
+            print(f"{os.path.basename(path)}: unknown mode {rep.mode!r} (load its --plugin)")
+            status = 1
+            continue
+        t0 = time.perf_counter()
+        result = resimulate(rep) if rate is None else snake_game.play_replay(rep, rate)
+        elapsed = time.perf_counter() - t0
+        ok = rep.score is None or (result["score"] == rep.score and result["ticks"] == rep.ticks)
+        status |= not ok
+        print(f"{os.path.basename(path)}: {rep.mode}, {result['ticks']} ticks, score {result['score']}"
+              f" (recorded {rep.score}) {'OK' if ok else 'MISMATCH'}  {elapsed * 1000:.1f} ms for"
+              f" {result['game_time']:.1f} s of play ({result['game_time'] / max(elapsed, 1e-9):,.0f}x)")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,306 @@
+# Authoritative game server: players each get a room of their own, played
+# on the snake_sim rules (any mode in snake_sim.MODES) over TCP; the wire
+# format is in netproto.py and client.py is the pygame front end.
+#
+#   python server.py [--host 127.0.0.1] [--port 7777] [--max-rooms N]
+#                    [--max-board 200x200] [--stats SECONDS] [--plugin FILE.py ...]
+#
+# One asyncio task ticks every room. Rooms wait in a heap ordered by when
+# their next tick is due (each at its own speed); every QUANTUM the scheduler
+# steps the rooms that are due and writes each player a delta of what that
+# tick changed, or a full snapshot after a respawn. Turns are queued as they
+# arrive and applied one per tick, like the game's keyboard queue. A room
+# that falls more than MAX_LAG behind skips ticks rather than racing to
+# catch up, and a player whose connection stops draining (MAX_BUFFER unsent
+# bytes) is dropped instead of buffered without limit.
+#
+# --stats prints rooms, ticks/s, tick lateness and CPU every so often; a
+# STATS request returns the same numbers (benchmarks/bench_server.py uses
+# it to measure rooms per core).
+import asyncio, heapq, random, sys, time
+from collections import deque
+
+import netproto as net
+from controls import valid_turn
+from snake_sim import SnakeSim, MODES, DIRS, NOOP, EV_HIT, EV_FOOD, EV_GOLDEN, load_plugin
+from timing import percentile
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+QUANTUM = 1 / 250          # scheduler period, seconds
+MAX_LAG = 0.5              # seconds behind before a room skips ticks
+RESPAWN_PAUSE = 0.4        # after a lost life, as in the game
+MAX_BUFFER = 256 * 1024    # unsent bytes before a player is dropped
+MAX_FRAME = 1024           # longest frame a client may send
+TURN_QUEUE = 2
+
+
+class Room:
+    def __init__(self, player, mode, seed, board, hud):
+        self.player = player
+        self.sim = SnakeSim(mode, *board, seed=seed, hud=hud)
+        rules = self.sim.rules
+        self.pause = RESPAWN_PAUSE if rules["self_hit"] == "kill" and rules["lives"] > 1 else 0
+        self.turns = deque()
+        self.closed = False
+
+    def queue_turn(self, action):
+        d = DIRS.get(action)
+        if d is None or len(self.turns) >= TURN_QUEUE:
+            return
+        heading = DIRS[self.turns[-1]] if self.turns else (self.sim.dx, self.sim.dy)
+        if valid_turn(d, heading):
+            self.turns.append(action)
+
+    def tick(self):
+        # step once; returns (frame for the player or None if nothing
+        # changed, game over, events)
+        sim = self.sim
+        body = sim.body
+        pushes, pops = body.pushes, body.pops
+        food, special, score, lives, time_left, speed = (sim.food, sim.special, sim.score, sim.lives,
+                                                         sim.time_left, sim.speed)
+        action = NOOP
+        while self.turns:
+            a = self.turns.popleft()
+            if valid_turn(DIRS[a], (sim.dx, sim.dy)):
+                action = a
+                break
+        events = sim.step(action)
+        if sim.over:
+            return net.over(sim.score), True, events
+        if sim.body is not body:
+            self.turns.clear()
+            return net.snapshot(sim, sim.ticks), False, events
+        flags = 0
+        if body.pushes != pushes:
+            flags |= net.D_HEAD
+        if body.pops != pops:
+            flags |= net.D_POP
+        if sim.food != food:
+            flags |= net.D_FOOD
+        if sim.special != special:
+            flags |= net.D_SPECIAL
+        if sim.score != score:
+            flags |= net.D_SCORE
+        if sim.lives != lives:
+            flags |= net.D_LIVES
+        if sim.time_left != time_left:
+            flags |= net.D_TIME
+        if sim.speed != speed:
+            flags |= net.D_SPEED
+        if events & (EV_FOOD | EV_GOLDEN):
+            flags |= net.D_EVENTS
+        if not flags:
+            return None, False, events
+        return net.delta(sim.ticks, flags, (sim.hx, sim.hy), sim.food, sim.special, sim.score, sim.lives,
+                         sim.time_left, sim.speed, events), False, events
+
+
+class Player(asyncio.Protocol):
+    def __init__(self, server):
+        self.server = server
+        self.frames = net.FrameReader()
+        self.transport = None
+        self.room = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.server.players += 1
+
+    def connection_lost(self, exc):
+        self.server.close_room(self)
+        self.server.players -= 1
+
+    def data_received(self, data):
+        try:
+            for payload in self.frames.feed(data):
+                kind, value = net.decode(payload)
+                if kind == net.TURN:
+                    if self.room:
+                        self.room.queue_turn(value)
+                elif kind == net.JOIN:
+                    self.server.join(self, *value)
+                elif kind == net.LEAVE:
+                    self.server.close_room(self)
+                elif kind == net.STATS:
+                    self.send(net.stats(self.server.stats()))
+        except (ValueError, IndexError, UnicodeError) as e:   # struct.error is a ValueError
+            self.send(net.error(f"bad frame: {e}"))
+            self.transport.close()
+            return
+        if len(self.frames.buf) > MAX_FRAME:
+            self.transport.abort()
+
+    def send(self, data):
+        t = self.transport
+        if t.is_closing():
+            return
+        t.write(data)
+        self.server.sent += len(data)
+        if t.get_write_buffer_size() > MAX_BUFFER:
+            self.server.dropped += 1
+            t.abort()
+
+
+class GameServer:
+    def __init__(self, max_rooms=10000, max_board=(200, 200), quantum=QUANTUM, history=20000):
+        self.max_rooms = max_rooms
+        self.max_board = max_board
+        self.quantum = quantum
+        self.heap = []              # (due, n, room)
+        self.n = 0
+        self.rooms = 0
+        self.players = 0
+        # stats
+        self.ticks = 0
+        self.sent = 0
+        self.skipped = 0            # ticks dropped by rooms that fell behind
+        self.dropped = 0            # players cut off for not reading
+        self.games = 0
+        self.lag = deque(maxlen=history)
+        self.t0 = time.perf_counter()
+        self.cpu0 = time.process_time()
+
+    def join(self, player, mode, seed, board, hud):
+        if mode not in MODES:
+            player.send(net.error(f"unknown mode {mode!r}"))
+            return
+        self.close_room(player)
+        w, h = board
+        if not (4 <= w <= self.max_board[0] and 4 <= h <= self.max_board[1]):
+            player.send(net.error(f"board must be 4x4 to {self.max_board[0]}x{self.max_board[1]}"))
+            return
+        if self.rooms >= self.max_rooms:
+            player.send(net.error("server full"))
+            return
+        room = Room(player, mode, seed or random.getrandbits(63), board, hud)
+        player.room = room
+        self.rooms += 1
+        self.games += 1
+        self._schedule(room, asyncio.get_running_loop().time() + 1.0 / room.sim.speed)
+        player.send(net.snapshot(room.sim, 0))
+
+    def close_room(self, player):
+        room = player.room
+        if room:
+            room.closed = True      # left in the heap, skipped when it comes up
+            player.room = None
+            self.rooms -= 1
+
+    def _schedule(self, room, due):
+        self.n += 1
+        heapq.heappush(self.heap, (due, self.n, room))
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        heap, lag = self.heap, self.lag
+        while True:
+            now = loop.time()
+            while heap and heap[0][0] <= now:
+                due, _, room = heapq.heappop(heap)
+                if room.closed:
+                    continue
+                late = now - due
+                if late > MAX_LAG:
+                    self.skipped += int(late * room.sim.speed)
+                    due = now
+                lag.append(late)
+                data, over, events = room.tick()
+                self.ticks += 1
+                player = room.player
+                if data:
+                    player.send(data)
+                if over:
+                    self.close_room(player)
+                    continue
+                due += 1.0 / room.sim.speed
+                if events & EV_HIT:
+                    due += room.pause
+                self._schedule(room, due)
+            await asyncio.sleep(self.quantum)
+
+    def stats(self):
+        lag = [t * 1000 for t in self.lag]
+        return {"rooms": self.rooms, "players": self.players, "games": self.games, "ticks": self.ticks,
+                "bytes": self.sent, "skipped": self.skipped, "dropped": self.dropped,
+                "uptime": time.perf_counter() - self.t0, "cpu": time.process_time() - self.cpu0,
+                "lag_ms": {"p50": percentile(lag, 50), "p99": percentile(lag, 99), "max": max(lag, default=0.0)}}
+
+    async def report(self, every):
+        last = self.stats()
+        while True:
+            await asyncio.sleep(every)
+            s = self.stats()
+            dt = s["uptime"] - last["uptime"]
+            print(f"[server] {s['rooms']} rooms  {(s['ticks'] - last['ticks']) / dt:,.0f} ticks/s"
+                  f"  {(s['bytes'] - last['bytes']) / dt / 1024:,.0f} KiB/s"
+                  f"  lag ms p50 {s['lag_ms']['p50']:.1f} p99 {s['lag_ms']['p99']:.1f}"
+                  f"  cpu {100 * (s['cpu'] - last['cpu']) / dt:.0f}%"
+                  f"  ({s['skipped']} skipped, {s['dropped']} dropped)", flush=True)
+            last = s
+
+
+def parse_args(argv):
+    opts = {"host": "127.0.0.1", "port": 7777, "max_rooms": 10000, "max_board": (200, 200), "stats": 0}
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        val = argv[i + 1] if i + 1 < len(argv) else None
+        if arg == "--host":
+            opts["host"] = val
+        elif arg in ("--port", "--max-rooms"):
+            opts[arg[2:].replace("-", "_")] = int(val)
+        elif arg == "--stats":
+            opts["stats"] = float(val)
+        elif arg == "--max-board":
+            opts["max_board"] = tuple(int(v) for v in val.lower().split("x"))
+        elif arg == "--plugin":
+            load_plugin(val)
+        else:
+            raise SystemExit(f"unknown option {arg!r}; see the top of server.py")
+        i += 2
+    return opts
+
+
+def raise_fd_limit():
+    # a connection per player: allow as many open sockets as the system does
+    if resource is None:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != hard:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        except (ValueError, OSError) as e:
+            print("[server warning] couldn't raise the open file limit:", e)
+
+
+async def serve(opts):
+    game = GameServer(opts["max_rooms"], opts["max_board"])
+    loop = asyncio.get_running_loop()
+    srv = await loop.create_server(lambda: Player(game), opts["host"], opts["port"], backlog=1024)
+    host, port = srv.sockets[0].getsockname()[:2]
+    print(f"[server] listening on {host}:{port}", flush=True)
+    tasks = [game.run()]
+    if opts["stats"]:
+        tasks.append(game.report(opts["stats"]))
+    async with srv:
+        await asyncio.gather(*tasks)
+
+
+if __name__ == "__main__":
+    opts = parse_args(sys.argv[1:])
+    raise_fd_limit()
+    if uvloop:
+        uvloop.install()
+    try:
+        asyncio.run(serve(opts))
+    except KeyboardInterrupt:
+        pass
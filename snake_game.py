@@ -1,9 +1,35 @@
-import pygame, time, random, json, os, sys
-
+import time
+_import_start = time.perf_counter()
+import pygame, random, os, sys, atexit
+
+from highscores import HighscoreStore
+from render import BackgroundLayer, TextCache, DirtyRenderer, SnakeLayer, SpriteAtlas, Camera
+from render import LINK_UP, LINK_DOWN, LINK_LEFT, LINK_RIGHT
+from timing import FramePacer
+from controls import InputQueue
+from assets import AssetManager, FontCache, StartupProfile
+from audio import SoundPlayer, NullPlayer, MIXER_FREQ, MIXER_SIZE, MIXER_CHANNELS, MIXER_BUFFER
+from replay import Replay, ReplayWriter, ReplayInput, ReplayPacer, CODES, REPLAY_DIR, board_start, prune
+from profiler import FrameProfiler
+from capture import FrameCapture, FORMATS as CAPTURE_FORMATS, CAPTURE_FPS
+from autopilot import Autopilot
+from snake_sim import MODES, SnakeSim, EV_FOOD, EV_GOLDEN, EV_HIT, NOOP, load_plugin
+
+# --startup-profile: print where the time to the first menu frame went
+startup = StartupProfile(_import_start) if "--startup-profile" in sys.argv else None
+
+def startup_mark(label):
+    if startup:
+        startup.mark(label)
+
+startup_mark("imports")
+pygame.mixer.pre_init(MIXER_FREQ, MIXER_SIZE, MIXER_CHANNELS, MIXER_BUFFER)
 pygame.init()
+startup_mark("pygame.init")
 
 # Resolve paths relative to this script so running from another cwd still works.
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(BASE_DIR, ".cache")
 
 # Audio device initialization can fail on some systems (e.g., headless/no sound).
 AUDIO_ENABLED = True
@@ -13,6 +39,15 @@ except Exception as e:
     AUDIO_ENABLED = False
     print(f"[audio warning] mixer init failed: {e}")
 
+# effect -> (reserved channels, min seconds between two plays)
+EFFECTS = {
+    "eat": (3, 0.05),
+    "golden": (1, 0.1),
+    "game_over": (1, 0.5),
+}
+sfx = SoundPlayer(EFFECTS) if AUDIO_ENABLED else NullPlayer()
+startup_mark("mixer.init")
+
 # Get display resolution (safer across platforms)
 info = pygame.display.Info()
 SCREEN_W, SCREEN_H = info.current_w, info.current_h
@@ -21,6 +56,7 @@ SCREEN_W, SCREEN_H = info.current_w, info.current_h
 flags = pygame.FULLSCREEN | pygame.SCALED
 screen = pygame.display.set_mode((SCREEN_W, SCREEN_H), flags)
 pygame.display.set_caption("Snake Game")
+startup_mark("set_mode")
 
 BASE_DIV = 30  # increase -> smaller cells; decrease -> larger cells
 BLOCK = max(16, min(SCREEN_W, SCREEN_H) // BASE_DIV)
@@ -30,10 +66,12 @@ HEAD_SIZE = int(BLOCK * 1.5)
 TAIL_SIZE = int(BLOCK * 1.25)
 HEART_SIZE = 40
 
-# Fonts scaled
-font = pygame.font.SysFont("consolas", max(24, BLOCK // 2), bold=True)
-menu_font = pygame.font.SysFont("consolas", max(40, int(BLOCK * 0.9)), bold=True)
-big_font = pygame.font.SysFont("consolas", max(24, int(BLOCK * 1.6)), bold=True)
+# Fonts scaled (the font file is looked up once and remembered across runs)
+fonts = FontCache(os.path.join(CACHE_DIR, "fonts.json"))
+font = fonts.get("consolas", max(24, BLOCK // 2), bold=True)
+menu_font = fonts.get("consolas", max(40, int(BLOCK * 0.9)), bold=True)
+big_font = fonts.get("consolas", max(24, int(BLOCK * 1.6)), bold=True)
+startup_mark("fonts")
 
 # Colors
 WHITE = (255, 255, 255)
@@ -72,873 +110,614 @@ ASSETS_SOUNDS = {
     "golden": "golden.mp3",
 }
 
-# Image & sound loaders
-def safe_load_image(fname, scale=None, placeholder_color=(200, 0, 0)):
-    path = os.path.join(IMG_DIR, fname)
-    try:
-        img = pygame.image.load(path).convert_alpha()
-        if scale:
-            img = pygame.transform.scale(img, scale)
-        return img
-    except Exception as e:
-        print(f"[image warning] couldn't load {path}: {e}")
-        if scale:
-            surf = pygame.Surface(scale, pygame.SRCALPHA)
-            surf.fill(placeholder_color)
-            return surf
-        return None
-
-def safe_load_sound(fname):
-    if not AUDIO_ENABLED:
-        return None
-    path = os.path.join(SND_DIR, fname)
-    try:
-        snd = pygame.mixer.Sound(path)
-        return snd
-    except Exception as e:
-        print(f"[sound warning] couldn't load {path}: {e}")
-        return None
-
-# load & scale images
-icon = safe_load_image(ASSETS_IMAGES["icon"], scale=(HEAD_SIZE, HEAD_SIZE))
-if icon:
-    pygame.display.set_icon(icon)
-
-apple_img = safe_load_image(ASSETS_IMAGES["apple"], scale=(BLOCK, BLOCK))
-golden_img = safe_load_image(ASSETS_IMAGES["golden"], scale=(BLOCK, BLOCK))
+IMAGE_SIZES = {
+    "icon": (HEAD_SIZE, HEAD_SIZE),
+    "apple": (BLOCK, BLOCK), "golden": (BLOCK, BLOCK),
+    "head_up": (HEAD_SIZE, HEAD_SIZE), "head_down": (HEAD_SIZE, HEAD_SIZE),
+    "head_left": (HEAD_SIZE, HEAD_SIZE), "head_right": (HEAD_SIZE, HEAD_SIZE),
+    "body": (BLOCK, BLOCK), "body_h": (BLOCK, BLOCK),
+    "tail_up": (TAIL_SIZE, TAIL_SIZE), "tail_down": (TAIL_SIZE, TAIL_SIZE),
+    "tail_left": (TAIL_SIZE, TAIL_SIZE), "tail_right": (TAIL_SIZE, TAIL_SIZE),
+    "start_bg": (SCREEN_W, SCREEN_H), "game_over_bg": (SCREEN_W, SCREEN_H),
+    "heart": (HEART_SIZE, HEART_SIZE),
+}
 
-head_up = safe_load_image(ASSETS_IMAGES["head_up"], scale=(HEAD_SIZE, HEAD_SIZE))
-head_down = safe_load_image(ASSETS_IMAGES["head_down"], scale=(HEAD_SIZE, HEAD_SIZE))
-head_left = safe_load_image(ASSETS_IMAGES["head_left"], scale=(HEAD_SIZE, HEAD_SIZE))
-head_right = safe_load_image(ASSETS_IMAGES["head_right"], scale=(HEAD_SIZE, HEAD_SIZE))
+# Module-level names each screen draws with, and the asset behind each.
+# They stay None until use_assets() binds them for the screen about to show.
+SCREEN_IMAGES = {
+    "menu": {"icon": "icon", "start_bg": "start_bg"},
+    "game": {
+        "apple_img": "apple", "golden_img": "golden",
+        "head_up": "head_up", "head_down": "head_down", "head_left": "head_left", "head_right": "head_right",
+        "body_img": "body", "body_img_h": "body_h",
+        "tail_up": "tail_up", "tail_down": "tail_down", "tail_left": "tail_left", "tail_right": "tail_right",
+        "heart_img": "heart",
+    },
+    "game_over": {"game_over_bg": "game_over_bg"},
+}
+SCREEN_SOUNDS = {
+    "game": ("eat", "game_over", "golden"),
+}
 
-body_img = safe_load_image(ASSETS_IMAGES["body"], scale=(BLOCK, BLOCK))
-body_img_h = safe_load_image(ASSETS_IMAGES["body_h"], scale=(BLOCK, BLOCK))
+icon = start_bg = game_over_bg = None
+apple_img = golden_img = heart_img = None
+head_up = head_down = head_left = head_right = None
+body_img = body_img_h = None
+tail_up = tail_down = tail_left = tail_right = None
+
+# scaled copies of the images are kept per resolution in .cache/scaled
+# and sound effects as decoded PCM in .cache/pcm
+assets = AssetManager(IMG_DIR, SND_DIR, audio=AUDIO_ENABLED, cache_dir=os.path.join(CACHE_DIR, "scaled"),
+                      pcm_dir=os.path.join(CACHE_DIR, "pcm"))
+atexit.register(assets.shutdown)
+
+def queue_assets():
+    # decode everything in the background, in the order screens need it
+    for screen_name in ("menu", "game", "game_over"):
+        for name in SCREEN_IMAGES.get(screen_name, {}).values():
+            assets.queue_image(name, ASSETS_IMAGES[name], IMAGE_SIZES[name])
+        for name in SCREEN_SOUNDS.get(screen_name, ()):
+            assets.queue_sound(name, ASSETS_SOUNDS[name])
+
+music_loaded = False
+
+def load_music():
+    global music_loaded
+    if music_loaded or not AUDIO_ENABLED:
+        return
+    music_loaded = True
+    sfx.load_music(os.path.join(SND_DIR, ASSETS_SOUNDS["music"]))
+
+def use_assets(screen_name):
+    # bind the sprites and sounds a screen draws with, waiting only for the
+    # ones the background decode hasn't finished yet
+    g = globals()
+    for var, name in SCREEN_IMAGES.get(screen_name, {}).items():
+        if g[var] is None:
+            g[var] = assets.image(name, ASSETS_IMAGES[name], IMAGE_SIZES[name])
+    for name in SCREEN_SOUNDS.get(screen_name, ()):
+        if not sfx.loaded(name):
+            sfx.add(name, assets.sound(name, ASSETS_SOUNDS[name]))
+    if screen_name == "menu" and icon:
+        pygame.display.set_icon(icon)
+    if screen_name == "game":
+        build_snake_atlas()
+        load_music()
+
+queue_assets()
+startup_mark("assets queued")
 
-tail_up = safe_load_image(ASSETS_IMAGES["tail_up"], scale=(TAIL_SIZE, TAIL_SIZE))
-tail_down = safe_load_image(ASSETS_IMAGES["tail_down"], scale=(TAIL_SIZE, TAIL_SIZE))
-tail_left = safe_load_image(ASSETS_IMAGES["tail_left"], scale=(TAIL_SIZE, TAIL_SIZE))
-tail_right = safe_load_image(ASSETS_IMAGES["tail_right"], scale=(TAIL_SIZE, TAIL_SIZE))
+clock = pygame.time.Clock()
 
-start_bg = safe_load_image(ASSETS_IMAGES["start_bg"], scale=(SCREEN_W, SCREEN_H))
-game_over_bg = safe_load_image(ASSETS_IMAGES["game_over_bg"], scale=(SCREEN_W, SCREEN_H))
-heart_img = safe_load_image(ASSETS_IMAGES["heart"], scale=(HEART_SIZE, HEART_SIZE))
+# Frames are drawn (and input polled) at the display rate; each mode's speed
+# only sets how often the simulation ticks underneath.
+try:
+    RENDER_FPS = max(pygame.display.get_desktop_refresh_rates()) or 60
+except Exception:
+    RENDER_FPS = 60
+pacer = FramePacer(RENDER_FPS, clock.tick)
+inputs = InputQueue()
+FRAME_REPORT = "--frame-report" in sys.argv
+
+# Frame profiler (see profiler.py): F3 in game, or start with --profile.
+# Each game's frames are written to profiles/ as a Chrome trace.
+PROFILE_KEY = pygame.K_F3
+PROFILE_DIR = os.path.join(BASE_DIR, "profiles")
+prof = FrameProfiler(RENDER_FPS)
+prof.enabled = "--profile" in sys.argv
+PROFILE_FONT_SIZE = 14
+
+# Gameplay capture (see capture.py): --capture png|raw|pipe saves every game
+# to captures/ (--capture-dir), on a frame timeline of --capture-fps; pipe
+# runs --capture-cmd (ffmpeg by default). F9 starts or stops it mid-game.
+CAPTURE_KEY = pygame.K_F9
+CAPTURE_DIR = os.path.join(BASE_DIR, "captures")
+
+def flag_value(name, default=None):
+    # the value after `name` on the command line
+    if name in sys.argv[:-1]:
+        return sys.argv[sys.argv.index(name) + 1]
+    return default
+
+capture_format = flag_value("--capture")
+if capture_format is not None and capture_format not in CAPTURE_FORMATS:
+    print(f"[capture warning] unknown format {capture_format!r}, expected one of {', '.join(CAPTURE_FORMATS)}")
+    capture_format = None
+try:
+    capture_fps = int(flag_value("--capture-fps", CAPTURE_FPS))
+    if capture_fps < 1:
+        raise ValueError
+except ValueError:
+    raise SystemExit(f"--capture-fps: expected a whole number of frames per second, got {flag_value('--capture-fps')!r}")
+capture = FrameCapture(capture_format or "png", flag_value("--capture-dir", CAPTURE_DIR),
+                       capture_fps, flag_value("--capture-cmd"))
+capture.enabled = capture_format is not None
+atexit.register(capture.close)
+
+# Every game is recorded to replays/ (see replay.py). The game's SnakeSim
+# is seeded per game; while a replay plays, `replaying` feeds the recorded
+# turns in place of the keyboard.
+REPLAY_KEEP = 100
+recorder = None
+replaying = None
+
+# Autopilot (see autopilot.py): switched on in the start menu (or with
+# --autopilot), it steers every game in place of the arrow keys. Its games
+# are recorded like any other but don't count for highscores.
+AUTOPILOT_BUDGET_US = 2000
+autopilot_on = "--autopilot" in sys.argv
+pilot = None
 
-# sounds
-music_path = os.path.join(SND_DIR, ASSETS_SOUNDS["music"])
-if AUDIO_ENABLED and os.path.exists(music_path):
-    try:
-        pygame.mixer.music.load(music_path)
-        pygame.mixer.music.set_volume(0.28)
-    except Exception as e:
-        print("[music warning]", e)
-elif AUDIO_ENABLED:
-    print("[music warning] background music file missing.")
+# Highscores JSON
+HIGHSCORE_FILE = os.path.join(BASE_DIR, "highscores.json")
 
-eat_sound = safe_load_sound(ASSETS_SOUNDS["eat"])
-game_over_sound = safe_load_sound(ASSETS_SOUNDS["game_over"])
-golden_sound = safe_load_sound(ASSETS_SOUNDS["golden"])
+# --plugin FILE (repeatable): a mode plugin, loaded before the menu and the
+# highscore table are built from snake_sim.MODES
+for i, arg in enumerate(sys.argv[:-1]):
+    if arg == "--plugin":
+        try:
+            load_plugin(sys.argv[i + 1])
+        except Exception as e:
+            print(f"[mode warning] couldn't load {sys.argv[i + 1]}: {e}")
 
-clock = pygame.time.Clock()
+TRACKED = [m for m, r in MODES.items() if r["tracked"]]
 
-# Highscores JSON
-HIGHSCORE_FILE = os.path.join(BASE_DIR, "highscores.json")
-TRACKED = ["Classic", "Timed", "Hardcore", "Survival"]
+highscores = HighscoreStore(HIGHSCORE_FILE, TRACKED)
+startup_mark("highscores")
 
 def ensure_highscores():
     if not os.path.exists(HIGHSCORE_FILE):
-        data = {m: 0 for m in TRACKED}
-        with open(HIGHSCORE_FILE, "w") as f:
-            json.dump(data, f)
+        highscores.flush(force=True)
 ensure_highscores()
 
 def load_highscores():
-    try:
-        with open(HIGHSCORE_FILE, "r") as f:
-            return json.load(f)
-    except Exception as e:
-        print("[hs warning]", e)
-        return {m: 0 for m in TRACKED}
+    return highscores.all()
 
 def save_highscore(mode, score):
-    if mode not in TRACKED:
-        return
-    data = load_highscores()
-    if score > data.get(mode, 0):
-        data[mode] = score
-        try:
-            with open(HIGHSCORE_FILE, "w") as f:
-                json.dump(data, f)
-        except Exception as e:
-            print("[hs warning] couldn't save:", e)
-
-# Drawing helpers
-def draw_grid():
-    for x in range(0, SCREEN_W, BLOCK):
-        pygame.draw.line(screen, GRID_COLOR, (x, 0), (x, SCREEN_H))
-    for y in range(0, SCREEN_H, BLOCK):
-        pygame.draw.line(screen, GRID_COLOR, (0, y), (SCREEN_W, y))
-
-def draw_snake(snake_list, dx, dy):
-    for i, (x, y) in enumerate(snake_list):
-        px, py = x, y
-        # head
-        if i == len(snake_list) - 1:
-            offset = (BLOCK - HEAD_SIZE) // 2
-            if dx > 0:
-                screen.blit(head_right, (px + offset, py + offset))
-            elif dx < 0:
-                screen.blit(head_left, (px + offset, py + offset))
-            elif dy > 0:
-                screen.blit(head_down, (px + offset, py + offset))
-            elif dy < 0:
-                screen.blit(head_up, (px + offset, py + offset))
-        # tail
-        elif i == 0 and len(snake_list) >= 2:
-            offset = (BLOCK - TAIL_SIZE) // 2
-            x2, y2 = snake_list[1]
-            dx_tail = x2 - px
-            dy_tail = y2 - py
-            if dx_tail > 0:
-                screen.blit(tail_left, (px, py + offset))
-            elif dx_tail < 0:
-                screen.blit(tail_right, (px + offset, py + offset))
-            elif dy_tail > 0:
-                screen.blit(tail_up, (px + offset, py + offset))
-            elif dy_tail < 0:
-                screen.blit(tail_down, (px + offset, py + offset))
-        # body
-        else:
-            if len(snake_list) == 2:
-                continue
-            prev_x, prev_y = snake_list[i - 1]
-            next_x, next_y = snake_list[i + 1]
-            if prev_x == next_x:
-                screen.blit(body_img, (px, py))
-            elif prev_y == next_y:
-                screen.blit(body_img_h, (px, py))
-            else:
-                screen.blit(body_img_h, (px, py))
-
-def get_valid_food_position(snake, blocked=None):
-    blocked_set = set()
-    if blocked:
-        blocked_set = {(bx, by) for bx, by in blocked}
-
-    # Randomized attempts first for natural spawn distribution.
-    cells_x = SCREEN_W // BLOCK
-    cells_y = SCREEN_H // BLOCK
-    max_attempts = max(100, cells_x * cells_y)
-
-    for _ in range(max_attempts):
-        x = random.randrange(0, SCREEN_W, BLOCK)
-        y = random.randrange(0, SCREEN_H, BLOCK)
-        if x < 200 and y < 80:
-            continue
-        if [x, y] in snake:
-            continue
-        if (x, y) in blocked_set:
-            continue
-        return x, y
-
-    # Deterministic fallback avoids rare infinite loops on dense boards.
-    for y in range(0, SCREEN_H, BLOCK):
-        for x in range(0, SCREEN_W, BLOCK):
-            if x < 200 and y < 80:
-                continue
-            if [x, y] in snake:
-                continue
-            if (x, y) in blocked_set:
-                continue
-            return x, y
-
-    return None, None
-
-def show_score_and_high(mode, score):
-    scores = load_highscores()
-    high = scores.get(mode, 0)
-    score_text = font.render(f"Score: {score}", True, WHITE)
-    screen.blit(score_text, (10, 10))
-    if mode in TRACKED:
-        high_text = font.render(f"High Score: {high}", True, WHITE)
-        screen.blit(high_text, (10, 10 + score_text.get_height() + 6))
-
-# Game Modes (each is its own loop)
-
-# Classic - walls kill, self kill, tracked highscore
-def game_loop_classic():
-    mode = "Classic"
-    high_before = load_highscores().get(mode, 0)
-
-    # start centered on grid (multiples of BLOCK)
-    x0 = (SCREEN_W // 2 // BLOCK) * BLOCK
-    y0 = (SCREEN_H // 2 // BLOCK) * BLOCK
-    x, y = x0, y0
-    dx, dy = 0, 0
-    snake = [[x - BLOCK, y], [x, y]]
-    length = 2
-    score = 0
-    speed = 5
-
-    special_active = False
-    special_timer = 0
-    special_duration = 5
-    special_interval = 30
-    last_special = time.time()
-    special_x, special_y = 0, 0
-
-    food_x, food_y = get_valid_food_position(snake)
-
+    if replaying is None and pilot is None:
+        highscores.submit(mode, score)
+
+# Board in cells. Coordinates below are cells; multiply by BLOCK to draw.
+# (The last row/column may be partly off-screen, same as before.)
+# --board WxH plays on a bigger board than fits on the screen: the view
+# scrolls to follow the head (render.Camera) and only what is in it is drawn.
+BOARD_SIZE = None
+if "--board" in sys.argv[:-1]:
     try:
-        pygame.mixer.music.play(-1)
-    except:
-        pass
-
-    running = True
-    while running:
-        for e in pygame.event.get():
-            if e.type == pygame.QUIT:
-                pygame.quit(); sys.exit()
-            if e.type == pygame.KEYDOWN:
-                if e.key == pygame.K_ESCAPE:
-                    try:
-                        pygame.mixer.music.stop()
-                    except:
-                        pass
-                    return
-                if e.key == pygame.K_LEFT and dx == 0:
-                    dx, dy = -BLOCK, 0
-                elif e.key == pygame.K_RIGHT and dx == 0:
-                    dx, dy = BLOCK, 0
-                elif e.key == pygame.K_UP and dy == 0:
-                    dx, dy = 0, -BLOCK
-                elif e.key == pygame.K_DOWN and dy == 0:
-                    dx, dy = 0, BLOCK
-
-        x += dx; y += dy
-
-        # special spawn/despawn
-        now = time.time()
-        if not special_active and now - last_special > special_interval:
-            special_x, special_y = get_valid_food_position(snake, blocked=[(food_x, food_y)])
-            special_active = True
-            special_timer = now
-        if special_active and now - special_timer > special_duration:
-            special_active = False
-            last_special = now
-
-        # walls kill
-        if x < 0 or x >= SCREEN_W or y < 0 or y >= SCREEN_H:
-            running = False
-            break
-
-        screen.fill(BG_COLOR)
-        draw_grid()
-        if apple_img and food_x is not None:
-            screen.blit(apple_img, (food_x, food_y))
-        snake.append([x, y])
-        if len(snake) > length:
-            del snake[0]
-
-        # self collision
-        if length >= 3 and [x, y] in snake[:-1]:
-            running = False
-            break
-
-        draw_snake(snake, dx, dy)
-        show_score_and_high(mode, score)
-        if dx == 0 and dy == 0:
-            press = font.render("Press Arrow Key to Start", True, WHITE)
-            screen.blit(press, (SCREEN_W//2 - press.get_width()//2, SCREEN_H//2 + 220))
-        if special_active and golden_img:
-            screen.blit(golden_img, (special_x, special_y))
-
-        pygame.display.update()
-        clock.tick(speed)
-
-        # Eat food
-        if food_x is not None and x == food_x and y == food_y:
-            food_x, food_y = get_valid_food_position(
-                snake,
-                blocked=[(special_x, special_y)] if special_active else None,
-            )
-            length += 1
-            score += 10
-            speed = min(speed + 0.3, 30)
-            if score > high_before:
-                save_highscore(mode, score)
-            try:
-                if eat_sound: eat_sound.play()
-            except:
-                pass
-
-        # Eat special fruit
-        if special_active and x == special_x and y == special_y:
-            score += 30
-            length += 2
-            special_active = False
-            last_special = now
-            if score > high_before:
-                save_highscore(mode, score)
-            try:
-                if golden_sound: golden_sound.play()
-            except:
-                pass
-
-    if score > high_before:
-        save_highscore(mode, score)
-    try:
-        pygame.mixer.music.stop()
-        if game_over_sound: game_over_sound.play()
-    except:
-        pass
-
-    game_over_screen(mode, score)
-
-# Timed - 60s, wrap walls, self kills
-def game_loop_timed():
-    mode = "Timed"
-    high_before = load_highscores().get(mode, 0)
-
-    x0 = (SCREEN_W // 2 // BLOCK) * BLOCK
-    y0 = (SCREEN_H // 2 // BLOCK) * BLOCK
-    x, y = x0, y0
-    dx, dy = 0, 0
-    snake = [[x - BLOCK, y], [x, y]]
-    length = 2
-    score = 0
-    speed = 5
-    time_left = 60
-    last_tick = time.time()
-
-    special_active = False
-    special_timer = 0
-    special_duration = 5
-    special_interval = 30
-    last_special = time.time()
-    special_x, special_y = 0, 0
-
-    food_x, food_y = get_valid_food_position(snake)
+        BOARD_SIZE = tuple(int(v) for v in flag_value("--board").lower().split("x"))
+        if len(BOARD_SIZE) != 2 or min(BOARD_SIZE) < 3:
+            raise ValueError
+    except ValueError:
+        raise SystemExit(f"--board: expected WxH in cells, at least 3x3 (e.g. 200x150), got {flag_value('--board')!r}")
+
+def set_board(screen_w, screen_h, block, grid=None):
+    # also used to re-run replays recorded on a different display
+    global SCREEN_W, SCREEN_H, BLOCK, GRID_W, GRID_H, HUD_W, HUD_H, LARGE_BOARD
+    SCREEN_W, SCREEN_H, BLOCK = screen_w, screen_h, block
+    fits = (-(-SCREEN_W // BLOCK), -(-SCREEN_H // BLOCK))
+    GRID_W, GRID_H = tuple(grid) if grid else fits
+    LARGE_BOARD = (GRID_W, GRID_H) != fits
+    # food never spawns under the score overlay (top-left 200x80 px), unless
+    # the board scrolls under it
+    HUD_W = 0 if LARGE_BOARD else -(-200 // BLOCK)
+    HUD_H = 0 if LARGE_BOARD else -(-80 // BLOCK)
+
+set_board(SCREEN_W, SCREEN_H, BLOCK, BOARD_SIZE)
+
+def start_cell():
+    # middle of the screen, or of the board when it scrolls
+    return board_start((SCREEN_W, SCREEN_H), BLOCK, (GRID_W, GRID_H))
 
+# Drawing helpers
+# The play field goes through a dirty-rect renderer: loops update keyed
+# sprites and present() repaints only the rects that changed.
+LAYER_ITEMS, LAYER_SNAKE, LAYER_HUD, LAYER_DEBUG = 0, 1, 2, 3
+
+background = BackgroundLayer(BG_COLOR, GRID_COLOR)
+renderer = DirtyRenderer(background, BLOCK, fixed_from=LAYER_HUD)
+snake_layer = SnakeLayer(renderer, LAYER_SNAKE)
+camera = None
+
+def report_frames(title):
+    # --frame-report: print frame pacing / input latency once per game
+    if FRAME_REPORT and pacer.frame_times:
+        print(pacer.report(title))
+        print(inputs.report())
+        print(sfx.report())
+        if pilot:
+            print(pilot.report())
+        pacer.reset()
+        inputs.reset_stats()
+
+def report_startup():
+    # once, right after the first menu frame
+    global startup
+    if startup:
+        startup.mark("first frame")
+        print(startup.report())
+        print(assets.report())
+        startup = None
+
+def start_recording(mode, seed):
     try:
-        pygame.mixer.music.play(-1)
-    except:
-        pass
-
-    running = True
-    while running:
-        now = time.time()
-        if now - last_tick >= 1:
-            time_left -= 1
-            last_tick = now
-        if time_left <= 0:
-            running = False
-            break
-
-        for e in pygame.event.get():
-            if e.type == pygame.QUIT:
-                pygame.quit(); sys.exit()
-            if e.type == pygame.KEYDOWN:
-                if e.key == pygame.K_ESCAPE:
-                    try:
-                        pygame.mixer.music.stop()
-                    except:
-                        pass
-                    return
-                if e.key == pygame.K_LEFT and dx == 0:
-                    dx, dy = -BLOCK, 0
-                elif e.key == pygame.K_RIGHT and dx == 0:
-                    dx, dy = BLOCK, 0
-                elif e.key == pygame.K_UP and dy == 0:
-                    dx, dy = 0, -BLOCK
-                elif e.key == pygame.K_DOWN and dy == 0:
-                    dx, dy = 0, BLOCK
-
-        x += dx; y += dy
-
-        # special spawn/despawn
-        if not special_active and now - last_special > special_interval:
-            special_x, special_y = get_valid_food_position(snake, blocked=[(food_x, food_y)])
-            special_active = True
-            special_timer = now
-        if special_active and now - special_timer > special_duration:
-            special_active = False
-            last_special = now
-
-        # wrap walls
-        if x < 0: x = SCREEN_W - BLOCK
-        elif x >= SCREEN_W: x = 0
-        if y < 0: y = SCREEN_H - BLOCK
-        elif y >= SCREEN_H: y = 0
-
-        snake.append([x, y])
-        if len(snake) > length:
-            del snake[0]
-
-        # self collision
-        if length >= 3 and [x, y] in snake[:-1]:
-            running = False
-            break
-
-        # eat
-        if food_x is not None and x == food_x and y == food_y:
-            food_x, food_y = get_valid_food_position(
-                snake,
-                blocked=[(special_x, special_y)] if special_active else None,
-            )
-            length += 1
-            score += 10
-            time_left += 2
-            speed = min(speed + 0.3, 30)
-            if score > high_before:
-                save_highscore(mode, score)
-            try:
-                if eat_sound: eat_sound.play()
-            except:
-                pass
-
-        if special_active and x == special_x and y == special_y:
-            score += 30
-            length += 2
-            special_active = False
-            last_special = now
-            if score > high_before:
-                save_highscore(mode, score)
-            try:
-                if golden_sound: golden_sound.play()
-            except:
-                pass
-
-        # draw
-        screen.fill(BG_COLOR)
-        draw_grid()
-        if apple_img and food_x is not None:
-            screen.blit(apple_img, (food_x, food_y))
-        if special_active and golden_img:
-            screen.blit(golden_img, (special_x, special_y))
-        draw_snake(snake, dx, dy)
-        show_score_and_high(mode, score)
-        timer_text = font.render(f"Time: {time_left}s", True, WHITE)
-        screen.blit(timer_text, (SCREEN_W - timer_text.get_width() - 20, 10))
-        if dx == 0 and dy == 0:
-            press = font.render("Press Arrow Key to Start", True, WHITE)
-            screen.blit(press, (SCREEN_W//2 - press.get_width()//2, SCREEN_H//2 + 220))
+        os.makedirs(REPLAY_DIR, exist_ok=True)
+    except OSError as e:
+        print("[replay warning]", e)
+        return None
+    prune(REPLAY_DIR, REPLAY_KEEP - 1)
+    rep = Replay(mode, seed, (SCREEN_W, SCREEN_H), BLOCK, (GRID_W, GRID_H), (HUD_W, HUD_H))
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{mode}-{seed:x}.snkr"
+    return ReplayWriter(os.path.join(REPLAY_DIR, name), rep)
+
+def start_scene(mode):
+    # new game: pick its seed and start recording it, forget the previous
+    # scene, repaint everything next frame
+    global recorder, pilot
+    if replaying:
+        seed = replaying.replay.seed
+    else:
+        seed = random.getrandbits(63)
+        recorder = start_recording(mode, seed)
+    pilot = None
+    if autopilot_on and not replaying:
+        pilot = Autopilot(GRID_W, GRID_H, wrap=MODES[mode]["walls"] == "wrap", budget_us=AUTOPILOT_BUDGET_US)
+    reset_view(mode)
+    return seed
+
+def reset_view(title):
+    # fresh play field for a game (also used by client.py, whose games run
+    # on the server)
+    global camera
+    use_assets("game")
+    snake_layer.clear()
+    renderer.reset()
+    renderer.scroll(0, 0)
+    camera = Camera((SCREEN_W, SCREEN_H), (GRID_W * BLOCK, GRID_H * BLOCK)) if LARGE_BOARD else None
+    pacer.reset()
+    inputs.clear()
+    prof.reset(title)
+    if capture.enabled:
+        capture.start(title)
+
+def events():
+    # this frame's events; the profiler and capture hotkeys work the same in every loop
+    evs = pygame.event.get()
+    for e in evs:
+        if e.type == pygame.KEYDOWN and e.key == PROFILE_KEY and not prof.toggle():
+            renderer.remove("profiler")
+        if e.type == pygame.KEYDOWN and e.key == CAPTURE_KEY:
+            capture.enabled = not capture.enabled
+            if capture.enabled:
+                capture.start(prof.title)
+            else:
+                capture.stop()
+    return evs
+
+def present():
+    if prof.enabled:
+        prof.mark("overlay")
+        panel = prof.overlay(fonts.get("consolas", PROFILE_FONT_SIZE))
+        pos = (SCREEN_W - panel.get_width() - 10, SCREEN_H - panel.get_height() - 10)
+        renderer.set("profiler", panel, pos, LAYER_DEBUG)
+    prof.mark("compose")
+    rects = renderer.present(screen, update=False)
+    prof.mark("flip")
+    if rects is None:
         pygame.display.update()
-        clock.tick(speed)
-
-    if score > high_before:
-        save_highscore(mode, score)
-    try:
-        pygame.mixer.music.stop()
-        if game_over_sound: game_over_sound.play()
-    except:
-        pass
-    game_over_screen(mode, score)
-
-# Hardcore - double starting speed, walls kill & self kill
-def game_loop_hardcore():
-    mode = "Hardcore"
-    high_before = load_highscores().get(mode, 0)
-
-    x0 = (SCREEN_W // 2 // BLOCK) * BLOCK
-    y0 = (SCREEN_H // 2 // BLOCK) * BLOCK
-    x, y = x0, y0
-    dx, dy = 0, 0
-    snake = [[x - BLOCK, y], [x, y]]
-    length = 2
-    score = 0
-    speed = min(40, 10)
-
-    special_active = False
-    special_timer = 0
-    special_duration = 5
-    special_interval = 30
-    last_special = time.time()
-    special_x, special_y = 0, 0
-
-    food_x, food_y = get_valid_food_position(snake)
-
-    try:
-        pygame.mixer.music.play(-1)
-    except:
-        pass
-
-    running = True
-    while running:
-        now = time.time()
-        if not special_active and now - last_special > special_interval:
-            special_x, special_y = get_valid_food_position(snake, blocked=[(food_x, food_y)])
-            special_active = True
-            special_timer = now
-        if special_active and now - special_timer > special_duration:
-            special_active = False
-            last_special = now
-
-        for e in pygame.event.get():
-            if e.type == pygame.QUIT:
-                pygame.quit(); sys.exit()
-            if e.type == pygame.KEYDOWN:
-                if e.key == pygame.K_ESCAPE:
-                    try:
-                        pygame.mixer.music.stop()
-                    except:
-                        pass
-                    return
-                if e.key == pygame.K_LEFT and dx == 0:
-                    dx, dy = -BLOCK, 0
-                elif e.key == pygame.K_RIGHT and dx == 0:
-                    dx, dy = BLOCK, 0
-                elif e.key == pygame.K_UP and dy == 0:
-                    dx, dy = 0, -BLOCK
-                elif e.key == pygame.K_DOWN and dy == 0:
-                    dx, dy = 0, BLOCK
-
-        x += dx; y += dy
-
-        # walls kill
-        if x < 0 or x >= SCREEN_W or y < 0 or y >= SCREEN_H:
-            running = False
-            break
-
-        snake.append([x, y])
-        if len(snake) > length:
-            del snake[0]
+    elif rects:
+        pygame.display.update(rects)
+    inputs.presented()
+    if capture.session:
+        prof.mark("capture")
+        capture.grab(screen, rects != [])
+
+def end_frame():
+    prof.mark("wait")
+    pacer.end_frame()
+    prof.end_frame(pacer.ticks)
+
+text_cache = TextCache()
+
+def render_text(f, text, color):
+    return text_cache.render(f, text, color)
+
+# Every head, body, corner and tail variant lives in one atlas surface, so
+# the snake is drawn from a single source in one blits() call.
+SNAKE_SPRITES = ("head_up", "head_down", "head_left", "head_right", "body_img", "body_img_h",
+                 "tail_up", "tail_down", "tail_left", "tail_right")
+# body sprite for each pair of neighbour links (see render.SnakeLayer)
+BODY_SPRITES = {
+    LINK_UP | LINK_DOWN: "body_img",
+    LINK_LEFT | LINK_RIGHT: "body_img_h",
+    LINK_UP | LINK_RIGHT: "corner_up_right",
+    LINK_UP | LINK_LEFT: "corner_up_left",
+    LINK_DOWN | LINK_RIGHT: "corner_down_right",
+    LINK_DOWN | LINK_LEFT: "corner_down_left",
+}
+snake_atlas = None
+
+def corner_sprite(links):
+    # there are no corner images: join the half of the vertical body that
+    # reaches the up/down neighbour with the half of the horizontal body that
+    # reaches the left/right one, both running through the middle of the cell
+    v, h = body_img, body_img_h
+    vb, hb = v.get_bounding_rect(), h.get_bounding_rect()
+    surf = pygame.Surface((BLOCK, BLOCK), pygame.SRCALPHA)
+    if links & LINK_UP:
+        area = pygame.Rect(0, 0, BLOCK, hb.bottom)
+    else:
+        area = pygame.Rect(0, hb.top, BLOCK, BLOCK - hb.top)
+    surf.blit(v, area.topleft, area)
+    if links & LINK_LEFT:
+        area = pygame.Rect(0, 0, vb.right, BLOCK)
+    else:
+        area = pygame.Rect(vb.left, 0, BLOCK - vb.left, BLOCK)
+    surf.blit(h, area.topleft, area)
+    return surf
+
+def build_snake_atlas():
+    global snake_atlas
+    if snake_atlas is None:
+        images = {name: globals()[name] for name in SNAKE_SPRITES}
+        for links, name in BODY_SPRITES.items():
+            if name not in images:
+                images[name] = corner_sprite(links)
+        snake_atlas = SpriteAtlas(images)
+
+def atlas_sprite(name, pos):
+    return snake_atlas.surface, pos, snake_atlas.rects[name]
+
+def segment_sprite(snake, i, links, dx, dy):
+    # (atlas, pixel pos, area) for segment i of the snake (0 = tail), or None;
+    # links says which neighbours it joins (cached by snake_layer)
+    x, y = snake[i]
+    px, py = x * BLOCK, y * BLOCK
+    # head (faces right before the first move, body is to its left)
+    if i == len(snake) - 1:
+        offset = (BLOCK - HEAD_SIZE) // 2
+        if dy > 0:
+            return atlas_sprite("head_down", (px + offset, py + offset))
+        elif dy < 0:
+            return atlas_sprite("head_up", (px + offset, py + offset))
+        elif dx < 0:
+            return atlas_sprite("head_left", (px + offset, py + offset))
+        return atlas_sprite("head_right", (px + offset, py + offset))
+    # tail, pointing away from the segment it joins
+    if i == 0:
+        offset = (BLOCK - TAIL_SIZE) // 2
+        if links == LINK_RIGHT:
+            return atlas_sprite("tail_left", (px, py + offset))
+        elif links == LINK_LEFT:
+            return atlas_sprite("tail_right", (px + offset, py + offset))
+        elif links == LINK_DOWN:
+            return atlas_sprite("tail_up", (px + offset, py + offset))
+        elif links == LINK_UP:
+            return atlas_sprite("tail_down", (px + offset, py + offset))
+        return None
+    # body: straight or a corner (anything else is a snake folded onto itself)
+    name = BODY_SPRITES.get(links)
+    if name is None:
+        name = "body_img" if links & (LINK_UP | LINK_DOWN) else "body_img_h"
+    return atlas_sprite(name, (px, py))
+
+def draw_snake(snake, dx, dy, alpha=1.0):
+    # alpha: fraction of the way to the next tick, for sliding head/tail
+    fill = "body_img" if len(snake) > 1 and snake[0][0] == snake[1][0] else "body_img_h"
+    fill = (snake_atlas.surface, snake_atlas.rects[fill])
+    if camera:
+        # follow the head where it is drawn this frame (sliding between ticks)
+        hx, hy = snake[-1]
+        t = 1.0 - alpha
+        renderer.scroll(*camera.follow((hx - dx * t + 0.5) * BLOCK, (hy - dy * t + 0.5) * BLOCK))
+    snake_layer.sync(snake, lambda i, links: segment_sprite(snake, i, links, dx, dy), alpha, fill)
+
+ARROWS = {
+    pygame.K_LEFT: (-1, 0),
+    pygame.K_RIGHT: (1, 0),
+    pygame.K_UP: (0, -1),
+    pygame.K_DOWN: (0, 1),
+}
 
-        # self kills
-        if length >= 3 and [x, y] in snake[:-1]:
-            running = False
-            break
+def next_action(sim):
+    # action for this tick: the next queued key turn (or the replay's, or
+    # the autopilot's), recorded as one replay tick
+    if pilot:
+        ndx, ndy = pilot.next(sim.dx, sim.dy, sim.body, sim.length, sim.food)
+    else:
+        ndx, ndy = (replaying or inputs).next(sim.dx, sim.dy)
+    action = CODES[ndx, ndy] if (ndx, ndy) != (sim.dx, sim.dy) else NOOP
+    if recorder:
+        recorder.tick(action)
+    return action
+
+def end_game(score):
+    global recorder
+    capture.stop()
+    if recorder:
+        recorder.close(score)
+        recorder = None
+    if replaying:
+        replaying.score = score
+    if prof.trace:
+        print(prof.report())
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{'replay-' if replaying else ''}{prof.title}.trace.json"
+        prof.write_trace(os.path.join(PROFILE_DIR, name))
+        prof.trace.clear()
+
+def steer(key, dx, dy):
+    # queue an arrow-key turn; ticks apply them one at a time via next_action
+    d = ARROWS.get(key)
+    if d is not None:
+        inputs.push(d, (dx, dy))
+
+def draw_sprite(key, img, pos, layer=LAYER_ITEMS):
+    if img is None or pos is None:
+        renderer.remove(key)
+    else:
+        renderer.set(key, img, pos, layer)
 
-        # eat
-        if food_x is not None and x == food_x and y == food_y:
-            food_x, food_y = get_valid_food_position(
-                snake,
-                blocked=[(special_x, special_y)] if special_active else None,
-            )
-            length += 1
-            score += 10
-            speed = min(60, speed + 1)
-            if score > high_before:
-                save_highscore(mode, score)
-            try:
-                if eat_sound: eat_sound.play()
-            except:
-                pass
-
-        if special_active and x == special_x and y == special_y:
-            score += 30
-            length += 2
-            special_active = False
-            last_special = now
-            if score > high_before:
-                save_highscore(mode, score)
-            try:
-                if golden_sound: golden_sound.play()
-            except:
-                pass
-
-        # draw
-        screen.fill(BG_COLOR)
-        draw_grid()
-        if apple_img and food_x is not None:
-            screen.blit(apple_img, (food_x, food_y))
-        if special_active and golden_img:
-            screen.blit(golden_img, (special_x, special_y))
-        draw_snake(snake, dx, dy)
-        show_score_and_high(mode, score)
-        if dx == 0 and dy == 0:
-            press = font.render("Press Arrow Key to Start", True, WHITE)
-            screen.blit(press, (SCREEN_W//2 - press.get_width()//2, SCREEN_H//2 + 220))
-        pygame.display.update()
-        clock.tick(speed)
+def draw_items(food_x, food_y, special_active, special_x, special_y):
+    draw_sprite("food", apple_img, (food_x * BLOCK, food_y * BLOCK) if food_x is not None else None)
+    draw_sprite("golden", golden_img, (special_x * BLOCK, special_y * BLOCK) if special_active else None)
 
-    if score > high_before:
-        save_highscore(mode, score)
-    try:
-        pygame.mixer.music.stop()
-        if game_over_sound: game_over_sound.play()
-    except:
-        pass
-    game_over_screen(mode, score)
-
-# Survival - 3 lives, top-right xN display, respawn after collision until lives==0
-def game_loop_survival():
-    mode = "Survival"
-    high_before = load_highscores().get(mode, 0)
-    lives = 3
-
-    x0 = (SCREEN_W // 2 // BLOCK) * BLOCK
-    y0 = (SCREEN_H // 2 // BLOCK) * BLOCK
-    x, y = x0, y0
-    dx, dy = 0, 0
-    snake = [[x - BLOCK, y], [x, y]]
-    length = 2
-    score = 0
-    speed = 5
-
-    special_active = False
-    special_timer = 0
-    special_duration = 5
-    special_interval = 30
-    last_special = time.time()
-    special_x, special_y = 0, 0
-
-    food_x, food_y = get_valid_food_position(snake)
+def draw_prompt(text, show):
+    press = render_text(font, text, WHITE)
+    pos = (SCREEN_W//2 - press.get_width()//2, SCREEN_H//2 + 220)
+    draw_sprite("prompt", press, pos if show else None, LAYER_HUD)
 
-    try:
-        pygame.mixer.music.play(-1)
-    except:
-        pass
-
-    running = True
-    while running:
-        now = time.time()
-        if not special_active and now - last_special > special_interval:
-            special_x, special_y = get_valid_food_position(snake, blocked=[(food_x, food_y)])
-            special_active = True
-            special_timer = now
-        if special_active and now - special_timer > special_duration:
-            special_active = False
-            last_special = now
-
-        for e in pygame.event.get():
-            if e.type == pygame.QUIT:
-                pygame.quit(); sys.exit()
-            if e.type == pygame.KEYDOWN:
-                if e.key == pygame.K_ESCAPE:
-                    try:
-                        pygame.mixer.music.stop()
-                    except:
-                        pass
-                    return
-                if e.key == pygame.K_LEFT and dx == 0:
-                    dx, dy = -BLOCK, 0
-                elif e.key == pygame.K_RIGHT and dx == 0:
-                    dx, dy = BLOCK, 0
-                elif e.key == pygame.K_UP and dy == 0:
-                    dx, dy = 0, -BLOCK
-                elif e.key == pygame.K_DOWN and dy == 0:
-                    dx, dy = 0, BLOCK
-
-        x += dx; y += dy
-
-        # check collisions
-        hit_wall = (x < 0 or x >= SCREEN_W or y < 0 or y >= SCREEN_H)
-        snake.append([x, y])
-        if len(snake) > length:
-            del snake[0]
-        hit_self = (length >= 3 and [x, y] in snake[:-1])
-
-        if hit_wall or hit_self:
-            lives -= 1
-            if lives <= 0:
-                try:
-                    pygame.mixer.music.stop()
-                    if game_over_sound: game_over_sound.play()
-                except:
-                    pass
-                running = False
-                break
-            # respawn
-            x = x0; y = y0
-            dx = dy = 0
-            speed = 5
-            snake = [[x - BLOCK, y], [x, y]]
-            length = 2
-            time.sleep(0.4)
-            continue
-
-        # eat
-        if food_x is not None and x == food_x and y == food_y:
-            food_x, food_y = get_valid_food_position(
-                snake,
-                blocked=[(special_x, special_y)] if special_active else None,
-            )
-            length += 1
-            score += 10
-            speed = min(speed + 1, 30)
-            if score > high_before:
-                save_highscore(mode, score)
-            try:
-                if eat_sound: eat_sound.play()
-            except:
-                pass
-
-        if special_active and x == special_x and y == special_y:
-            score += 30
-            length += 2
-            special_active = False
-            last_special = now
-            if score > high_before:
-                save_highscore(mode, score)
-            try:
-                if golden_sound: golden_sound.play()
-            except:
-                pass
-
-        # draw
-        screen.fill(BG_COLOR)
-        draw_grid()
-        if apple_img and food_x is not None:
-            screen.blit(apple_img, (food_x, food_y))
-        if special_active and golden_img:
-            screen.blit(golden_img, (special_x, special_y))
-        draw_snake(snake, dx, dy)
-        show_score_and_high(mode, score)
-
-        # draw heart + number top-right (heart then 'xN' to its left)
+def show_score_and_high(mode, score):
+    high = highscores.get(mode)
+    score_text = render_text(font, f"Score: {score}", WHITE)
+    draw_sprite("score", score_text, (10, 10), LAYER_HUD)
+    if mode in TRACKED:
+        high_text = render_text(font, f"High Score: {high}", WHITE)
+        draw_sprite("high", high_text, (10, 10 + score_text.get_height() + 6), LAYER_HUD)
+
+def show_hud(mode, score, time_left=None, lives=None):
+    # score top-left; lives (heart then 'xN' to its left) and the countdown
+    # top-right, the countdown under the heart when a mode has both
+    show_score_and_high(mode, score)
+    timer_y = 10
+    if lives is not None:
         heart_x = SCREEN_W - 10 - HEART_SIZE
         heart_y = 10
-        if heart_img:
-            screen.blit(heart_img, (heart_x, heart_y))
-        else:
-            pygame.draw.rect(screen, (200, 20, 20), (heart_x, heart_y, HEART_SIZE, HEART_SIZE))
-        lives_text = font.render(f"x{lives}", True, WHITE)
-        screen.blit(lives_text, (heart_x - lives_text.get_width() - 8, heart_y + HEART_SIZE//2 - lives_text.get_height()//2))
-
-        if dx == 0 and dy == 0:
-            press = font.render("Press Arrow Key to Start", True, WHITE)
-            screen.blit(press, (SCREEN_W//2 - press.get_width()//2, SCREEN_H//2 + 220))
-
-        pygame.display.update()
-        clock.tick(speed)
-
-    if score > high_before:
-        save_highscore(mode, score)
-    game_over_screen(mode, score)
-
-# Zen - wrap walls + no tracked highscore, ESC to exit to menu
-def game_loop_zen():
-    x0 = (SCREEN_W // 2 // BLOCK) * BLOCK
-    y0 = (SCREEN_H // 2 // BLOCK) * BLOCK
-    x, y = x0, y0
-    dx, dy = 0, 0
-    snake = [[x - BLOCK, y], [x, y]]
-    length = 2
-    score = 0
-    speed = max(4, int(5))
-
-    special_active = False
-    special_timer = 0
-    special_duration = 5
-    special_interval = 30
-    last_special = time.time()
-    special_x, special_y = 0, 0
-
-    food_x, food_y = get_valid_food_position(snake)
-
-    try:
-        pygame.mixer.music.play(-1)
-    except:
-        pass
+        draw_sprite("heart", heart_img, (heart_x, heart_y), LAYER_HUD)
+        lives_text = render_text(font, f"x{lives}", WHITE)
+        draw_sprite("lives", lives_text, (heart_x - lives_text.get_width() - 8, heart_y + HEART_SIZE//2 - lives_text.get_height()//2), LAYER_HUD)
+        timer_y += HEART_SIZE + 6
+    if time_left is not None:
+        timer_text = render_text(font, f"Time: {time_left}s", WHITE)
+        draw_sprite("timer", timer_text, (SCREEN_W - timer_text.get_width() - 20, timer_y), LAYER_HUD)
+
+# Game modes
+# One loop plays every mode. What differs between modes is data: the rules
+# in snake_sim.MODES (walls, lives, timer, speed curve, highscore, what a hit
+# costs), so new modes come from snake_sim.register_mode() (see --plugin).
+# The rules themselves run in snake_sim.SnakeSim, the same engine the server
+# and the tournaments step; this loop feeds it input and draws, plays and
+# captures what it does.
+RESPAWN_PAUSE = 0.4   # seconds the game holds after a life is lost
+
+def play_mode(mode):
+    rules = MODES[mode]
+    lose_life = rules["self_hit"] == "kill"
+    tracked = rules["tracked"]
+    high_before = highscores.get(mode)
+    seed = start_scene(mode)
+    sim = SnakeSim(mode, GRID_W, GRID_H, seed=seed, hud=(HUD_W, HUD_H), start=start_cell())
+    prompt = "Press Arrow Key to Start" + (" • ESC to exit" if not lose_life and rules["walls"] == "wrap" else "")
+
+    sfx.play_music()
 
-    running = True
-    while running:
-        for e in pygame.event.get():
+    while True:
+        for e in events():
             if e.type == pygame.QUIT:
                 pygame.quit(); sys.exit()
             if e.type == pygame.KEYDOWN:
                 if e.key == pygame.K_ESCAPE:
-                    try:
-                        pygame.mixer.music.stop()
-                    except:
-                        pass
+                    sfx.stop_music()
+                    end_game(sim.score)
                     return
-                if e.key == pygame.K_LEFT and dx == 0:
-                    dx, dy = -BLOCK, 0
-                elif e.key == pygame.K_RIGHT and dx == 0:
-                    dx, dy = BLOCK, 0
-                elif e.key == pygame.K_UP and dy == 0:
-                    dx, dy = 0, -BLOCK
-                elif e.key == pygame.K_DOWN and dy == 0:
-                    dx, dy = 0, BLOCK
-
-        x += dx; y += dy
-
-        now = time.time()
-        if not special_active and now - last_special > special_interval:
-            special_x, special_y = get_valid_food_position(snake, blocked=[(food_x, food_y)])
-            special_active = True
-            special_timer = now
-        if special_active and now - special_timer > special_duration:
-            special_active = False
-            last_special = now
-
-        # wrap
-        if x < 0: x = SCREEN_W - BLOCK
-        elif x >= SCREEN_W: x = 0
-        if y < 0: y = SCREEN_H - BLOCK
-        elif y >= SCREEN_H: y = 0
-
-        snake.append([x, y])
-        if len(snake) > length:
-            del snake[0]
-
-        # gentle penalty on self-hit: reset length & position
-        if length >= 3 and [x, y] in snake[:-1]:
-            length = 2
-            x, y = x0, y0
-            dx, dy = 0, 0
-            snake = [[x - BLOCK, y], [x, y]]
-
-        # eat
-        if food_x is not None and x == food_x and y == food_y:
-            food_x, food_y = get_valid_food_position(
-                snake,
-                blocked=[(special_x, special_y)] if special_active else None,
-            )
-            length += 1
-            score += 10
-            try:
-                if eat_sound: eat_sound.play()
-            except:
-                pass
-
-        if special_active and x == special_x and y == special_y:
-            score += 30
-            length += 2
-            special_active = False
-            last_special = now
-            try:
-                if golden_sound: golden_sound.play()
-            except:
-                pass
-
-        # draw
-        screen.fill(BG_COLOR)
-        draw_grid()
-        if apple_img and food_x is not None:
-            screen.blit(apple_img, (food_x, food_y))
-        if special_active and golden_img:
-            screen.blit(golden_img, (special_x, special_y))
-        draw_snake(snake, dx, dy)
-        # Zen shows score but no highscore
-        score_text = font.render(f"Score: {score}", True, WHITE)
-        screen.blit(score_text, (10, 10))
-        if dx == 0 and dy == 0:
-            press = font.render("Press Arrow Key to Start • ESC to exit", True, WHITE)
-            screen.blit(press, (SCREEN_W//2 - press.get_width()//2, SCREEN_H//2 + 220))
-
-        pygame.display.update()
-        clock.tick(speed)
+                steer(e.key, sim.dx, sim.dy)
+
+        prof.mark("sim")
+        while not sim.over and pacer.step(sim.speed):
+            ev = sim.step(next_action(sim))
+            if ev & EV_HIT and not sim.over:
+                inputs.clear()
+                if lose_life:
+                    pacer.pause(RESPAWN_PAUSE)
+                    continue
+            if ev & (EV_FOOD | EV_GOLDEN):
+                if tracked and sim.score > high_before:
+                    save_highscore(mode, sim.score)
+                sfx.play("eat" if ev & EV_FOOD else "golden")
+
+        if sim.over:
+            break
 
+        prof.mark("draw")
+        food = sim.food or (None, None)
+        special = sim.special or (0, 0)
+        draw_items(*food, sim.special is not None, *special)
+        draw_snake(sim.body, sim.dx, sim.dy, pacer.alpha(sim.speed))
+        prof.mark("hud")
+        show_hud(mode, sim.score, sim.time_left, sim.lives if rules["lives"] > 1 else None)
+        draw_prompt(prompt, sim.dx == 0 and sim.dy == 0)
+        present()
+        end_frame()
+
+    if tracked and sim.score > high_before:
+        save_highscore(mode, sim.score)
+    sfx.stop_music()
+    sfx.play("game_over")
+    game_over_screen(mode, sim.score)
+
+def play_replay(rep, rate=None):
+    # Re-run a recorded game (replay.Replay): rate=None re-simulates it as
+    # fast as possible, otherwise it is drawn at rate x real time.
+    global pacer, replaying
+    board = (SCREEN_W, SCREEN_H, BLOCK, (GRID_W, GRID_H))
+    if rate is not None and rep.screen != (SCREEN_W, SCREEN_H):
+        print(f"[replay warning] recorded at {rep.screen[0]}x{rep.screen[1]}, this display is "
+              f"{SCREEN_W}x{SCREEN_H}: re-simulating without drawing")
+        rate = None
+    live_pacer = pacer
+    set_board(*rep.screen, rep.block, rep.grid)
+    replaying = ReplayInput(rep)
+    pacer = ReplayPacer(replaying, rate, RENDER_FPS, clock.tick)
+    try:
+        play_mode(rep.mode)
+        return {"score": replaying.score, "ticks": replaying.pos, "game_time": pacer.game_time}
+    finally:
+        pacer = live_pacer
+        replaying = None
+        set_board(*board)
+        pygame.event.clear()
 
 # UI screens
-def game_over_screen(mode, score):
-    if game_over_bg:
-        screen.blit(game_over_bg, (0, 0))
-    else:
-        screen.fill(BLACK)
-    sub = big_font.render(f"Mode: {mode}  |  Score: {score}", True, BLACK)
-    screen.blit(sub, sub.get_rect(center=(SCREEN_W//2, SCREEN_H//2)))
-    prompt = font.render("Press R to return to menu or Q to quit", True,BLACK)
-    screen.blit(prompt, prompt.get_rect(center=(SCREEN_W//2, SCREEN_H//2 + 300)))
-    pygame.display.update()
+# Idle screens block on the event queue instead of spinning, redraw only when
+# something visible changed, and draw nothing while the window is hidden or
+# unfocused. The timeout lets the menu pick up highscores saved meanwhile.
+IDLE_WAIT_MS = 500
+FOCUS_LOST = (pygame.WINDOWFOCUSLOST, pygame.WINDOWMINIMIZED, pygame.WINDOWHIDDEN)
+FOCUS_BACK = (pygame.WINDOWFOCUSGAINED, pygame.WINDOWRESTORED, pygame.WINDOWSHOWN, pygame.WINDOWEXPOSED)
+
+def wait_events(timeout=IDLE_WAIT_MS):
+    # sleep until the next event (or timeout), then take whatever else queued up
+    e = pygame.event.wait(timeout)
+    if e.type == pygame.NOEVENT:
+        return []
+    return [e] + pygame.event.get()
 
+def game_over_screen(mode, score):
+    end_game(score)
+    if replaying:
+        return
+    use_assets("game_over")
+    highscores.flush()
+    report_frames(mode)
+    dirty = visible = True
     while True:
-        for e in pygame.event.get():
+        if dirty and visible:
+            if game_over_bg:
+                screen.blit(game_over_bg, (0, 0))
+            else:
+                screen.fill(BLACK)
+            sub = render_text(big_font, f"Mode: {mode}  |  Score: {score}", BLACK)
+            screen.blit(sub, sub.get_rect(center=(SCREEN_W//2, SCREEN_H//2)))
+            prompt = render_text(font, "Press R to return to menu or Q to quit", BLACK)
+            screen.blit(prompt, prompt.get_rect(center=(SCREEN_W//2, SCREEN_H//2 + 300)))
+            pygame.display.update()
+            dirty = False
+
+        for e in wait_events():
             if e.type == pygame.QUIT:
                 pygame.quit(); sys.exit()
+            if e.type in FOCUS_LOST:
+                visible = False
+            elif e.type in FOCUS_BACK:
+                visible = dirty = True
             if e.type == pygame.KEYDOWN:
                 if e.key == pygame.K_r:
                     return
@@ -946,62 +725,100 @@ def game_over_screen(mode, score):
                     pygame.quit(); sys.exit()
 
 # Start menu (text-based, arrow keys & Enter)
+MENU_MODES = {r["label"]: m for m, r in MODES.items()}
+MENU_OPTIONS = list(MENU_MODES) + ["Autopilot", "Quit"]
+_menu_base = {}
+
+def menu_y(i):
+    return SCREEN_H//2 + (2 * i - 3) * (menu_font.get_height() + 12) // 2
+
+def menu_label(opt):
+    if opt == "Autopilot":
+        return f"Autopilot: {'On' if autopilot_on else 'Off'}"
+    return opt
+
+def menu_base(hs):
+    # background, every option, highscores and hint, composed once per set of
+    # highscores; only the highlighted entry is drawn on top each time
+    key = tuple(hs.get(m, 0) for m in TRACKED) + (autopilot_on,)
+    surf = _menu_base.get(key)
+    if surf is not None:
+        return surf
+    if start_bg:
+        surf = start_bg.copy()
+    else:
+        surf = pygame.Surface((SCREEN_W, SCREEN_H))
+        surf.fill(BG_COLOR)
+    for i, opt in enumerate(MENU_OPTIONS):
+        y = menu_y(i)
+        text = render_text(menu_font, menu_label(opt), BLACK)
+        surf.blit(text, text.get_rect(center=(SCREEN_W//2, y)))
+
+        # show highscore if tracked
+        mode = MENU_MODES.get(opt)
+        if mode in hs:
+            score_text = render_text(font, f"High Score: {hs[mode]}", BLACK)
+            surf.blit(score_text, (SCREEN_W//2 + 260, y - score_text.get_height()//2))
+        elif mode:
+            note = render_text(font, "(No Highscore)", BLACK)
+            surf.blit(note, (SCREEN_W//2 + 250, y - note.get_height()//2))
+
+    hint = render_text(font, "Use ↑/↓ or W/S to move • Enter to select • Q to quit", BLACK)
+    surf.blit(hint, (SCREEN_W//2 - hint.get_width()//2, SCREEN_H - 80))
+    _menu_base.clear()
+    _menu_base[key] = surf
+    return surf
+
+def draw_menu(idx, hs):
+    screen.blit(menu_base(hs), (0, 0))
+    text = render_text(menu_font, menu_label(MENU_OPTIONS[idx]), BLACK)
+    rect = text.get_rect(center=(SCREEN_W//2, menu_y(idx)))
+    pygame.draw.rect(screen, MENU_HIGHLIGHT, (rect.x - 18, rect.y - 6, rect.width + 36, rect.height + 12), border_radius=8)
+    screen.blit(text, rect)
+    pygame.display.update()
+
 def start_menu():
-    options = ["Classic", "Timed (60s)", "Hardcore", "Survival (3 lives)", "Zen", "Quit"]
+    global autopilot_on
+    options = MENU_OPTIONS
     idx = 0
+    dirty = visible = True
+    drawn_hs = None
+    use_assets("menu")
+    startup_mark("menu assets")
     while True:
-        if start_bg:
-            screen.blit(start_bg, (0, 0))
-        else:
-            screen.fill(BG_COLOR)
-
         hs = load_highscores()
-        for i, opt in enumerate(options):
-            y = SCREEN_H//2 + (i - 1) * (menu_font.get_height() + 12)
-            if i == idx:
-                text = menu_font.render(opt, True, BLACK)
-                rect = text.get_rect(center=(SCREEN_W//2, y))
-                pygame.draw.rect(screen, MENU_HIGHLIGHT, (rect.x - 18, rect.y - 6, rect.width + 36, rect.height + 12), border_radius=8)
-                screen.blit(text, rect)
-            else:
-                text = menu_font.render(opt, True, BLACK)
-                screen.blit(text, text.get_rect(center=(SCREEN_W//2, y)))
-
-            # show highscore if tracked
-            mode_name = opt.split()[0]
-            if mode_name in hs:
-                score_text = font.render(f"High Score: {hs[mode_name]}", True, BLACK)
-                screen.blit(score_text, (SCREEN_W//2 + 260, y - score_text.get_height()//2))
-            elif "Zen" in opt:
-                note = font.render("(No Highscore)", True, BLACK)
-                screen.blit(note, (SCREEN_W//2 + 250, y - note.get_height()//2))
-
-        hint = font.render("Use ↑/↓ or W/S to move • Enter to select • Q to quit", True, BLACK)
-        screen.blit(hint, (SCREEN_W//2 - hint.get_width()//2, SCREEN_H - 80))
-        pygame.display.update()
-
-        for e in pygame.event.get():
+        if hs != drawn_hs:
+            dirty = True
+        if dirty and visible:
+            draw_menu(idx, hs)
+            drawn_hs = hs
+            dirty = False
+            report_startup()
+
+        for e in wait_events():
             if e.type == pygame.QUIT:
                 pygame.quit(); sys.exit()
+            if e.type in FOCUS_LOST:
+                visible = False
+            elif e.type in FOCUS_BACK:
+                visible = dirty = True
             if e.type == pygame.KEYDOWN:
                 if e.key in (pygame.K_UP, pygame.K_w):
                     idx = (idx - 1) % len(options)
+                    dirty = True
                 elif e.key in (pygame.K_DOWN, pygame.K_s):
                     idx = (idx + 1) % len(options)
+                    dirty = True
                 elif e.key in (pygame.K_RETURN, pygame.K_KP_ENTER):
                     sel = options[idx]
-                    if "Classic" in sel:
-                        game_loop_classic()
-                    elif "Timed" in sel:
-                        game_loop_timed()
-                    elif "Hardcore" in sel:
-                        game_loop_hardcore()
-                    elif "Survival" in sel:
-                        game_loop_survival()
-                    elif "Zen" in sel:
-                        game_loop_zen()
-                    elif "Quit" in sel:
+                    if sel in MENU_MODES:
+                        play_mode(MENU_MODES[sel])
+                    elif sel == "Autopilot":
+                        autopilot_on = not autopilot_on
+                    elif sel == "Quit":
                         pygame.quit(); sys.exit()
+                    report_frames(sel)
+                    dirty = True
                 elif e.key == pygame.K_q:
                     pygame.quit(); sys.exit()
 
@@ -0,0 +1,260 @@
+# Headless snake simulation.
+#
+# The one game engine: the game (snake_game.play_mode), the game server and
+# the tournaments all step a SnakeSim. It works on integer grid cells and
+# without pygame, so it can be imported on servers and stepped as fast as
+# Python allows (bots, replays, batch evaluation).
+#
+# Time is tick-driven: every step lasts 1/speed seconds of game time, and the
+# game's frame pacer hands out steps at speed per second of real time.
+import random, runpy
+
+from grid import SnakeBody, FreeCells
+
+# Actions
+NOOP, UP, DOWN, LEFT, RIGHT = 0, 1, 2, 3, 4
+DIRS = {UP: (0, -1), DOWN: (0, 1), LEFT: (-1, 0), RIGHT: (1, 0)}
+
+# step() event flags
+EV_FOOD = 1
+EV_GOLDEN = 2
+EV_HIT = 4       # wall/self hit (life lost or zen reset)
+EV_OVER = 8
+
+# Per-mode rules, read by SnakeSim (and by the game for its menu and HUD).
+#   label:     the mode's entry in the start menu
+#   walls:     "kill" or "wrap"
+#   self_hit:  "kill" (costs a life) or "reset" (zen: back to start, keep score)
+#   lives:     hits allowed before game over
+#   time_limit/time_bonus: timed countdown in seconds (None = no timer)
+#   speed/speed_step/max_speed: ticks per second and its curve per apple
+#   tracked:   whether the mode keeps a highscore
+# special_interval/special_duration may be set too (golden apple timing).
+MODES = {
+    "Classic": dict(label="Classic", walls="kill", self_hit="kill", lives=1, time_limit=None,
+                    time_bonus=0, speed=5, speed_step=0.3, max_speed=30, tracked=True),
+    "Timed": dict(label="Timed (60s)", walls="wrap", self_hit="kill", lives=1, time_limit=60,
+                  time_bonus=2, speed=5, speed_step=0.3, max_speed=30, tracked=True),
+    "Hardcore": dict(label="Hardcore", walls="kill", self_hit="kill", lives=1, time_limit=None,
+                     time_bonus=0, speed=10, speed_step=1, max_speed=60, tracked=True),
+    "Survival": dict(label="Survival (3 lives)", walls="kill", self_hit="kill", lives=3, time_limit=None,
+                     time_bonus=0, speed=5, speed_step=1, max_speed=30, tracked=True),
+    "Zen": dict(label="Zen", walls="wrap", self_hit="reset", lives=1, time_limit=None,
+                time_bonus=0, speed=5, speed_step=0, max_speed=5, tracked=False),
+}
+RULE_KEYS = tuple(MODES["Classic"]) + ("special_interval", "special_duration")
+
+FOOD_SCORE = 10
+GOLDEN_SCORE = 30
+GOLDEN_GROWTH = 2
+SPECIAL_INTERVAL = 30   # seconds between golden apples
+SPECIAL_DURATION = 5    # seconds a golden apple stays on the board
+
+
+def register_mode(name, base="Classic", **rules):
+    # Plugin API: a new mode is a base mode's rules with some of them changed,
+    #   register_mode("Blitz", base="Hardcore", lives=2, time_limit=90, label="Blitz (90s)")
+    # after which the game's menu, replays, the autopilot and tournaments all
+    # know it. The name goes into replay headers, so it's at most 12 bytes.
+    if base not in MODES:
+        raise ValueError(f"unknown base mode: {base}")
+    if not name or len(name.encode()) > 12:
+        raise ValueError(f"mode name must be 1-12 bytes: {name!r}")
+    unknown = set(rules) - set(RULE_KEYS)
+    if unknown:
+        raise ValueError(f"unknown rules: {', '.join(sorted(unknown))}")
+    r = dict(MODES[base], label=name)
+    r.update(rules)
+    check_rules(r)
+    MODES[name] = r
+    return r
+
+
+def check_rules(r):
+    # catch rules SnakeSim can't run on before a game starts (tournament
+    # --set uses this too): the ones that take one of a few values, and the
+    # numbers, which must be in range
+    if r["walls"] not in ("kill", "wrap") or r["self_hit"] not in ("kill", "reset"):
+        raise ValueError(f"walls must be kill/wrap and self_hit kill/reset: {r['walls']}, {r['self_hit']}")
+    if not isinstance(r["lives"], int) or isinstance(r["lives"], bool) or r["lives"] < 1:
+        raise ValueError(f"lives must be a whole number >= 1: {r['lives']!r}")
+    for key in ("speed", "max_speed", "time_limit", "special_interval", "special_duration"):
+        if key not in r or (key == "time_limit" and r[key] is None):
+            continue
+        if not _number(r[key]) or r[key] <= 0:
+            raise ValueError(f"{key} must be a number > 0{' or null' if key == 'time_limit' else ''}: {r[key]!r}")
+    for key in ("speed_step", "time_bonus"):
+        if not _number(r[key]) or r[key] < 0:
+            raise ValueError(f"{key} must be a number >= 0: {r[key]!r}")
+
+
+def _number(v):
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+
+def load_plugin(path):
+    # a mode plugin is a Python file that calls register_mode()
+    runpy.run_path(path)
+
+
+class SnakeSim:
+    # width/height are in cells. hud=(cols, rows) is the top-left area food
+    # never spawns in (the score overlay). rules overrides entries of the
+    # mode's MODES dict, plus special_interval/special_duration, for tuning.
+    # start is the head's cell at (re)spawn, the middle of the board if None.
+    def __init__(self, mode="Classic", width=40, height=30, seed=None, hud=(0, 0), rules=None, start=None):
+        if mode not in MODES:
+            raise ValueError(f"unknown mode: {mode}")
+        self.mode = mode
+        self.rules = dict(MODES[mode], **rules) if rules else MODES[mode]
+        self.special_interval = self.rules.get("special_interval", SPECIAL_INTERVAL)
+        self.special_duration = self.rules.get("special_duration", SPECIAL_DURATION)
+        self.width = width
+        self.height = height
+        self.hud = hud
+        self.start = start or (width // 2, height // 2)
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        self.seed = seed
+        self.rng = random.Random(seed)
+        r = self.rules
+        self.score = 0
+        self.lives = r["lives"]
+        self.time = 0.0
+        self.ticks = 0
+        self.time_left = r["time_limit"]
+        self._second = 0.0
+        self.over = False
+
+        self.special = None
+        self.special_timer = 0.0
+        self.last_special = 0.0
+
+        self._spawn_snake()
+        self.food = self.spawn_food()
+
+    def _spawn_snake(self):
+        self.x0, self.y0 = self.start
+        free = FreeCells(self.width, self.height, hud=self.hud)
+        self.body = SnakeBody(self.width, self.height,
+                              [(self.x0 - 1, self.y0), (self.x0, self.y0)], free=free)
+        self.hx, self.hy = self.x0, self.y0
+        self.dx = self.dy = 0
+        self.length = 2
+        self.speed = self.rules["speed"]
+
+    @property
+    def head(self):
+        return self.hx, self.hy
+
+    def spawn_food(self, blocked=None):
+        return self.body.free.sample(self.rng, (blocked,))
+
+    def turn(self, action):
+        # Same reverse rule as the key handlers: only turn across the current axis.
+        if action in DIRS:
+            dx, dy = DIRS[action]
+            if self.dx == 0 and self.dy == 0:
+                # Not moving yet: anything but straight back into the neck.
+                if (self.hx + dx, self.hy + dy) != self.body[-2]:
+                    self.dx, self.dy = dx, dy
+            elif (dx and self.dx == 0) or (dy and self.dy == 0):
+                self.dx, self.dy = dx, dy
+
+    def step(self, action=NOOP):
+        if self.over:
+            return EV_OVER
+        r = self.rules
+        events = 0
+        self.turn(action)
+
+        dt = 1.0 / self.speed
+        self.time += dt
+        self.ticks += 1
+        now = self.time
+
+        if self.time_left is not None:
+            self._second += dt
+            while self._second >= 1:
+                self._second -= 1
+                self.time_left -= 1
+            if self.time_left <= 0:
+                self.over = True
+                return EV_OVER
+
+        # special spawn/despawn
+        if self.special is None and now - self.last_special > self.special_interval:
+            self.special = self.spawn_food(blocked=self.food)
+            self.special_timer = now
+        if self.special is not None and now - self.special_timer > self.special_duration:
+            self.special = None
+            self.last_special = now
+
+        if self.dx == 0 and self.dy == 0:
+            return events
+
+        x, y = self.hx + self.dx, self.hy + self.dy
+        hit = False
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            if r["walls"] == "wrap":
+                x %= self.width
+                y %= self.height
+            else:
+                hit = True
+
+        if not hit:
+            hit = self.body.advance(x, y, self.length)
+            self.hx, self.hy = x, y
+
+        if hit:
+            events |= EV_HIT
+            if r["self_hit"] == "reset":
+                self._spawn_snake()
+                return events
+            self.lives -= 1
+            if self.lives <= 0:
+                self.over = True
+                return events | EV_OVER
+            self._spawn_snake()
+            return events
+
+        head = (x, y)
+        if head == self.food:
+            self.length += 1
+            self.score += FOOD_SCORE
+            self.speed = min(self.speed + r["speed_step"], r["max_speed"])
+            if self.time_left is not None:
+                self.time_left += r["time_bonus"]
+            self.food = self.spawn_food(blocked=self.special)
+            events |= EV_FOOD
+        if head == self.special:
+            self.score += GOLDEN_SCORE
+            self.length += GOLDEN_GROWTH
+            self.special = None
+            self.last_special = now
+            events |= EV_GOLDEN
+        return events
+
+
+def run(mode="Classic", ticks=100_000, seed=0, width=40, height=30):
+    # Random-walk throughput check: python snake_sim.py [mode] [ticks]
+    import time
+    sim = SnakeSim(mode, width, height, seed=seed)
+    rng = random.Random(seed)
+    actions = [rng.randrange(5) for _ in range(4096)]
+    games = 0
+    t0 = time.perf_counter()
+    for i in range(ticks):
+        sim.step(actions[i & 4095])
+        if sim.over:
+            games += 1
+            sim.reset(seed + games)
+    elapsed = time.perf_counter() - t0
+    print(f"{mode}: {ticks} ticks in {elapsed:.3f}s -> {ticks / elapsed:,.0f} ticks/s ({games} games)")
+
+
+if __name__ == "__main__":
+    import sys
+    run(sys.argv[1] if len(sys.argv) > 1 else "Classic",
+        int(sys.argv[2]) if len(sys.argv) > 2 else 100_000)
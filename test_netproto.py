@@ -0,0 +1,111 @@
+# The game server's wire format: every message through encode -> frame ->
+# FrameReader -> decode, and a room's deltas applied to a client-side copy
+# of the board, which must stay equal to the server's SnakeSim tick for
+# tick. Run with `python -m pytest`.
+import random
+
+import pytest
+
+import netproto as net
+from grid import SnakeBody
+from server import Room
+from snake_sim import MODES, SnakeSim, UP, LEFT
+
+
+def one(data):
+    frames = net.FrameReader().feed(data)
+    assert len(frames) == 1
+    return net.decode(frames[0])
+
+
+def test_small_messages():
+    assert one(net.join("Survival", 42, (200, 150), (8, 4))) == (net.JOIN, ("Survival", 42, (200, 150), (8, 4)))
+    assert one(net.turn(UP)) == (net.TURN, UP)
+    assert one(net.leave()) == (net.LEAVE, None)
+    assert one(net.stats_request()) == (net.STATS, None)
+    assert one(net.stats({"rooms": 3, "lag_ms": {"p99": 1.5}})) == (net.STATS, {"rooms": 3, "lag_ms": {"p99": 1.5}})
+    assert one(net.over(-30)) == (net.OVER, -30)
+    assert one(net.error("server full")) == (net.ERROR, "server full")
+
+
+def test_delta_fields():
+    flags = (net.D_HEAD | net.D_FOOD | net.D_SPECIAL | net.D_SCORE | net.D_LIVES | net.D_TIME
+             | net.D_SPEED | net.D_EVENTS)
+    kind, d = one(net.delta(70000, flags, (3, 4), (5, 6), None, 120, 2, -1, 7.5, 5))
+    assert kind == net.DELTA
+    assert d == {"tick": 70000 & 0xFFFF, "flags": flags, "head": (3, 4), "food": (5, 6), "special": None,
+                 "score": 120, "lives": 2, "time_left": -1, "speed": 7.5, "events": 5}
+    # a plain move
+    data = net.delta(1, net.D_HEAD | net.D_POP, (1, 2))
+    assert len(data) == 11
+    assert one(data)[1] == {"tick": 1, "flags": net.D_HEAD | net.D_POP, "head": (1, 2)}
+
+
+@pytest.mark.parametrize("mode", ["Classic", "Timed"])
+def test_snapshot(mode):
+    sim = SnakeSim(mode, 30, 20, seed=1)
+    for _ in range(5):
+        sim.step(0)
+    kind, s = one(net.snapshot(sim, 5))
+    assert kind == net.SNAPSHOT
+    assert (s["mode"], s["width"], s["height"], s["tick"]) == (mode, 30, 20, 5)
+    assert s["body"] == list(sim.body)
+    assert (s["heading"], s["food"], s["special"]) == ((sim.dx, sim.dy), sim.food, sim.special)
+    assert (s["score"], s["lives"], s["time_left"]) == (sim.score, sim.lives, sim.time_left)
+    assert s["speed"] == pytest.approx(sim.speed)
+
+
+def test_extended_length_and_split_reads():
+    # a snapshot over 64 KiB takes the u32 length; fed a few bytes at a time
+    sim = SnakeSim("Zen", 200, 200, seed=2)
+    rows = [range(200) if y % 2 == 0 else range(199, -1, -1) for y in range(100)]
+    sim.body = SnakeBody(200, 200, [(x, y) for y, xs in enumerate(rows) for x in xs])
+    data = net.snapshot(sim, 0) + net.turn(LEFT)
+    assert data[:2] == b"\xff\xff"
+    reader, frames = net.FrameReader(), []
+    for i in range(0, len(data), 997):
+        frames += reader.feed(data[i:i + 997])
+    assert [net.decode(f)[0] for f in frames] == [net.SNAPSHOT, net.TURN]
+    assert net.decode(frames[0])[1]["body"] == list(sim.body)
+    assert not reader.buf
+
+
+class Mirror:
+    # what client.NetBoard keeps, without the drawing
+    def load(self, s):
+        self.body = SnakeBody(s["width"], s["height"], s["body"])
+        self.food, self.special, self.score = s["food"], s["special"], s["score"]
+        self.lives, self.time_left, self.speed = s["lives"], s["time_left"], s["speed"]
+
+    def apply(self, d):
+        if d["flags"] & net.D_POP:
+            self.body.pop()
+        if d["flags"] & net.D_HEAD:
+            self.body.push(*d["head"])
+        for key in ("food", "special", "score", "lives", "time_left", "speed"):
+            if key in d:
+                setattr(self, key, d[key])
+
+
+@pytest.mark.parametrize("mode", list(MODES))
+def test_deltas_follow_the_sim(mode):
+    rng = random.Random(mode)
+    for seed in range(1, 6):
+        room = Room(None, mode, seed, (16, 12), (0, 0))
+        mirror = Mirror()
+        mirror.load(one(net.snapshot(room.sim, 0))[1])
+        for _ in range(3000):
+            if rng.random() < 0.3:
+                room.queue_turn(rng.randrange(1, 5))
+            data, over, _ = room.tick()
+            if over:
+                assert one(data) == (net.OVER, room.sim.score)
+                break
+            if data:
+                kind, value = one(data)
+                mirror.load(value) if kind == net.SNAPSHOT else mirror.apply(value)
+            sim = room.sim
+            assert list(mirror.body) == list(sim.body)
+            assert (mirror.food, mirror.special, mirror.score, mirror.lives, mirror.time_left) == \
+                (sim.food, sim.special, sim.score, sim.lives, sim.time_left)
+            assert mirror.speed == pytest.approx(sim.speed)
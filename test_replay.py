@@ -0,0 +1,93 @@
+# Round trips of the replay file format: ReplayWriter output read back by
+# load(). Run with `python -m pytest`.
+import os, random
+
+import pytest
+
+from replay import Replay, ReplayWriter, load, latest, board_start, resimulate, FOOTER, HEADER, MAGIC, VERSION
+from snake_sim import SnakeSim, UP
+
+
+def record(path, turns, score=None, chunk=4):
+    rep = Replay("Survival", 0x1234_5678_9ABC, (1024, 768), 25, (41, 31), (8, 4))
+    w = ReplayWriter(str(path), rep, chunk=chunk)
+    for code in turns:
+        w.tick(code)
+    if score is None:
+        w.queue.put(bytes(w.buf))   # as if the game died before close()
+        w.queue.put(None)
+        w.thread.join()
+    else:
+        w.close(score)
+    return rep
+
+
+@pytest.mark.parametrize("ticks", [0, 1, 2, 7, 8, 9, 1001])
+def test_round_trip(tmp_path, ticks):
+    rng = random.Random(ticks)
+    turns = bytes(rng.choice((0, 0, 0, 1, 2, 3, 4)) for _ in range(ticks))
+    rep = record(tmp_path / "game.snkr", turns, score=370)
+    got = load(tmp_path / "game.snkr")
+    assert (got.mode, got.seed, got.screen, got.block, got.grid, got.hud) == \
+        (rep.mode, rep.seed, rep.screen, rep.block, rep.grid, rep.hud)
+    assert got.turns == turns
+    assert got.ticks == ticks
+    assert got.score == 370
+    assert os.path.getsize(tmp_path / "game.snkr") == HEADER.size + (ticks + 1) // 2 + FOOTER.size
+
+
+def test_negative_score(tmp_path):
+    record(tmp_path / "game.snkr", b"\1\2\3", score=-5)
+    assert load(tmp_path / "game.snkr").score == -5
+
+
+@pytest.mark.parametrize("ticks", [6, 7])
+def test_cut_off_without_footer(tmp_path, ticks):
+    # every whole byte written is still there; no tick count or score
+    turns = bytes((1, 3, 0, 2, 4, 0, 1))[:ticks]
+    record(tmp_path / "game.snkr", turns)
+    got = load(tmp_path / "game.snkr")
+    assert got.score is None
+    assert got.turns == turns[:ticks // 2 * 2]
+    assert got.ticks == ticks // 2 * 2
+
+
+def test_not_a_replay(tmp_path):
+    (tmp_path / "x.snkr").write_bytes(b"PNG!" + bytes(HEADER.size))
+    with pytest.raises(ValueError):
+        load(tmp_path / "x.snkr")
+
+
+def test_other_version(tmp_path):
+    record(tmp_path / "game.snkr", b"\1", score=0)
+    data = bytearray((tmp_path / "game.snkr").read_bytes())
+    data[len(MAGIC)] = VERSION - 1
+    (tmp_path / "old.snkr").write_bytes(data)
+    with pytest.raises(ValueError, match=f"version {VERSION - 1}"):
+        load(tmp_path / "old.snkr")
+
+
+def test_latest(tmp_path):
+    assert latest(tmp_path / "missing") is None
+    assert latest(tmp_path) is None
+    record(tmp_path / "a.snkr", b"\1", score=0)
+    assert latest(tmp_path) == os.path.join(tmp_path, "a.snkr")
+
+
+def test_board_start():
+    assert board_start((1024, 768), 25, (41, 31)) == (20, 15)
+    assert board_start((1010, 768), 25, (41, 31)) == (20, 15)
+    assert board_start((1024, 768), 25, (200, 150)) == (100, 75)    # scrolls
+
+
+def test_resimulate(tmp_path):
+    # up into the top wall three times: Survival is over before the
+    # recording ends
+    turns = bytes(([UP] + [0] * 15) * 3 + [0] * 20)
+    rep = record(tmp_path / "game.snkr", turns, score=0)
+    sim = SnakeSim(rep.mode, *rep.grid, seed=rep.seed, hud=rep.hud, start=(20, 15))
+    for code in turns:
+        sim.step(code)
+    r = resimulate(load(tmp_path / "game.snkr"))
+    assert r["ticks"] == 48 < len(turns)
+    assert (r["score"], r["ticks"]) == (sim.score, sim.ticks)
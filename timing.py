@@ -0,0 +1,75 @@
+# Frame pacing for the game loops.
+#
+# The simulation advances in fixed steps of 1/speed seconds, fed by an
+# accumulator of real frame time, while frames are drawn and input is polled
+# at the display rate. Frame times are kept for a pacing report.
+import time
+from collections import deque
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    s = sorted(values)
+    return s[min(len(s) - 1, int(p / 100.0 * len(s)))]
+
+
+class FramePacer:
+    # wait(fps) is called once per frame to hold the render rate (clock.tick).
+    # rate scales game time against real time (replays at 2x, 0.5x, ...).
+    def __init__(self, fps=60, wait=None, max_frame=0.25, history=1200, rate=1.0):
+        self.fps = fps
+        self.wait = wait
+        self.rate = rate
+        self.max_frame = max_frame  # longest frame fed to the accumulator
+        self.history = history
+        self.reset()
+
+    def reset(self):
+        self.acc = 0.0
+        self.last = time.perf_counter()
+        self.hold_until = 0.0
+        self.ticks = 0
+        self.frame_times = deque(maxlen=self.history)
+
+    def step(self, speed):
+        # True while a simulation tick at this speed is due; consumes it.
+        step = 1.0 / speed
+        if self.acc < step:
+            return False
+        self.acc -= step
+        self.ticks += 1
+        return True
+
+    def alpha(self, speed):
+        # how far the current frame sits between the last tick and the next
+        return min(1.0, self.acc * speed)
+
+    def pause(self, seconds):
+        # hold the simulation (e.g. survival respawn) while frames keep coming
+        self.hold_until = time.perf_counter() + seconds
+        self.acc = 0.0
+
+    def end_frame(self):
+        if self.wait:
+            self.wait(self.fps)
+        now = time.perf_counter()
+        dt = now - self.last
+        self.last = now
+        self.frame_times.append(dt)
+        if now < self.hold_until:
+            self.acc = 0.0
+        else:
+            self.acc += min(dt, self.max_frame) * self.rate
+
+    def report(self, title=""):
+        ft = [t * 1000 for t in self.frame_times]
+        if not ft:
+            return f"[frames] {title}: no frames"
+        mean = sum(ft) / len(ft)
+        jitter = (sum((t - mean) ** 2 for t in ft) / len(ft)) ** 0.5
+        return "\n".join([
+            f"[frames] {title}: {len(ft)} frames, {self.ticks} ticks, {1000 / mean:.1f} fps",
+            f"  frame ms  mean {mean:.2f}  p50 {percentile(ft, 50):.2f}  p95 {percentile(ft, 95):.2f}"
+            f"  p99 {percentile(ft, 99):.2f}  max {max(ft):.2f}  jitter(sd) {jitter:.2f}",
+        ])
@@ -0,0 +1,264 @@
+# Self-play tournament: thousands of headless games (snake_sim) played by a
+# bot across a process pool, for tuning speed curves and golden-apple timing.
+#
+#   python tournament.py [--games N] [--modes Classic,Hardcore] [--workers N]
+#                        [--bot autopilot|greedy] [--budget US] [--board 40x30]
+#                        [--max-ticks N] [--seed S] [--set key=value ...]
+#                        [--out FILE.jsonl] [--plugin FILE.py ...]
+#
+# Every game gets a seed derived from (--seed, mode, game number), so a run is
+# reproducible and independent of how games land on workers. The autopilot has
+# no deadline here unless --budget is given, since a deadline makes its moves
+# depend on machine load. --set overrides a mode rule (any of
+# snake_sim.RULE_KEYS: speed, lives, walls=wrap, special_interval, ...) for
+# every mode played; --plugin loads a mode plugin
+# (see snake_sim.register_mode), whose modes are then played too.
+#
+# Results stream back as games finish and each one is appended to the --out
+# checkpoint (JSON lines, default tournament.jsonl) right away. Running the
+# same command again skips the games already in it, so an interrupted run
+# carries on where it stopped. At the end it prints, per mode, the score
+# distribution, how long games lasted and apples per minute of game time,
+# and writes the same numbers next to the checkpoint as .summary.json.
+import json, os, random, sys, time
+from multiprocessing import Pool
+
+from snake_sim import SnakeSim, MODES, RULE_KEYS, DIRS, EV_FOOD, EV_GOLDEN, EV_HIT, load_plugin, check_rules
+from timing import percentile
+
+CODES = {d: a for a, d in DIRS.items()}
+
+
+def game_seed(base, mode, i):
+    # str seeds go through sha512: the same on every platform and process
+    return random.Random(f"{base}:{mode}:{i}").getrandbits(63)
+
+
+def greedy(sim):
+    # cheapest bot: the free neighbour closest to the food, else keep going
+    w, h, wrap = sim.width, sim.height, sim.rules["walls"] == "wrap"
+    body = sim.body
+    tail_moves = len(body) >= sim.length
+    fx, fy = sim.food if sim.food else (sim.hx, sim.hy)
+    best, best_d = (sim.dx, sim.dy), None
+    for d in DIRS.values():
+        if (sim.dx or sim.dy) and d == (-sim.dx, -sim.dy):
+            continue
+        x, y = sim.hx + d[0], sim.hy + d[1]
+        if wrap:
+            x, y = x % w, y % h
+        elif not (0 <= x < w and 0 <= y < h):
+            continue
+        if body.occupied(x, y) and not (tail_moves and (x, y) == body.tail):
+            continue
+        dist = abs(x - fx) + abs(y - fy) + (d != (sim.dx, sim.dy))
+        if best_d is None or dist < best_d:
+            best, best_d = d, dist
+    return best
+
+
+def play(job):
+    # one game in a worker; returns a small dict (that's all that's pickled back)
+    gid, mode, seed, (w, h), rules, bot, budget, max_ticks, plugins = job
+    t0 = time.process_time()
+    if mode not in MODES:
+        # workers that were spawned rather than forked start without plugins
+        for path in plugins:
+            load_plugin(path)
+    sim = SnakeSim(mode, w, h, seed=seed, rules=rules)
+    if bot == "autopilot":
+        from autopilot import Autopilot
+        pilot = Autopilot(w, h, wrap=sim.rules["walls"] == "wrap", budget_us=budget)
+
+        def choose(sim):
+            return pilot.next(sim.dx, sim.dy, sim.body, sim.length, sim.food)
+    else:
+        choose = greedy
+    apples = golden = hits = 0
+    while not sim.over and sim.ticks < max_ticks:
+        d = choose(sim)
+        ev = sim.step(CODES[d] if d != (sim.dx, sim.dy) else 0)
+        apples += bool(ev & EV_FOOD)
+        golden += bool(ev & EV_GOLDEN)
+        hits += bool(ev & EV_HIT)
+    return {"id": gid, "mode": mode, "seed": seed, "score": sim.score, "ticks": sim.ticks,
+            "time": round(sim.time, 3), "apples": apples, "golden": golden, "hits": hits,
+            "over": sim.over, "cpu": round(time.process_time() - t0, 4)}
+
+
+def summarize(records):
+    by_mode = {}
+    for r in records:
+        by_mode.setdefault(r["mode"], []).append(r)
+    out = {}
+    for mode, rs in by_mode.items():
+        scores = [r["score"] for r in rs]
+        secs = [r["time"] for r in rs]
+        minutes = sum(secs) / 60
+        mean = sum(scores) / len(scores)
+        out[mode] = {
+            "games": len(rs),
+            "score": {"mean": mean, "sd": (sum((s - mean) ** 2 for s in scores) / len(scores)) ** 0.5,
+                      "min": min(scores), "p10": percentile(scores, 10), "p50": percentile(scores, 50),
+                      "p90": percentile(scores, 90), "max": max(scores)},
+            "histogram": histogram(scores),
+            "ticks": sum(r["ticks"] for r in rs) / len(rs),
+            "seconds": {"mean": sum(secs) / len(secs), "p50": percentile(secs, 50), "max": max(secs)},
+            "apples_per_minute": sum(r["apples"] for r in rs) / minutes if minutes else 0.0,
+            "golden_per_minute": sum(r["golden"] for r in rs) / minutes if minutes else 0.0,
+            "hits": sum(r["hits"] for r in rs) / len(rs),
+            "capped": sum(not r["over"] for r in rs),
+        }
+    return out
+
+
+def histogram(scores, bins=10):
+    # [[low, high, count], ...] over the score range
+    lo, hi = min(scores), max(scores)
+    step = max(1, -(-(hi - lo + 1) // bins))
+    counts = [0] * bins
+    for s in scores:
+        counts[min(bins - 1, (s - lo) // step)] += 1
+    return [[lo + i * step, lo + (i + 1) * step - 1, c] for i, c in enumerate(counts)]
+
+
+def print_summary(stats):
+    bars = " ▁▂▃▄▅▆▇█"
+    print(f"{'mode':<9} {'games':>6} {'score mean':>10} {'sd':>6} {'p10':>5} {'p50':>5} {'p90':>5} {'max':>5}"
+          f" {'secs p50':>8} {'apples/min':>10} {'capped':>6}  distribution")
+    for mode, s in stats.items():
+        sc, counts = s["score"], [c for _, _, c in s["histogram"]]
+        top = max(counts)
+        spark = "".join(bars[-(-c * (len(bars) - 1) // top)] for c in counts)
+        print(f"{mode:<9} {s['games']:>6} {sc['mean']:>10.1f} {sc['sd']:>6.1f} {sc['p10']:>5} {sc['p50']:>5}"
+              f" {sc['p90']:>5} {sc['max']:>5} {s['seconds']['p50']:>8.1f} {s['apples_per_minute']:>10.2f}"
+              f" {s['capped']:>6}  {spark}")
+
+
+def parse_args(argv):
+    opts = {"games": 1000, "modes": None, "workers": os.cpu_count() or 1, "bot": "autopilot",
+            "budget": None, "board": (40, 30), "max_ticks": 20000, "seed": 0, "rules": {},
+            "out": "tournament.jsonl", "plugins": []}
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        val = argv[i + 1] if i + 1 < len(argv) else None
+        if arg in ("--games", "--workers", "--max-ticks", "--seed", "--budget"):
+            opts[arg[2:].replace("-", "_")] = int(val)
+        elif arg == "--modes":
+            opts["modes"] = val.split(",")
+        elif arg == "--bot":
+            opts["bot"] = val
+        elif arg == "--board":
+            opts["board"] = tuple(int(v) for v in val.lower().split("x"))
+        elif arg == "--out":
+            opts["out"] = val
+        elif arg == "--plugin":
+            load_plugin(val)
+            opts["plugins"].append(val)
+        elif arg == "--set":
+            key, _, v = val.partition("=")
+            if key not in RULE_KEYS:
+                raise SystemExit(f"--set: unknown rule {key!r} (one of {', '.join(RULE_KEYS)})")
+            try:
+                opts["rules"][key] = json.loads(v)
+            except ValueError:
+                opts["rules"][key] = v      # a bare word: walls=wrap, self_hit=reset
+        else:
+            raise SystemExit(f"unknown option {arg!r}; see the top of tournament.py")
+        i += 2
+    if opts["modes"] is None:
+        opts["modes"] = list(MODES)
+    for mode in opts["modes"]:
+        if mode not in MODES:
+            raise SystemExit(f"unknown mode {mode!r}")
+        try:
+            check_rules(dict(MODES[mode], **opts["rules"]))
+        except ValueError as e:
+            raise SystemExit(f"--set: {e}")
+    if opts["bot"] not in ("autopilot", "greedy"):
+        raise SystemExit(f"unknown bot {opts['bot']!r}")
+    return opts
+
+
+def load_checkpoint(path, config):
+    # records already played with this exact config (else refuse to mix),
+    # and whether the file still needs its config header; a last line cut
+    # off by a crash is dropped, and that game played again
+    if not os.path.exists(path):
+        return [], True
+    records = []
+    with open(path, "rb+") as f:
+        head = f.readline()
+        if not head.endswith(b"\n"):
+            # empty, or a crash before the header was all written
+            f.truncate(0)
+            return [], True
+        if json.loads(head).get("config") != config:
+            raise SystemExit(f"{path} was written with different settings; use another --out")
+        good = f.tell()
+        for line in f:
+            try:
+                if not line.endswith(b"\n"):
+                    raise ValueError
+                records.append(json.loads(line))
+            except ValueError:
+                f.truncate(good)
+                break
+            good += len(line)
+    return records, False
+
+
+def main(argv):
+    opts = parse_args(argv)
+    config = {k: opts[k] for k in ("bot", "budget", "board", "max_ticks", "seed", "rules")}
+    config["board"] = list(config["board"])
+    records, new = load_checkpoint(opts["out"], config)
+    done = {r["id"] for r in records}
+    jobs = [(f"{mode}:{i}", mode, game_seed(opts["seed"], mode, i), opts["board"], opts["rules"],
+             opts["bot"], opts["budget"], opts["max_ticks"], opts["plugins"])
+            for i in range(opts["games"]) for mode in opts["modes"] if f"{mode}:{i}" not in done]
+    total = len(jobs) + len(done)
+    print(f"[tournament] {len(jobs)} games to play ({len(done)} already in {opts['out']}),"
+          f" {opts['workers']} workers, bot {opts['bot']}")
+
+    with open(opts["out"], "a") as out:
+        if new:
+            out.write(json.dumps({"config": config}) + "\n")
+        t0 = last = time.perf_counter()
+        played = cpu = 0
+        try:
+            with Pool(opts["workers"]) as pool:
+                # small chunks: game lengths vary a lot, so keep every worker busy
+                for r in pool.imap_unordered(play, jobs, chunksize=max(1, min(16, len(jobs) // (opts["workers"] * 8)))):
+                    out.write(json.dumps(r) + "\n")
+                    records.append(r)
+                    played += 1
+                    cpu += r["cpu"]
+                    now = time.perf_counter()
+                    if now - last >= 2 or played == len(jobs):
+                        out.flush()
+                        last = now
+                        rate = played / (now - t0)
+                        print(f"[tournament] {len(records)}/{total} games  {rate:.1f} games/s"
+                              f"  eta {(len(jobs) - played) / rate:.0f}s", flush=True)
+        except KeyboardInterrupt:
+            print(f"[tournament] interrupted: {len(records)} games saved to {opts['out']}")
+        wall = time.perf_counter() - t0
+    if played:
+        # cpu/wall: how many cores' worth of games the pool kept busy
+        print(f"[tournament] {played} games in {wall:.1f}s: {played / wall:.1f} games/s,"
+              f" {cpu / wall:.2f} cores busy of {opts['workers']}")
+    if not records:
+        return 1
+    stats = summarize(records)
+    print_summary(stats)
+    path = os.path.splitext(opts["out"])[0] + ".summary.json"
+    with open(path, "w") as f:
+        json.dump({"config": config, "modes": stats}, f, indent=1)
+    print("wrote", path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))